@@ -1,4 +1,4 @@
-from flask import Flask, request, abort, render_template, redirect, make_response, flash
+from flask import Flask, request, abort, render_template, redirect, make_response, flash, url_for
 from flask.views import View
 from flask.ext.login import login_user, current_user
 
@@ -8,7 +8,7 @@ import portality.models as models
 import portality.util as util
 from portality.core import app, login_manager
 from portality import settings, searchurl
-from portality.oarr import OARRClient
+from portality.oarr import OARRClient, Register
 
 from portality.view.stream import blueprint as stream
 from portality.view.duplicate import blueprint as duplicate
@@ -17,7 +17,8 @@ from portality.view.admin import blueprint as admin
 from portality.view.account import blueprint as account
 from portality.view.pagemanager import blueprint as pagemanager
 
-from portality.autodiscovery import autodiscovery
+from portality.autodiscovery import autodiscovery, jobs, scheduler
+from portality.autodiscovery.store import JobStore
 
 @login_manager.user_loader
 def load_account_for_login_manager(userid):
@@ -47,6 +48,14 @@ def set_current_context():
     return dict(current_user=current_user, app=app)
 
 
+autodiscovery.configure(app.config)
+
+# discovery for /detect and /contribute?url= runs in the background on this queue if somewhere
+# to keep the jobs has been configured, and otherwise in the request itself
+job_queue = None
+if app.config.get("AUTODISCOVERY_JOBS") is not None:
+    job_queue = jobs.JobQueue(JobStore(app.config["AUTODISCOVERY_JOBS"]), autodiscovery.discover_record)
+
 app.register_blueprint(admin, url_prefix='/admin')
 app.register_blueprint(account, url_prefix='/account')
 app.register_blueprint(duplicate, url_prefix='/duplicate')
@@ -145,11 +154,30 @@ def contribute():
         
         # check for a url request param
         elif 'url' in request.values:
-            # if there is one, then try to set the initial object
+            # if there is one, then try to set the initial object from what was discovered about it.
+            # If that is done in the background, wait for it
             if len(request.values['url']) != 0:
+                url = autodiscovery.normalise_url(request.values['url'])
+                job = None
+                if job_queue is not None:
+                    if 'job' in request.values:
+                        job = job_queue.status(request.values['job'])
+                    if job is None or job['url'] != url:
+                        job = job_queue.status(job_queue.submit(url))
+
+                    if job['status'] in [jobs.QUEUED, jobs.RUNNING]:
+                        if util.request_wants_json():
+                            resp = make_response( json.dumps({"job":job}), 202 )
+                            resp.mimetype = "application/json"
+                            return resp
+                        return render_template("detect_wait.html", job=job,
+                                               next=url_for('contribute', url=request.values['url'], job=job['id']))
+
                 try:
-                    register = autodiscovery.discover(request.values['url'])
-                    record = register.raw
+                    if job is not None:
+                        record = job['result']
+                    else:
+                        record = autodiscovery.discover_record(url)
                     for k, v in util.defaultrecord['register']['metadata'][0]['record'].iteritems():
                         if k not in record.get('register',{}).get('metadata',[{"record":{}}])[0]['record']:
                             record['register']['metadata'][0]['record'][k] = v
@@ -246,13 +274,46 @@ def detect():
         url = request.values.get("url")
         if url is None:
             return render_template("detect.html")
-        register = autodiscovery.discover(url)
+        if job_queue is None:
+            record = autodiscovery.discover_record(autodiscovery.normalise_url(url))
+            if util.request_wants_json():
+                resp = make_response( json.dumps(record) )
+                resp.mimetype = "application/json"
+                return resp
+            return render_repository(record)
+
+        job_id = job_queue.submit(autodiscovery.normalise_url(url))
         if util.request_wants_json():
-            resp = make_response( json.dumps(register) )
+            resp = make_response( json.dumps(job_queue.status(job_id)), 202 )
             resp.mimetype = "application/json"
-            return resp        
+            resp.headers["Location"] = url_for('detect_job', job_id=job_id)
+            return resp
         else:
-            return render_template("repository.html", repo=register, searchurl=searchurl)
+            return redirect(url_for('detect_job', job_id=job_id))
+
+@app.route("/detect/<job_id>")
+def detect_job(job_id):
+    if job_queue is None: abort(404)
+    job = job_queue.status(job_id.replace('.json',''))
+    if job is None:
+        abort(404)
+    if util.request_wants_json():
+        resp = make_response( json.dumps(job) )
+        resp.mimetype = "application/json"
+        return resp
+    if job['status'] == jobs.DONE:
+        return render_repository(job['result'])
+    elif job['status'] == jobs.FAILED:
+        flash('Sorry, we were unable to detect anything about ' + job['url'] + ': ' + str(job['error']), 'error')
+        return render_template("detect.html")
+    else:
+        return render_template("detect_wait.html", job=job, next=url_for('detect_job', job_id=job_id))
+
+def render_repository(record):
+    repo = Register(record)
+    if repo.detection.get(scheduler.TIMED_OUT) or repo.detection.get(scheduler.SKIPPED):
+        flash('Your repository took too long to respond for us to detect everything about it, so some of the information below may be missing.', 'warning')
+    return render_template("repository.html", repo=repo, searchurl=searchurl)
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', debug=app.config['DEBUG'], port=app.config['PORT'])
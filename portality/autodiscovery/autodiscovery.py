@@ -1,12 +1,42 @@
-from portality.autodiscovery import detectors, registryfile
+from portality.autodiscovery import detectors, registryfile, harvest, jobs
+from portality.autodiscovery.scheduler import Scheduler
+from portality.autodiscovery.store import DetectionLedger
+from portality.autodiscovery.stats import Stats
 from portality.oarr import Register
-import logging, requests
+from concurrent.futures import ThreadPoolExecutor
+import logging, requests, json, time
 
 # FIXME: this should probably come from configuration somewhere
 LOG_FORMAT = '%(asctime)-15s %(message)s'
 logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 log = logging.getLogger(__name__)
 
+# the ledger of past detection results which enhance works from, if one has been configured
+detection_ledger = None
+
+# the seconds the web app's discoveries are given before they return whatever they have found
+interactive_deadline = None
+
+def configure(config):
+    """
+    Apply the AUTODISCOVERY_* settings from the application (or script) config
+    """
+    global detection_ledger, interactive_deadline
+    detectors.Info.configure(config)
+    harvest.Harvester.configure(config)
+    jobs.JobQueue.configure(config)
+
+    path = config.get("AUTODISCOVERY_LEDGER")
+    if path is not None:
+        detection_ledger = DetectionLedger(path, ttl=config.get("AUTODISCOVERY_LEDGER_TTL", 2592000))
+
+    interactive_deadline = config.get("AUTODISCOVERY_INTERACTIVE_DEADLINE")
+
+def normalise_url(url):
+    if not url.startswith("http"):
+        url = "http://" + url
+    return url
+
 def validate_registry_file(repo_url=None, registry_file_url=None, registry_file_content=None):
     cont = None
     source = None
@@ -31,52 +61,91 @@ def validate_registry_file(repo_url=None, registry_file_url=None, registry_file_
     obj = registryfile.RegistryFile.validate(cont, source)
     return obj
 
-def discover(url, raise_registry_file_error=True):
-    if not url.startswith("http"):
-        url = "http://" + url
+def discover(url, raise_registry_file_error=True, stats=None, detector_classes=None, deadline=None):
+    """
+    Everything we can find out about the repository at the url, as a Register.  Given a deadline
+    (in seconds), discovery stops fetching when it is up, and returns what it has found by then;
+    the register's detection records which detectors completed and which were skipped or timed out
+    """
+    url = normalise_url(url)
+    if deadline is not None:
+        deadline = time.time() + deadline
 
-    # first try to detect the registry file
+    # the time, fetches and cache use of each detector are counted (in the Stats passed in, if
+    # any, so that the caller can see them) and logged as a summary once discovery is done
+    if stats is None:
+        stats = Stats()
     try:
-        r = registryfile.RegistryFile.get(url)
-        if r is not None:
-            return r
-    except registryfile.RegistryFileException as e:
-        if raise_registry_file_error:
-            raise e
-
-    # if we get here, the registry file may have failed or it may not have existed
-    # in which case we fall back to auto-detect
+        return _discover(url, raise_registry_file_error, stats, detector_classes, deadline)
+    finally:
+        log.info("Detection summary for " + url + ": " + json.dumps(stats.summary()))
+
+def _discover(url, raise_registry_file_error, stats, detector_classes, deadline):
+    # a register file, if the repository has one, takes the place of everything the detectors could
+    # find out.  But most don't, so the detectors are started at the same time as we look for it,
+    # and are called off if it turns up.  Both fetch through the same Info, so the home page is only
+    # fetched and parsed once.
+    #
+    # The scheduler checks that the register still needs and contains enough info for each detector,
+    # and runs the independent ones concurrently.  What they find is recorded in the ledger (if there
+    # is one), so that enhance can later refresh it.  The caller may choose which detectors to run
+    # instead of the general (i.e. non repo-type specific) ones (e.g. the benchmark, which leaves out
+    # the ones that need the internet)
+    if detector_classes is None:
+        detector_classes = detectors.GENERAL
     r = Register()
     r.repo_url = url
 
-    # for each general (i.e. non repo-type specific detector) check to see if the register contains
-    # enough info for the detector to run, and then run it if so
-    info = detectors.Info()
-    for klazz in detectors.GENERAL:
-        detector = klazz()
-        if detector.detectable(r):
-            log.info(url + " - " + detector.name())
-            try:
-                detector.detect(r, info)
-            except Exception as e:
-                log.info(e.message)
-
-    return r
-
-def enhance(register):
-    # first determine which detectors are required to enhance this register object
-    runqueue = []
-    for klazz in detectors.GENERAL:
-        detector = klazz()
-        if detector.required(register):
-            runqueue.append(detector)
-
-    # now run them
-    info = detectors.Info()
-    for detector in runqueue:
-        if detector.detectable(register):
-            log.info(register.repo_url + " - " + detector.name())
-            try:
-                detector.detect(register, info)
-            except Exception as e:
-                log.info(e.message)
\ No newline at end of file
+    info = detectors.Info(stats, deadline)
+    scheduler = Scheduler(detector_classes, ledger=detection_ledger, incremental=False)
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        detected = executor.submit(scheduler.run, r, info)
+
+        # first try to detect the registry file
+        try:
+            with stats.measure("Registry File"):
+                found = registryfile.RegistryFile.get(url, info=info)
+            if found is not None:
+                scheduler.cancel()
+                return found
+        except registryfile.RegistryFileException as e:
+            if raise_registry_file_error:
+                scheduler.cancel()
+                raise e
+
+        # if we get here, the registry file may have failed or it may not have existed,
+        # in which case we fall back to what the detectors found
+        return detected.result()
+    finally:
+        # a cancelled run may still be finishing its detectors; their results are no longer wanted
+        executor.shutdown(wait=False)
+        info.close()
+
+def discover_record(url):
+    """
+    the raw record discovered for the url within the web app's deadline, which is what a
+    background job keeps as its result
+    """
+    return discover(url, deadline=interactive_deadline).raw
+
+def enhance(register, ledger=None, stats=None, detector_classes=None, deadline=None):
+    # run only the detectors required to enhance this register object.  With a ledger of what was
+    # detected before (by default the configured one), that means only those whose results for
+    # this repository are stale, or whose inputs have changed, and the results are recorded.
+    # As with discover, what each detector did is counted and logged, and there may be a deadline
+    if deadline is not None:
+        deadline = time.time() + deadline
+    if ledger is None:
+        ledger = detection_ledger
+    if stats is None:
+        stats = Stats()
+    if detector_classes is None:
+        detector_classes = detectors.GENERAL
+    info = detectors.Info(stats, deadline)
+    try:
+        Scheduler(detector_classes, ledger=ledger).run(register, info)
+    finally:
+        info.close()
+        log.info("Detection summary for " + str(register.repo_url) + ": " + json.dumps(stats.summary()))
+    return register
@@ -0,0 +1,181 @@
+from portality.autodiscovery import autodiscovery, detectors
+from portality.autodiscovery.resolver import Resolver, host_of
+from portality.autodiscovery.stats import Stats, add_summary
+from multiprocessing import Pool, Queue, TimeoutError
+from Queue import Empty
+import json, logging, math, os, sys, time
+
+# FIXME: this should probably come from configuration somewhere
+LOG_FORMAT = '%(asctime)-15s %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+log = logging.getLogger(__name__)
+
+def read_urls(source):
+    """
+    read the list of urls to discover from a file, or from stdin if the source is "-".  Blank
+    lines and lines starting with # are ignored
+    """
+    f = sys.stdin if source == "-" else open(source)
+    try:
+        urls = []
+        for line in f:
+            line = line.strip()
+            if line == "" or line.startswith("#"):
+                continue
+            urls.append(line)
+        return urls
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def completed_urls(output):
+    """
+    the urls which already have a result in the output file from a previous, interrupted, run
+    """
+    done = set()
+    if output is None or not os.path.exists(output):
+        return done
+    with open(output) as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["url"])
+            except (ValueError, KeyError):
+                # most likely the last line of a run which was killed mid-write
+                pass
+    return done
+
+def percentile(values, pc):
+    """
+    nearest-rank percentile of a list of numbers
+    """
+    if len(values) == 0:
+        return None
+    ordered = sorted(values)
+    rank = int(math.ceil(pc / 100.0 * len(ordered))) - 1
+    return ordered[max(0, rank)]
+
+# the queue each worker process puts its results on, one url at a time (see run)
+_results = None
+
+def _init_worker(config, results):
+    global _results
+    _results = results
+    if config is not None:
+        autodiscovery.configure(config)
+
+def _resolved(urls):
+    """
+    Group the urls by host, and look up the hosts concurrently, yielding each host's urls along
+    with its addresses as soon as they are known, so that the workers can start on the hosts
+    which answer quickly and never wait on a name that doesn't resolve.
+
+    Each host is handed to a single worker, which discovers its repositories one after another,
+    so the host's politeness limits (which each process keeps for itself) hold for the whole
+    run, and the workers are always busy with different hosts
+    """
+    hosts = {}
+    for url in urls:
+        hosts.setdefault(host_of(url), []).append(url)
+    for host, addresses in Resolver().resolve_all(hosts.keys()):
+        yield host, addresses, hosts[host]
+
+def _discover_host(task):
+    host, addresses, urls = task
+    detectors.Info.resolver.seed(host, addresses)
+    for url in urls:
+        _results.put(_discover_one(url))
+    return len(urls)
+
+def _discover_one(url):
+    result = {"url" : url}
+    stats = Stats()
+    start = time.time()
+    try:
+        register = autodiscovery.discover(url, raise_registry_file_error=False, stats=stats)
+        result["register"] = register.raw
+    except Exception as e:
+        result["error"] = str(e)
+    result["elapsed"] = time.time() - start
+    result["stats"] = stats.summary()
+    return result
+
+def run(urls, output=None, workers=4, config=None):
+    """
+    Discover each of the urls across a pool of worker processes, writing one JSON result per
+    line to the output file (or stdout if there is none) as each url is finished.  Urls which
+    already have a result in the output file are skipped, so an interrupted run can simply be
+    started again.  Urls may be given without a scheme, as discover accepts them.  Returns a summary of the run's throughput, and the time, fetches, cache use
+    and exceptions of each detector totalled over all the urls
+    """
+    done = completed_urls(output)
+    todo = []
+    seen = set(done)
+    for url in urls:
+        # normalised before they are grouped by host, as a url without a scheme has no host
+        url = autodiscovery.normalise_url(url)
+        if url not in seen:
+            todo.append(url)
+            seen.add(url)
+    if len(done) > 0:
+        log.info("Resuming batch: " + str(len(done)) + " urls already complete, " + str(len(todo)) + " to do")
+
+    # the whois rate limit is per process, so share it out between the workers
+    if config is not None and config.get("AUTODISCOVERY_WHOIS_RATE") is not None:
+        config = dict(config)
+        config["AUTODISCOVERY_WHOIS_RATE"] = config["AUTODISCOVERY_WHOIS_RATE"] / float(workers)
+
+    out = sys.stdout if output is None else open(output, "a")
+    results = Queue()
+    pool = Pool(workers, initializer=_init_worker, initargs=(config, results))
+    timings = []
+    failures = 0
+    detector_stats = {}
+    start = time.time()
+    try:
+        # the workers send back each result as soon as they have it, so that whatever was done
+        # before an interruption is in the output file.  The hosts they have finished tell us
+        # how many results to expect, once all of them are finished
+        hosts = pool.imap_unordered(_discover_host, _resolved(todo))
+        sent = 0
+        expected = None if len(todo) > 0 else 0
+        while expected is None or len(timings) < expected:
+            try:
+                result = results.get(timeout=1)
+            except Empty:
+                if expected is None:
+                    try:
+                        while True:
+                            sent += hosts.next(timeout=0)
+                    except TimeoutError:
+                        pass
+                    except StopIteration:
+                        expected = sent
+                continue
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            timings.append(result["elapsed"])
+            add_summary(detector_stats, result.get("stats", {}))
+            if "error" in result:
+                failures += 1
+        pool.close()
+    except:
+        # interrupted, or a worker failed: the rest of the run is abandoned
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - start
+    return {
+        "urls" : len(timings),
+        "skipped" : len(urls) - len(todo),
+        "failures" : failures,
+        "elapsed" : elapsed,
+        "urls_per_second" : len(timings) / elapsed if elapsed > 0 else None,
+        "p50" : percentile(timings, 50),
+        "p95" : percentile(timings, 95),
+        "detectors" : detector_stats.get("detectors", {}),
+        "totals" : detector_stats.get("totals", {})
+    }
@@ -1,13 +1,29 @@
-import requests, re, logging, socket, pycountry, os
+import requests, re, logging, pycountry, threading, time, socket, ssl
 from incf.countryutils import transformations
 from urlparse import urlparse
 from babel import Locale
 from lxml import etree
-from bs4 import BeautifulSoup
 import rdflib
 import whois
 import feedparser
 from io import BytesIO
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.packages.urllib3.poolmanager import PoolManager
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool, VerifiedHTTPSConnection, port_by_scheme
+from requests.packages.urllib3.packages.ssl_match_hostname import match_hostname
+from requests.packages.urllib3.util import ssl_wrap_socket
+from httplib import HTTPConnection
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from portality.autodiscovery.store import HTTPCache, WhoisCache
+from portality.autodiscovery.throttle import RateLimiter, HostGate, retry_after
+from portality.autodiscovery.resolver import Resolver, host_of
+from portality.autodiscovery.geoip import GeoIP
+from portality.autodiscovery.fingerprint import Fingerprinter
+from portality.autodiscovery import htmlparse
+from portality.autodiscovery.infocache import InfoCache, estimate, DERIVED, RESPONSE, PAGE, XML, GRAPH, FEED, FEED_HEADER, WHOIS, FAILED, NOTE
+from portality.autodiscovery.stats import bind
+from portality.autodiscovery.territory_languages import TERRITORY_LANGUAGES
 
 # FIXME: this should probably come from configuration somewhere
 LOG_FORMAT = '%(asctime)-15s %(message)s'
@@ -17,6 +33,26 @@ log = logging.getLogger(__name__)
 ################################################################
 ## utilities
 
+# second level labels under which country code tlds commonly register domains, e.g. ac.uk, edu.au, co.jp
+SECOND_LEVEL_LABELS = ["ac", "co", "com", "edu", "gov", "gob", "gouv", "go", "net", "ne", "org", "or",
+                       "mil", "nic", "sch", "res", "nhs", "ltd", "plc", "int", "info", "biz"]
+
+def registrable_domain(host):
+    """
+    Best guess at the domain under which a host was registered, which is the name that
+    whois records are held against.  e.g. eprints.foo.ac.uk -> foo.ac.uk, www.bar.org -> bar.org
+    """
+    host = host.lower().rstrip(".")
+    labels = host.split(".")
+    if labels[-1].isdigit():
+        # an ip address
+        return host
+    if len(labels) <= 2:
+        return host
+    if len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
 class WhoIsWrapper(object):
     fields = {
         "org_name" : ["Registrant Organization", "Admin Organization", "Registered For", "Domain Owner", "Tech Organization", "Registered By"],
@@ -30,15 +66,53 @@ class WhoIsWrapper(object):
         "phone" : ["Registrant Phone", "Admin Phone", "Tech Phone"],
     }
 
-    long_pattern = ":\n\t(.+?)\n\n"
-    short_pattern = ":(.+?)\n"
+    # a "Key: value" line, or (in the long format) a "Key:" line heading an indented block of values
+    key_line = re.compile(r"^([ \t]*)([^:]+?):[ \t]*(.*?)[ \t]*$")
 
-    def __init__(self, host):
-        self.who = whois.whois(host)
-        if self.who:
-            self.body = self.who.text
-        else:
-            self.body = ""
+    def __init__(self, host, body=None):
+        # if we already have the text of the record (e.g. from the whois cache) don't look it up again
+        if body is None:
+            who = whois.whois(host)
+            body = who.text if who else ""
+        self.body = body
+        self.records = self._parse(body)
+
+    def _parse(self, body):
+        """
+        Read the whole record in one pass into a multimap of lower-cased key -> list of values.
+        Handles both the short format:
+
+            Registrant Organization: University of Foo
+
+        and the long one, where the value is the block of lines indented beneath the key:
+
+            Registrant Address:
+                Foo Street
+                Foo
+        """
+        records = {}
+        lines = body.splitlines()
+        i = 0
+        while i < len(lines):
+            m = self.key_line.match(lines[i])
+            i += 1
+            if m is None:
+                continue
+            indent, key, value = m.groups()
+            if value == "":
+                depth = len(indent.expandtabs())
+                block = []
+                while i < len(lines) and lines[i].strip() != "" and self._depth(lines[i]) > depth:
+                    block.append(lines[i].strip())
+                    i += 1
+                value = "\n".join(block)
+            if value != "":
+                records.setdefault(key.strip().lower(), []).append(value)
+        return records
+
+    def _depth(self, line):
+        expanded = line.expandtabs()
+        return len(expanded) - len(expanded.lstrip())
 
     def get(self, field):
         synonyms = self.fields.get(field, [])
@@ -58,16 +132,370 @@ class WhoIsWrapper(object):
         return None
 
     def get_raw(self, key):
-        p = key + self.long_pattern
-        m = re.search(p, self.body, re.DOTALL)
-        if m is not None:
-            return m.group(1)
-        p = key + self.short_pattern
-        m = re.search(p, self.body)
-        if m is not None:
-            return m.group(1)
+        vals = self.records.get(key.lower())
+        if vals is None:
+            return None
+        return vals[0]
+
+def connect_resolved(resolver, host, port, timeout):
+    """
+    Open a socket to the host using the addresses the resolver has for it, trying each in turn,
+    rather than having the system look the name up again for every new connection.  Raises
+    socket.gaierror if the host does not resolve, which the resolver will then remember
+    """
+    addresses = resolver.resolve(host)
+    if addresses is None:
+        raise socket.gaierror("Unable to resolve " + host)
+    error = None
+    for address in addresses:
+        try:
+            return socket.create_connection((address, port), timeout)
+        except socket.error as e:
+            error = e
+    raise error
+
+class ResolvedHTTPConnection(HTTPConnection):
+    def __init__(self, resolver, *args, **kwargs):
+        HTTPConnection.__init__(self, *args, **kwargs)
+        self.resolver = resolver
+
+    def connect(self):
+        self.sock = connect_resolved(self.resolver, self.host, self.port, self.timeout)
+
+class ResolvedHTTPSConnection(VerifiedHTTPSConnection):
+    def __init__(self, resolver, *args, **kwargs):
+        VerifiedHTTPSConnection.__init__(self, *args, **kwargs)
+        self.resolver = resolver
+
+    def connect(self):
+        # as VerifiedHTTPSConnection, but the certificate and server name (SNI) are still the host's
+        sock = connect_resolved(self.resolver, self.host, self.port, self.timeout)
+        self.sock = ssl_wrap_socket(sock, self.key_file, self.cert_file,
+                                    cert_reqs=self.cert_reqs,
+                                    ca_certs=self.ca_certs,
+                                    server_hostname=self.host,
+                                    ssl_version=self.ssl_version)
+        if self.ca_certs:
+            match_hostname(self.sock.getpeercert(), self.host)
+
+class ResolvedHTTPConnectionPool(HTTPConnectionPool):
+    resolver = None
+
+    def _new_conn(self):
+        self.num_connections += 1
+        return ResolvedHTTPConnection(self.resolver, host=self.host, port=self.port, strict=self.strict)
+
+class ResolvedHTTPSConnectionPool(HTTPSConnectionPool):
+    resolver = None
+
+    def _new_conn(self):
+        self.num_connections += 1
+        conn = ResolvedHTTPSConnection(self.resolver, host=self.host, port=self.port, strict=self.strict)
+        conn.set_cert(key_file=self.key_file, cert_file=self.cert_file, cert_reqs=self.cert_reqs, ca_certs=self.ca_certs)
+        conn.ssl_version = self.ssl_version if self.ssl_version is not None else ssl.PROTOCOL_SSLv23
+        return conn
+
+class ResolvedPoolManager(PoolManager):
+    """
+    PoolManager whose connections are opened to the addresses a Resolver has for their host
+    """
+    pool_classes = {
+        "http" : ResolvedHTTPConnectionPool,
+        "https" : ResolvedHTTPSConnectionPool
+    }
+
+    def __init__(self, resolver, **kwargs):
+        PoolManager.__init__(self, **kwargs)
+        self.resolver = resolver
+
+    def connection_from_host(self, host, port=None, scheme="http"):
+        port = port or port_by_scheme.get(scheme, 80)
+        pool_key = (scheme, host, port)
+        pool = self.pools.get(pool_key)
+        if pool:
+            return pool
+        pool = self.pool_classes[scheme](host, port, **self.connection_pool_kw)
+        pool.resolver = self.resolver
+        self.pools[pool_key] = pool
+        return pool
+
+class HostAdapter(HTTPAdapter):
+    """
+    Adapter which holds at most pool_maxsize connections open to the host, and makes
+    any further concurrent requests wait for one of them to come free.  Given a Resolver,
+    it connects to the addresses that has for the host
+    """
+    def __init__(self, resolver=None, **kwargs):
+        self.resolver = resolver
+        super(HostAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize):
+        if self.resolver is None:
+            self.poolmanager = PoolManager(num_pools=connections, maxsize=maxsize, block=True)
+        else:
+            self.poolmanager = ResolvedPoolManager(self.resolver, num_pools=connections, maxsize=maxsize, block=True)
+
+    def connection_stats(self):
+        """
+        (requests made, connections opened) over all the pools in this adapter
+        """
+        requests_made = 0
+        connections = 0
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            requests_made += pool.num_requests
+            connections += pool.num_connections
+        return requests_made, connections
+
+def discard_connection(resp):
+    """
+    A streamed response we stopped reading part way through leaves the rest of its body on
+    the connection, so the connection has to be closed rather than going back into the pool
+    """
+    raw = getattr(resp, "raw", None)
+    conn = getattr(raw, "_connection", None)
+    if conn is None:
+        return
+    conn.close()
+    raw._connection = None
+    # urllib3 puts None back in the pool in place of a connection it has dropped, so that the
+    # pool can open a new one when it is next needed
+    if raw._pool is not None:
+        raw._pool._put_conn(None)
+
+def expand_url(origin_url, rel):
+    """
+    resolve a (possibly relative) href found on the page at origin_url
+    """
+    if rel is None:
+        return None
+
+    if rel.startswith("http://") or rel.startswith("https://"):
+        return rel
+
+    parsed = urlparse(origin_url)
+
+    if rel.startswith("/"):
+        # absolute to the base of the domain
+        return parsed.scheme + "://" + parsed.netloc + rel
+    else:
+        full = parsed.scheme + "://" + parsed.netloc + parsed.path
+        if full.endswith("/"):
+            return full + rel
+        else:
+            parts = full.split("/")
+            if len(parts) == 3:
+                return full + "/" + rel
+            elif len(parts) > 3:
+                return "/".join(parts[:-1]) + "/" + rel
+
+    return None
+
+# the rdfs:comment in an EPrints repository summary which says which version is running, e.g.
+# "This system is running eprints server software (EPrints 3.3.10) developed at ..."
+EPRINTS_SUMMARY_COMMENT = "This system is running eprints server software"
+EPRINTS_VERSION = re.compile(r"\(EPrints ([^\s)]+)")
+RDFS_COMMENT = "http://www.w3.org/2000/01/rdf-schema#comment"
+RDFS_COMMENT_TAG = "{http://www.w3.org/2000/01/rdf-schema#}comment"
+
+# the serialisations of a repository summary which can be read line by line
+RDF_LINE_FORMATS = ["nt", "n3", "turtle", "text/plain", "text/n3", "text/turtle", "application/x-turtle", "application/n-triples"]
+
+# how lxml is to parse the documents we fetch: entities are left unresolved and nothing is read
+# from the network or the local filesystem, so a document can't pull in anything it doesn't contain
+XML_PARSER_OPTIONS = {"resolve_entities" : False, "no_network" : True, "huge_tree" : False}
+
+def xml_parser():
+    return etree.XMLParser(**XML_PARSER_OPTIONS)
+
+def eprints_version(comment):
+    if comment is None or not comment.strip().startswith(EPRINTS_SUMMARY_COMMENT):
         return None
+    m = EPRINTS_VERSION.search(comment)
+    return m.group(1) if m is not None else None
+
+def eprints_version_from_summary(content, mimetype):
+    """
+    Find the EPrints version in a repository summary without building a graph of it: RDF/XML
+    is read as a stream of elements, N-Triples and Turtle line by line, and either way we stop
+    at the comment.  Returns (True, version) if the document could be read (the version being
+    None if it didn't have one), or (False, None) if it wasn't in a form we can read this way,
+    in which case the caller can fall back to parsing it properly
+    """
+    mimetype = (mimetype or "").split(";")[0].strip().lower()
+    if mimetype == "xml" or mimetype.endswith("/xml") or mimetype.endswith("+xml"):
+        try:
+            for event, el in etree.iterparse(BytesIO(content), events=("end",), **XML_PARSER_OPTIONS):
+                # the comment may be an element or, in the abbreviated syntax, an attribute
+                if el.tag == RDFS_COMMENT_TAG:
+                    version = eprints_version(el.text)
+                else:
+                    version = eprints_version(el.get(RDFS_COMMENT_TAG))
+                if version is not None:
+                    return True, version
+                el.clear()
+        except etree.XMLSyntaxError:
+            return False, None
+        return True, None
+
+    if mimetype in RDF_LINE_FORMATS:
+        # the phrase is particular enough that we needn't check that it is the object of an
+        # rdfs:comment, which in Turtle may be on an earlier line anyway
+        for line in content.splitlines():
+            if EPRINTS_SUMMARY_COMMENT in line:
+                m = EPRINTS_VERSION.search(line)
+                if m is not None:
+                    return True, m.group(1)
+        return True, None
+
+    return False, None
+
+# the root elements of the kinds of feed, and the namespaces of their headers.  Versions are
+# given as feedparser names them, so that a sniffed feed and a parsed one can be treated alike
+ATOM_NS = "http://www.w3.org/2005/Atom"
+ATOM03_NS = "http://purl.org/atom/ns#"
+RSS10_NS = "http://purl.org/rss/1.0/"
+RSS090_NS = "http://my.netscape.com/rdf/simple/0.9/"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RSS_VERSIONS = {"0.91" : "rss091u", "0.92" : "rss092", "0.93" : "rss093", "0.94" : "rss094", "2.0" : "rss20", "2.0.1" : "rss20"}
+
+def sniff_feed(content):
+    """
+    The type (rss or atom), version, title and subtitle of a feed, read from the start of the
+    document only: we stop at the first item or entry, so it doesn't matter how many there are.
+    Returns (True, header), with header None if the document isn't a feed, or (False, None) if
+    it couldn't be read that far as XML, in which case the caller can fall back to feedparser,
+    which is more forgiving
+    """
+    header = None
+    container = None
+    try:
+        for event, el in etree.iterparse(BytesIO(content), events=("start", "end"), **XML_PARSER_OPTIONS):
+            tag = el.tag if isinstance(el.tag, basestring) else ""
+            if header is None:
+                # the root element tells us what kind of feed it is
+                if tag == "rss":
+                    header = {"type" : "rss", "version" : RSS_VERSIONS.get(el.get("version"), "rss")}
+                elif tag == "{" + ATOM_NS + "}feed":
+                    header = {"type" : "atom", "version" : "atom10"}
+                    container = tag
+                elif tag == "{" + ATOM03_NS + "}feed":
+                    header = {"type" : "atom", "version" : "atom03" if el.get("version") == "0.3" else "atom"}
+                    container = tag
+                elif tag == "{" + RDF_NS + "}RDF":
+                    header = {"type" : "rss", "version" : None}
+                else:
+                    return True, None
+                header["title"] = None
+                header["subtitle"] = None
+                continue
 
+            ns, name = tag[1:].split("}", 1) if tag.startswith("{") else ("", tag)
+            if event == "start":
+                if name in ["item", "entry"]:
+                    break
+                if name == "channel":
+                    container = tag
+                    if header["version"] is None:
+                        header["version"] = "rss10" if ns == RSS10_NS else "rss090" if ns == RSS090_NS else "rss"
+                continue
+
+            # the header fields are the direct children of the channel (or the atom feed)
+            parent = el.getparent()
+            if parent is not None and parent.tag == container:
+                if name == "title" and header["title"] is None:
+                    header["title"] = el.text
+                elif name in ["subtitle", "tagline", "description"] and header["subtitle"] is None:
+                    header["subtitle"] = el.text
+                if header["title"] is not None and header["subtitle"] is not None:
+                    break
+            elif tag == container:
+                break
+    except etree.XMLSyntaxError:
+        return False, None
+    return True, header
+
+class PageIndex(object):
+    """
+    The parts of an html page which the detectors look at, gathered in a single traversal
+    of the parsed page.  Link and anchor hrefs are resolved against the page url, and the
+    text of each text block is worked out once along with its length
+    """
+    text_block_elements = ["p", "td"]
+
+    def __init__(self, soup, url):
+        self.url = url
+        self.title = None
+        self.links = []
+        self.anchors = []
+        self.blocks = dict([(el, []) for el in self.text_block_elements])
+        self._links_by_rel = {}
+        self._links_by_type = {}
+        self._metas = {}
+        self._soup = soup
+        self._text = None
+
+        for el in soup.find_all(["link", "meta", "a", "title"] + self.text_block_elements):
+            if el.name == "link":
+                self._add_link(el)
+            elif el.name == "meta":
+                name = el.get("name")
+                if name is not None:
+                    self._metas.setdefault(name.lower(), []).append(el.get("content"))
+            elif el.name == "a":
+                href = el.get("href")
+                self.anchors.append({"href" : href, "url" : expand_url(url, href), "text" : el.text})
+            elif el.name == "title":
+                if self.title is None:
+                    self.title = el.text
+            else:
+                text = el.text
+                self.blocks[el.name].append((text, len(text)))
+
+    def _add_link(self, el):
+        rels = el.get("rel")
+        if rels is None:
+            rels = []
+        elif isinstance(rels, basestring):
+            rels = rels.split()
+        href = el.get("href")
+        link = {
+            "rel" : [r.lower() for r in rels],
+            "type" : el.get("type"),
+            "title" : el.get("title"),
+            "href" : href,
+            "url" : expand_url(self.url, href)
+        }
+        self.links.append(link)
+        for rel in link["rel"]:
+            self._links_by_rel.setdefault(rel, []).append(link)
+        if link["type"] is not None:
+            self._links_by_type.setdefault(link["type"].lower(), []).append(link)
+
+    def links_by_rel(self, rel):
+        return self._links_by_rel.get(rel.lower(), [])
+
+    def links_by_type(self, type):
+        return self._links_by_type.get(type.lower(), [])
+
+    def meta(self, name):
+        """
+        the contents of all the meta elements with this name (case insensitive)
+        """
+        return self._metas.get(name.lower(), [])
+
+    @property
+    def soup(self):
+        return self._soup
+
+    @property
+    def text(self):
+        # all the text on the page; only worked out if someone asks for it
+        if self._text is None:
+            self._text = self._soup.get_text()
+        return self._text
 
 ###############################################################
 ## Infrastructure classes for detection
@@ -75,101 +503,622 @@ class WhoIsWrapper(object):
 class Info(object):
     request_timeout = 10
     accept_language = "en"
+    max_fetch_workers = 8
+
+    # each host gets its own keep-alive session, with up to session_max_connections open at once
+    session_pool_size = 10
+    session_max_connections = 8
+
+    # the persistent HTTP cache shared by all Info objects in this process (None to disable)
+    http_cache = None
+
+    # which of htmlparse.BACKENDS to parse pages with
+    html_parser = "bs4"
+
+    # the persistent whois cache shared by all Info objects in this process (None to disable), and
+    # the limit on how fast we query each registry's whois server (queries per second, burst)
+    whois_cache = None
+    whois_limiter = RateLimiter(0.5, 5)
+
+    # politeness towards each host we fetch from, shared by every Info in the process, and the
+    # longest a host may ask us (with Retry-After on a 429 or 503) to wait before we try again
+    politeness = HostGate()
+    max_retry_after = 30
+
+    # host name lookups, shared by every Info in the process, and used to open every connection
+    resolver = Resolver()
+
+    # offline ip to country database, if one has been configured
+    geoip = None
+
+    # the most bytes (estimated) of fetched and parsed documents each Info keeps in memory, None
+    # for no limit; and whether to let go of a response's body as soon as it has been parsed into
+    # everything it is used as (see infocache.DERIVED), at the cost of fetching it again should
+    # anyone then want the body itself
+    cache_budget = 134217728
+    drop_parsed_bodies = False
+
+    # the most bytes we will read of each kind of document a detector asks for, so that a huge
+    # page or a file served at a guessed url can't exhaust the memory of the process.  Anything
+    # longer is cut off there, and the response marked as truncated
+    fetch_limits = {
+        "html" : 2097152,
+        "xml" : 262144,
+        "feed" : 1048576,
+        "rdf" : 4194304,
+        "json" : 262144,
+        "default" : 4194304
+    }
+    fetch_chunk_size = 16384
+
+    # the content types each kind of document may be served as; a response of any other type is
+    # not parsed (and its body not even read).  Those starting with + are suffixes, as in
+    # application/rdf+xml.  A response with no content type is given the benefit of the doubt
+    parseable_types = {
+        "html" : ["text/html", "application/xhtml+xml", "text/plain"],
+        "xml" : ["text/xml", "application/xml", "text/plain", "+xml"],
+        "feed" : ["text/xml", "application/xml", "text/plain", "application/rss", "+xml"],
+        "rdf" : ["text/xml", "application/xml", "text/plain", "text/turtle", "text/n3", "application/n-triples", "application/x-turtle", "+xml"],
+        "json" : ["application/json", "text/json", "text/plain", "text/javascript", "application/javascript", "+json"]
+    }
 
-    def __init__(self):
-        self.cache = {}
+    # the first bytes of the files most often found at guessed urls (pdf, zip, png, gif, jpeg,
+    # ms office), whatever they are served as, which are never worth parsing
+    binary_signatures = ["%PDF", "PK\x03\x04", "\x89PNG", "GIF8", "\xff\xd8\xff", "\xd0\xcf\x11\xe0"]
+
+    @classmethod
+    def configure(cls, config):
+        cls.session_pool_size = config.get("AUTODISCOVERY_SESSION_POOL_SIZE", cls.session_pool_size)
+        cls.session_max_connections = config.get("AUTODISCOVERY_SESSION_MAX_CONNECTIONS", cls.session_max_connections)
+        cls.html_parser = config.get("AUTODISCOVERY_HTML_PARSER", cls.html_parser)
+        cls.cache_budget = config.get("AUTODISCOVERY_INFO_CACHE_BUDGET", cls.cache_budget)
+        cls.drop_parsed_bodies = config.get("AUTODISCOVERY_INFO_DROP_PARSED_BODIES", cls.drop_parsed_bodies)
+
+        limits = config.get("AUTODISCOVERY_FETCH_LIMITS")
+        if limits is not None:
+            cls.fetch_limits = dict(cls.fetch_limits)
+            cls.fetch_limits.update(limits)
+
+        path = config.get("AUTODISCOVERY_HTTP_CACHE")
+        if path is not None:
+            cls.http_cache = HTTPCache(path,
+                                       ttl=config.get("AUTODISCOVERY_HTTP_CACHE_TTL", 86400),
+                                       negative_ttl=config.get("AUTODISCOVERY_HTTP_CACHE_NEGATIVE_TTL", 3600))
+
+        path = config.get("AUTODISCOVERY_WHOIS_CACHE")
+        if path is not None:
+            cls.whois_cache = WhoisCache(path, ttl=config.get("AUTODISCOVERY_WHOIS_CACHE_TTL", 2592000))
+        cls.whois_limiter = RateLimiter(config.get("AUTODISCOVERY_WHOIS_RATE", 0.5), config.get("AUTODISCOVERY_WHOIS_BURST", 5))
+        cls.politeness = HostGate(config.get("AUTODISCOVERY_HOST_CONCURRENCY"), config.get("AUTODISCOVERY_HOST_DELAY", 0))
+        cls.max_retry_after = config.get("AUTODISCOVERY_MAX_RETRY_AFTER", cls.max_retry_after)
+        cls.resolver = Resolver(ttl=config.get("AUTODISCOVERY_DNS_TTL"), negative_ttl=config.get("AUTODISCOVERY_DNS_NEGATIVE_TTL"))
+
+        path = config.get("AUTODISCOVERY_GEOIP_DB")
+        if path is not None:
+            cls.geoip = GeoIP(path)
+
+    def __init__(self, stats=None, deadline=None):
+        # the Stats of the run this Info is for, if it is being measured
+        self.stats = stats
+        self.cache = InfoCache(self.cache_budget)
+        # the time (as time.time()) by which all the fetching done through this Info must be over,
+        # if there is one.  Fetches are given no longer than is left, and none are started after it
+        self.deadline = deadline
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._fetch_pool = None
+        self._sessions = {}
+        self._closed = False
+
+    def close(self):
+        # don't wait for probes which are still running, their results are no longer wanted.  They
+        # (and anything else still holding this Info) may carry on, but fetch nothing more
+        with self._locks_lock:
+            self._closed = True
+            sessions = self._sessions
+            self._sessions = {}
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown(wait=False)
+
+        for host, (session, adapter) in sessions.iteritems():
+            requests_made, connections = adapter.connection_stats()
+            if requests_made > 0:
+                log.info("Connection reuse for " + host + ": " + str(requests_made) + " requests over " + str(connections) + " connections")
+            session.close()
+
+    def session(self, url):
+        """
+        The pooled keep-alive session for the host of this url, so that all the
+        fetches to one repository share their connections; None once the Info is closed
+        """
+        parsed = urlparse(url)
+        host = parsed.scheme + "://" + parsed.netloc
+        with self._locks_lock:
+            if self._closed:
+                return None
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HostAdapter(resolver=self.resolver, pool_connections=self.session_pool_size, pool_maxsize=self.session_max_connections)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = (session, adapter)
+            return self._sessions[host][0]
+
+    def remaining(self):
+        """
+        seconds left until the deadline (negative once it has passed), or None if there isn't one
+        """
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
 
-    def get(self, cached, default=None):
-        return self.cache.get(cached, default)
+    def fetch_timeout(self):
+        """
+        the timeout for a fetch starting now: request_timeout, or less if the deadline is sooner
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return self.request_timeout
+        return max(0, min(self.request_timeout, remaining))
+
+    def get(self, key, default=None):
+        """
+        a note left by a detector for the others (see set)
+        """
+        return self.cache.get(NOTE, key, default)
 
     def set(self, key, obj):
-        self.cache[key] = obj
+        """
+        leave a note for the detectors which run after this one, e.g. the url of the OAI-PMH
+        Identify response which was found
+        """
+        self.cache.put(NOTE, key, obj)
 
-    def url_get(self, url):
-        try:
-            # have we already tried and found the url timed out?
-            if self.get("timeout_" + url, False):
+    def cached(self, kind, key):
+        """
+        get from the cache, counting the hit or miss against the detector asking
+        """
+        obj = self.cache.get(kind, key)
+        self._count("cache_hits" if obj is not None else "cache_misses")
+        return obj
+
+    def _keep_parse(self, kind, url, obj, resp):
+        """
+        cache something parsed from the response for the url, sized by the response it came from
+        """
+        self.cache.put(kind, url, obj, estimate(kind, len(resp.content), self.html_parser))
+        if self.drop_parsed_bodies:
+            self._drop_body(url)
+
+    def _drop_body(self, url):
+        """
+        Once the response for the url has been parsed into everything it is used as, replace it
+        in the cache with a copy without its body.  The status and headers are still there for
+        anyone who wants them; anyone who wants the body will fetch it again, as it is marked as
+        read up to a limit of nothing.  Whoever holds the response itself still has all of it
+        """
+        resp = self.cache.get(RESPONSE, url)
+        if resp is None or getattr(resp, "truncated", False):
+            return
+        derived = DERIVED.get(getattr(resp, "read_as", None))
+        if derived is None:
+            return
+        for kind in derived:
+            if not self.cache.contains(kind, url):
+                return
+        stub = Response()
+        stub.url = resp.url
+        stub.status_code = resp.status_code
+        stub.headers = resp.headers
+        stub.encoding = resp.encoding
+        stub._content = b""
+        stub._content_consumed = True
+        stub.truncated = True
+        stub.byte_limit = 0
+        stub.read_as = resp.read_as
+        self.cache.put(RESPONSE, url, stub, estimate(RESPONSE, 0))
+
+    def _count(self, counter, n=1):
+        if self.stats is not None:
+            self.stats.count(counter, n)
+
+    def lock(self, key):
+        """
+        Get the lock for a cache key.  Detectors may run concurrently, so anything
+        which fills the cache holds the key's lock, and other threads wanting the
+        same key wait for the first to finish rather than repeating the work
+        """
+        with self._locks_lock:
+            l = self._locks.get(key)
+            if l is None:
+                l = threading.RLock()
+                self._locks[key] = l
+            return l
+
+    def url_get(self, url, kind=None):
+        """
+        Fetch the url, reading no more of the body than the limit for the kind of document
+        the caller wants it as ("html", "xml", "feed", "rdf" or "json"), and none of it if the
+        server says it is of a type which isn't that kind.  See _read
+        """
+        with self.lock(url):
+            try:
+                # have we already tried and found the url timed out?
+                if self.cache.get(FAILED, url, False):
+                    return None
+
+                # or already know that its host doesn't resolve
+                if self.resolver.failed(host_of(url)):
+                    return None
+
+                # have we already tried and successfully received a response, and read as much
+                # of it as we now want
+                resp = self.cache.get(RESPONSE, url)
+                if resp is not None:
+                    if not getattr(resp, "truncated", False) or resp.byte_limit >= self.fetch_limit(kind):
+                        self._count("cache_hits")
+                        return resp
+
+                # has this or another process fetched it recently enough
+                entry = None
+                if self.http_cache is not None:
+                    entry = self.http_cache.get(url)
+                    if entry is not None and self.http_cache.is_fresh(entry):
+                        if entry["negative"]:
+                            self.cache.put(FAILED, url, True)
+                            return None
+                        resp = self.http_cache.response(entry)
+                        self._keep_response(url, resp, kind)
+                        self._count("cache_hits")
+                        return resp
+
+                # if not, try, get a response and cache then return.  If we have a stale copy,
+                # ask the server whether it has changed.
+                # note that we're ignoring any ssl errors here
+                if self._closed:
+                    log.info("Not fetching " + url + ": the discovery it was for is over")
+                    return None
+                if self.expired():
+                    log.info("Not fetching " + url + ": out of time")
+                    return None
+                headers = {"Accept-Language" : self.accept_language}
+                if self.http_cache is not None:
+                    headers.update(self.http_cache.validators(entry))
+                self._count("cache_misses")
+                resp = self._polite_get(url, headers, kind)
+                if resp is None:
+                    return None
+
+                if self.http_cache is not None:
+                    if resp.status_code == 304 and entry is not None and not entry["negative"]:
+                        self.http_cache.refresh(url)
+                        resp = self.http_cache.response(entry)
+                    elif not resp.truncated:
+                        # a partial body would later be taken for the whole thing
+                        self.http_cache.put(url, resp)
+
+                self._keep_response(url, resp, kind)
+                return resp
+
+            except requests.exceptions.ConnectionError:
+                self._fetch_failed(url)
+                return None
+            except requests.exceptions.Timeout:
+                # if it was us who ran out of time, that says nothing about the url
+                if not self.expired():
+                    self._fetch_failed(url)
                 return None
 
-            # have we already tried and successfully received a response
-            if self.get(url) is not None:
-                return self.get(url)
+    def _keep_response(self, url, resp, kind):
+        if getattr(resp, "read_as", None) is None:
+            resp.read_as = kind
+        self.cache.put(RESPONSE, url, resp, estimate(RESPONSE, len(resp.content)))
 
-            # if not, try, get a response and cache then return
-            # note that we're ignoring any ssl errors here
-            headers = {"Accept-Language" : self.accept_language}
-            resp = requests.get(url, timeout=self.request_timeout, verify=False, headers=headers)
-            self.set(url, resp)
-            return resp
+    def _polite_get(self, url, headers, kind):
+        """
+        Fetch and read the url when the politeness gate for its host lets us.  If the server
+        answers 429 or 503 with a Retry-After we can afford to wait for, nothing more goes to the
+        host until then and the request is tried once more.  Returns None without trying if the
+        host has asked us to stay away for longer than that
+        """
+        host = host_of(url)
+        for attempt in range(2):
+            if self.politeness.blocked_for(host) > self.max_retry_after:
+                log.info("Not fetching " + url + ": " + host + " has asked us to back off")
+                return None
 
-        except requests.exceptions.ConnectionError:
-            self.set("timeout_" + url, True)
-            return None
-        except requests.exceptions.Timeout:
-            self.set("timeout_" + url, True)
+            with self.politeness.slot(host):
+                session = self.session(url)
+                if session is None or self.expired():
+                    return None
+                resp = session.get(url, timeout=self.fetch_timeout(), verify=False, headers=headers, stream=True)
+                self._read(url, resp, kind)
+            self._count("fetches")
+            self._count("bytes", len(resp.content))
+
+            if resp.status_code != 429 and resp.status_code != 503:
+                return resp
+            wait = retry_after(resp.headers.get("retry-after"))
+            if wait is None:
+                return resp
+            log.info(host + " asked us to retry after " + str(wait) + " seconds")
+            self.politeness.back_off(host, wait)
+            remaining = self.remaining()
+            if wait > self.max_retry_after or (remaining is not None and wait >= remaining):
+                return resp
+        return resp
+
+    def fetch_limit(self, kind):
+        return self.fetch_limits.get(kind, self.fetch_limits["default"])
+
+    def _read(self, url, resp, kind):
+        """
+        Read the body of a streamed response, up to the limit for the kind of document it is
+        wanted as.  How much was read is recorded on the response: truncated if it was cut
+        short (or not read at all, being the wrong type), and byte_limit, the limit it was read under.
+        Raises Timeout if the deadline passes while it is being read
+        """
+        limit = self.fetch_limit(kind)
+        resp.read_as = kind
+        if not self._type_matches(resp, kind):
+            log.info("Not reading " + url + " as " + str(kind) + ": it is " + str(resp.headers.get("content-type")))
+            limit = 0
+        resp.byte_limit = limit
+
+        chunks = []
+        size = 0
+        truncated = limit == 0
+        if limit > 0:
+            for chunk in resp.iter_content(self.fetch_chunk_size):
+                if self.expired():
+                    discard_connection(resp)
+                    raise requests.exceptions.Timeout("Ran out of time reading " + url)
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > limit:
+                    log.info("Stopped reading " + url + " after " + str(limit) + " bytes")
+                    truncated = True
+                    break
+
+        resp._content = b"".join(chunks)[:limit]
+        resp._content_consumed = True
+        resp.truncated = truncated
+        if truncated:
+            discard_connection(resp)
+
+    def _type_matches(self, resp, kind):
+        types = self.parseable_types.get(kind)
+        if types is None:
+            return True
+        ctype = (resp.headers.get("content-type") or "").split(";")[0].strip().lower()
+        if ctype == "":
+            return True
+        for t in types:
+            if ctype == t or (t.startswith("+") and ctype.endswith(t)):
+                return True
+        return False
+
+    def parseable(self, resp, kind):
+        """
+        Whether a response looks like the kind of document we want to parse it as: its content
+        type (if it has one) is right for that kind, and it isn't obviously a binary file
+        """
+        if not self._type_matches(resp, kind):
+            return False
+        head = resp.content[:4]
+        for sig in self.binary_signatures:
+            if head.startswith(sig):
+                return False
+        return True
+
+    def _fetch_failed(self, url):
+        self.cache.put(FAILED, url, True)
+        if self.http_cache is not None:
+            self.http_cache.put_negative(url)
+
+    def resolve(self, host):
+        """
+        The addresses of the host (IPv4 first), or None if it does not resolve
+        """
+        return self.resolver.resolve(host)
+
+    def geolocate(self, ip):
+        """
+        The ISO 3166-1 code of the country the ip address is in, according to the offline
+        database, or None if there is no database or it doesn't know
+        """
+        if self.geoip is None:
             return None
+        return self.geoip.country(ip)
+
+    def fetch_pool(self):
+        """
+        The bounded pool of threads used to issue fetches concurrently.  url_get
+        is safe to call from many threads at once, so anything can be submitted here.  Once
+        the Info is closed, nothing more can be submitted, and this raises RuntimeError
+        """
+        with self._locks_lock:
+            if self._closed:
+                raise RuntimeError("Cannot fetch through a closed Info")
+            if self._fetch_pool is None:
+                self._fetch_pool = ThreadPoolExecutor(max_workers=self.max_fetch_workers)
+            return self._fetch_pool
+
+    def url_get_all(self, urls, kind=None):
+        """
+        Fetch all of the urls concurrently, and return the responses in the same order
+        as the urls (None for any which did not respond)
+        """
+        futures = [self._submit_get(url, kind) for url in urls]
+        return [f.result() for f in futures]
+
+    def _submit_get(self, url, kind):
+        try:
+            return self.fetch_pool().submit(bind(self.url_get), url, kind)
+        except RuntimeError:
+            # closed, so there is nothing more to fetch
+            f = Future()
+            f.set_result(None)
+            return f
+
+    def url_get_first(self, urls, accept, kind=None):
+        """
+        Fetch all of the urls concurrently, and return a tuple of (url, response) for the
+        first response to come back which the accept function approves of.  Fetches which
+        have not started by then are cancelled.  Returns (None, None) if nothing is acceptable
+        """
+        futures = {}
+        for url in urls:
+            futures[self._submit_get(url, kind)] = url
+        try:
+            for f in as_completed(futures.keys()):
+                resp = f.result()
+                if resp is not None and accept(resp):
+                    return futures[f], resp
+            return None, None
+        finally:
+            for f in futures.keys():
+                f.cancel()
 
     def soup(self, url):
-        s = self.get("soup_" + url)
-        if s is not None:
-            return s
-        resp = self.url_get(url)
-        if resp is None:
+        # the parsed page is only kept as part of its index
+        p = self.page(url)
+        if p is None:
             return None
-        s = BeautifulSoup(resp.text)
-        self.set("soup_" + url, s)
-        return s
+        return p.soup
+
+    def page(self, url):
+        with self.lock("page_" + url):
+            p = self.cached(PAGE, url)
+            if p is not None:
+                return p
+            resp = self.url_get(url, "html")
+            if resp is None or not self.parseable(resp, "html"):
+                return None
+            p = PageIndex(htmlparse.parse(resp.text, self.html_parser), url)
+            self._keep_parse(PAGE, url, p, resp)
+            return p
 
     def graph(self, url, mimetype=None):
-        g = self.get("graph_" + url)
-        if g is not None:
+        with self.lock("graph_" + url):
+            g = self.cached(GRAPH, url)
+            if g is not None:
+                return g
+            if not mimetype:
+                mimetype = rdflib.util.guess_format(url)
+            if mimetype is None:
+                return
+            resp = self.url_get(url, "rdf")
+            if resp is None or not self.parseable(resp, "rdf"):
+                return None
+            g = rdflib.Graph()
+            g.parse(format=mimetype, data=resp.text)
+            self._keep_parse(GRAPH, url, g, resp)
             return g
-        if not mimetype:
-            mimetype = rdflib.util.guess_format(url)
-        if mimetype is None:
-            return
-        resp = self.url_get(url)
-        if resp is None:
-            return None
-        g = rdflib.Graph()
-        g.parse(format=mimetype, data=resp.text)
-        self.set("graph_" + url, g)
-        return g
 
     def whois(self, host):
-        who = self.get("whois_" + host)
-        if who is not None:
+        # whois records belong to the registered domain, so all hosts under it can share one
+        domain = registrable_domain(host)
+        with self.lock("whois_" + domain):
+            who = self.cached(WHOIS, domain)
+            if who is not None:
+                return who
+
+            body = None
+            if self.whois_cache is not None:
+                body = self.whois_cache.get(domain)
+
+            if body is not None:
+                who = WhoIsWrapper(domain, body)
+            elif self._closed or self.expired():
+                # the lookup can't be cut short, so don't start one
+                return None
+            else:
+                # whois servers are run per registry, and ban clients who query them too often
+                self.whois_limiter.acquire(domain.split(".")[-1])
+                if self._closed:
+                    return None
+                log.info("Looking up whois record for " + domain)
+                self._count("whois_lookups")
+                who = WhoIsWrapper(domain)
+                if self.whois_cache is not None:
+                    self.whois_cache.put(domain, who.body)
+
+            self.cache.put(WHOIS, domain, who, estimate(WHOIS, None) + len(who.body or ""))
             return who
-        who = WhoIsWrapper(host)
-        self.set("whois_" + host, who)
-        return who
 
     def feed(self, url):
-        f = self.get("feed_" + url)
-        if f is not None:
+        with self.lock("feed_" + url):
+            f = self.cached(FEED, url)
+            if f is not None:
+                return f
+            resp = self.url_get(url, "feed")
+            if resp is None or not self.parseable(resp, "feed"):
+                return None
+            f = feedparser.parse(resp.text)
+            self._keep_parse(FEED, url, f, resp)
             return f
-        resp = self.url_get(url)
-        if resp is None:
-            return None
-        f = feedparser.parse(resp.text)
-        self.set("feed_" + url, f)
-        return f
+
+    def feed_header(self, url):
+        """
+        type, version, title and subtitle of the feed at the url (as sniff_feed), without parsing
+        the whole thing unless it isn't well enough formed to read; None if it isn't a feed
+        """
+        with self.lock("feed_header_" + url):
+            h = self.cached(FEED_HEADER, url)
+            if h is not None:
+                return h
+            resp = self.url_get(url, "feed")
+            if resp is None or not self.parseable(resp, "feed"):
+                return None
+            read, h = sniff_feed(resp.content)
+            if not read:
+                f = self.feed(url)
+                if f is None or not f.version:
+                    return None
+                h = {
+                    "type" : "atom" if f.version.startswith("atom") else "rss",
+                    "version" : f.version if f.bozo == 0 else None,
+                    "title" : f.feed.get("title"),
+                    "subtitle" : f.feed.get("subtitle") or f.feed.get("description")
+                }
+            if h is None:
+                return None
+            self._keep_parse(FEED_HEADER, url, h, resp)
+            return h
 
     def xml(self, url):
-        x = self.get("xml_" + url)
-        if x is not None:
+        with self.lock("xml_" + url):
+            x = self.cached(XML, url)
+            if x is not None:
+                return x
+            resp = self.url_get(url, "xml")
+            if resp is None or not self.parseable(resp, "xml"):
+                return None
+            try:
+                x = etree.parse(BytesIO(bytearray(resp.text, "utf-8")), xml_parser())
+            except:
+                return None
+            self._keep_parse(XML, url, x, resp)
             return x
-        resp = self.url_get(url)
-        if resp is None:
-            return None
-        try:
-            x = etree.parse(BytesIO(bytearray(resp.text, "utf-8")))
-        except:
-            return None
-        self.set("xml_" + url, x)
-        return x
 
 class Detector(object):
+    # the Register fields this detector looks at and the ones it fills in.  The scheduler
+    # uses these to decide which detectors have to wait for which, and runs the rest
+    # concurrently
+    reads = []
+    writes = []
+
+    # bump the version when a detector's logic changes, so that the results it recorded in a
+    # DetectionLedger are detected again.  max_age is how many seconds those results are good
+    # for, if it is not the ledger's own ttl
+    version = 1
+    max_age = None
+
     def name(self):
         return "Abstract Detector"
     def detectable(self, register):
@@ -180,26 +1129,7 @@ class Detector(object):
         pass
 
     def _expand_url(self, origin_url, rel):
-        if rel.startswith("http://") or rel.startswith("https://"):
-            return rel
-
-        parsed = urlparse(origin_url)
-
-        if rel.startswith("/"):
-            # absolute to the base of the domain
-            return parsed.scheme + "://" + parsed.netloc + rel
-        else:
-            full = parsed.scheme + "://" + parsed.netloc + parsed.path
-            if full.endswith("/"):
-                return full + rel
-            else:
-                parts = full.split("/")
-                if len(parts) == 3:
-                    return full + "/" + rel
-                elif len(parts) > 3:
-                    return "/".join(full[:-1]) + "/" + rel
-
-        return None
+        return expand_url(origin_url, rel)
 
 class DetectorException(Exception):
     pass
@@ -210,6 +1140,12 @@ class DetectorException(Exception):
 class OperationalStatus(Detector):
     """Attempts to determine if the repository is operational"""
 
+    reads = ["repo_url"]
+    writes = ["operational_status"]
+
+    # repositories come and go much more often than the rest changes
+    max_age = 86400
+
     ip_rx = "(([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])\.){3}([0-9]|[1-9][0-9]|1[0-9]{2}|2[0-4][0-9]|25[0-5])"
 
     def name(self):
@@ -231,7 +1167,7 @@ class OperationalStatus(Detector):
         url = register.repo_url
 
         log.info("Requesting repository home page from " + url)
-        resp = info.url_get(url)
+        resp = info.url_get(url, "html")
         if resp is None:
             log.info("Repository did not respond - registering operational_status as Broken")
             register.operational_status = "Broken"
@@ -267,6 +1203,9 @@ class OperationalStatus(Detector):
         return m is not None
 
 class Country(Detector):
+    reads = ["repo_url"]
+    writes = ["country", "country_code"]
+
     hostip_api = "http://api.hostip.info/get_json.php"
 
     tld_map = {
@@ -307,11 +1246,29 @@ class Country(Detector):
             pass
 
         # if we get down to here we have to try and geolocate the ip
-        ip = socket.gethostbyname(parsed.netloc)
+        addresses = info.resolve(host)
+        if addresses is None:
+            log.info("Unable to geolocate " + host + " as it does not resolve")
+            return
+        ip = addresses[0]
+
+        # the offline database is much quicker than asking hostip, and works without a network
+        for address in addresses:
+            code = info.geolocate(address)
+            if code is None:
+                continue
+            try:
+                c = pycountry.countries.get(alpha2=code)
+                log.info("GeoLocated country from IP using local database: " + address + " -> " + c.name)
+                register.set_country(name=c.name, code=c.alpha2)
+                return
+            except KeyError:
+                pass
+
         r = self.hostip_api + "?ip=" + ip
         log.info("GeoLocating IP using: " + r)
 
-        resp = info.url_get(r)
+        resp = info.url_get(r, "json")
         if resp is None:
             return
 
@@ -328,6 +1285,9 @@ class Country(Detector):
         log.info("Unable to determine country for " + url)
 
 class Continent(Detector):
+    reads = ["country_code"]
+    writes = ["continent", "continent_code"]
+
     def name(self):
         return "Continent"
 
@@ -346,6 +1306,9 @@ class Continent(Detector):
         log.info("Determined continent from country: " + code + " -> " + continent)
 
 class Language(Detector):
+    reads = ["repo_url", "country_code"]
+    writes = ["language", "language_code"]
+
     def name(self):
         return "Language"
 
@@ -360,7 +1323,7 @@ class Language(Detector):
 
     def detect(self, register, info):
         # get the repo page (from cache or from the url)
-        resp = info.url_get(register.repo_url)
+        resp = info.url_get(register.repo_url, "html")
 
         # first thing is to check the http headers for a content-language
         if resp is not None:
@@ -417,29 +1380,17 @@ class Language(Detector):
         return lang, None
 
     def _get_territory_languages(self, territory):
-        thisdir = os.path.dirname(os.path.realpath(__file__))
-        sd = os.path.join(thisdir, "supplementalData.xml")
-        langtree = etree.parse(open(sd))
-
-        try:
-            ti = langtree.xpath("territoryInfo/territory[@type='" + territory.upper() + "']")[0]
-        except IndexError:
+        # the table is precompiled from supplementalData.xml by scripts/territory_languages.py: if
+        # there is only one language for the territory it is the one, otherwise the official ones
+        langs = TERRITORY_LANGUAGES.get(territory.upper())
+        if langs is None:
             return None
-
-        lps = ti.findall("languagePopulation")
-
-        # if there is only one language, it is the one
-        if len(lps) == 1:
-            return [lps[0].get("type")]
-
-        territory_languages = []
-        for lp in lps:
-            if lp.get("officialStatus") == "official":
-                territory_languages.append(lp.get("type"))
-
-        return list(set(territory_languages))
+        return list(langs)
 
 class RepositoryType(Detector):
+    reads = ["repo_url"]
+    writes = ["repository_type"]
+
     # Some weak attempts to differentiate between the different types of repo based on their url suffix
     # At best is indicative.
     institutional_suffix = [
@@ -512,9 +1463,18 @@ class RepositoryType(Detector):
             log.info("Unable to guess Repository Type, so falling back to Institutional")
 
 class Software(Detector):
-    immediate_accept_threshold = 0.8
+    reads = ["repo_url"]
+    writes = ["software"]
+
+    # a platform must be identified with more than this confidence to be recorded
     acceptable_threshold = 0.5
 
+    # the compiled fingerprint rules, shared by all the detectors
+    fingerprinter = Fingerprinter()
+
+    # 2: identified from the fingerprint rules, for more platforms
+    version = 2
+
     def name(self):
         return "Software"
 
@@ -526,43 +1486,35 @@ class Software(Detector):
         return register.software is None or len(register.software) == 0
 
     def detect(self, register, info):
-        # define the order we will run our identify functions in
-        stack = [self.is_dspace, self.is_eprints]
-        options = []
-
-        # for each identify function, run it, then check to see if it has identified the software with
-        # sufficient confidence.  If so, record and return.  If not, add it to the list of options, and
-        # carry on
-        for f in stack:
-            software = f(register, info)
-            if software is not None:
-                if software.get("confidence", 0) >= self.immediate_accept_threshold:
-                    self._record(register, info, software)
-                    info.set("software_confidence", software.get("confidence", 0))
-                    return
-                else:
-                    options.append(software)
+        # get the repo page (from cache or from the url), and its index
+        resp = info.url_get(register.repo_url, "html")
+        page = info.page(register.repo_url)
+
+        # scan the page and the url once against the fingerprints of all the platforms we know
+        generator = page.meta("Generator") if page is not None else []
+        links = [link.get("title") for link in page.links] if page is not None else []
+        body = resp.text if resp is not None and info.parseable(resp, "html") else None
+        candidates = self.fingerprinter.identify(url=register.repo_url, generator=generator, links=links, body=body)
+        if len(candidates) == 0:
+            return
 
-        if len(options) == 0:
+        best = candidates[0]
+        if best["confidence"] <= self.acceptable_threshold:
             return
-        if len(options) == 1:
-            if options[0].get("confidence", 0) > self.acceptable_threshold:
-                self._record(register, info, options[0])
-                info.set("software_confidence", software.get("confidence", 0))
-                return
 
-        best = None
-        for o in options:
-            if best is None:
-                best = o
-                continue
-            if o.get("confidence", 0) > best.get("confidence", 0):
-                best = o
-        if best is not None:
-            if best.get("confidence", 0) > self.acceptable_threshold:
-                self._record(register, info, options[0])
-                info.set("software_confidence", software.get("confidence", 0))
+        # EPrints' repository summary RDF has the full version in it, where the page may only give
+        # the major one (in "powered by EPrints 3")
+        if best["name"] == "EPrints" and "." not in (best["version"] or "") and page is not None:
+            for link in page.links:
+                if (link.get("title") or "").startswith("Repository Summary") and link.get("url") is not None:
+                    log.info("Checking EPrints RDF file at " + link.get("url"))
+                    version = self._eprints_summary_version(info, link.get("url"), link.get("type"))
+                    if version is not None:
+                        best["version"] = version
+                    break
 
+        self._record(register, info, best)
+        info.set("software_confidence", best["confidence"])
 
     def _record(self, register, info, software):
         register.add_software(software["name"], software["version"], software["url"])
@@ -571,138 +1523,31 @@ class Software(Detector):
             v = "(no version)"
         log.info("Repository is identified as " + software["name"] + " " + v + " with confidence " + str(software.get("confidence")))
 
-    def is_dspace(self, register, info):
-        # get the repo page (from cache or from the url)
-        resp = info.url_get(register.repo_url)
-
-        # get the beautifulsoup of the home page
-        soup = info.soup(register.repo_url)
-
-        # template object that we will return upon success
-        software = {"name" : "DSpace", "version": None, "url" : "http://dspace.org", "confidence" : 0}
-
-        # may have <meta name="Generator" content="DSpace 3.1" /> in the html headers (has the version back to ~1.8)
-        if soup is not None:
-            for meta in soup.find_all("meta"):
-                if meta.get("name") == "Generator":
-                    content = meta.get("content")
-                    if content is not None and content.strip().startswith("DSpace"):
-                        software["confidence"] = 1.0
-                        parts = content.strip().split(" ")
-                        if len(parts) == 2:
-                            software["version"] = parts[1]
-                        return software
-
-        # embedded opensearch link title may be "DSpace"
-        if soup is not None:
-            for link in soup.find_all("link"):
-                if link.get("type") == "application/opensearchdescription+xml":
-                    if link.get("title") == "DSpace":
-                        software["confidence"] = 1.0
-                        return software
-
-        # may contain <a href="/dspace/help/index.html" target="dspacepopup">Help</a> somewhere
-        if resp is not None:
-            if 'target="dspacepopup">Help' in resp.text:
-                software["confidence"] = 1.0
-                return software
-
-        # may have "dspace" in the URL
-        if "dspace" in register.repo_url.lower():
-            software["confidence"] = 0.9
-            return software
-
-        # may have "jspui" or "xmlui" in the url
-        if "jspui" in register.repo_url.lower():
-            software["confidence"] = 0.9
-            return software
-        if "xmlui" in register.repo_url.lower():
-            software["confidence"] = 0.9
-            return software
-
-        # may contain the phrase "Communities & Collections" on the home page
-        if soup is not None:
-            if "Communities & Collections" in soup.get_text():
-                software["confidence"] = 0.8
-                return software
-
-        # May contain the word DSpace in a heading tag somewhere
-        if resp is not None:
-            if "dspace" in resp.text or "DSpace" in resp.text:
-                software["confidence"] = 0.5
-                return software
-
-        return None
-
-    def is_eprints(self, register, info):
-        # get the repo page (from cache or from the url)
-        resp = info.url_get(register.repo_url)
-
-        # get the beautifulsoup of the home page
-        soup = info.soup(register.repo_url)
-
-        # template object that we will return upon success
-        software = {"name" : "EPrints", "version": None, "url" : "http://eprints.org", "confidence" : 0}
-
-        # may have <meta name="Generator" content="EPrints 3.3.11" /> in the html headers
-        if soup is not None:
-            for meta in soup.find_all("meta"):
-                if meta.get("name") == "Generator":
-                    content = meta.get("content")
-                    if content is not None and content.strip().startswith("EPrints"):
-                        software["confidence"] = 1.0
-                        parts = content.strip().split(" ")
-                        if len(parts) == 2:
-                            software["version"] = parts[1]
-                        return software
-
-        # may have repository summary link in RDF which will contain the eprints version in rdfs:comment
-        if soup is not None:
-            for link in soup.find_all("link"):
-                if link.get("title", "").startswith("Repository Summary"):
-                    software["confidence"] = 1.0
-                    log.info("Checking EPrints RDF file at " + link.get("href"))
-                    g = info.graph(link.get("href"), link.get("type"))
-                    self._eprints_extract_from_rdf(g, software)
-                    return software
-
-        # some or all of the following:
-        # powered by <em><a href="http://eprints.org/software/">EPrints 3</a></em>
-        # which is developed by the <a href="http://www.ecs.soton.ac.uk/">School of Electronics and Computer Science</a>
-        # at the University of Southampton. <a href="http://aquaticcommons.org/eprints/">More information and software credits</a>.
-
-        if resp is not None:
-            if 'powered by <em><a href="http://eprints.org/software/">EPrints 3</a></em>' in resp.text:
-                software["confidence"] = 1.0
-                software["version"] = "3"
-                return software
-            if 'developed by the <a href="http://www.ecs.soton.ac.uk/">School of Electronics and Computer Science</a>' in resp.text:
-                software["confidence"] = 0.8
-                return software
-
-        # may have eprints or e-prints in the url
-        if "eprints" in register.repo_url.lower() or "e-prints" in register.repo_url.lower():
-            software["confidence"] = 0.5
-            return software
+    def _eprints_summary_version(self, info, url, mimetype):
+        # we only want the one comment, so read up to it rather than parsing the whole (often large)
+        # document into a graph, unless it's in a form that can't be read that way
+        if not mimetype:
+            mimetype = rdflib.util.guess_format(url)
+        resp = info.url_get(url, "rdf")
+        if resp is None or not info.parseable(resp, "rdf"):
+            return None
+        read, version = eprints_version_from_summary(resp.content, mimetype)
+        if read:
+            return version
 
+        g = info.graph(url, mimetype)
+        if g is None:
+            return None
+        for s, p, o in g.triples((None, rdflib.URIRef(RDFS_COMMENT), None)):
+            version = eprints_version(o)
+            if version is not None:
+                return version
         return None
 
-    def _eprints_extract_from_rdf(self, g, software):
-        # one of the comments contains some useful info about the eprints version
-        useful = None
-        for s,o,p in g.triples((None, rdflib.URIRef("http://www.w3.org/2000/01/rdf-schema#comment"), None)):
-            if p.startswith("This system is running eprints server software"):
-                useful = p
-                break
-
-        if useful is not None:
-            pattern = "\(EPrints (.+?) "
-            m = re.search(pattern, useful)
-            if m is not None:
-                version = m.group(1)
-                software["version"] = version
-
 class Organisation(Detector):
+    reads = ["repo_url"]
+    writes = ["organisation"]
+
     def name(self):
         return "Organisation"
 
@@ -722,6 +1567,8 @@ class Organisation(Detector):
         # do the lookup.  This helpfully recurses up the domain tree until it
         # gets an answer
         who = info.whois(host)
+        if who is None:
+            return
 
         # try to extract the org details from the whois record
         name = who.get("org_name")
@@ -746,6 +1593,8 @@ class Organisation(Detector):
         register.add_organisation_object(org)
 
 class Feed(Detector):
+    reads = ["repo_url"]
+    writes = ["api"]
 
     type_map = {
         "application/rss+xml" : "rss",
@@ -779,13 +1628,13 @@ class Feed(Detector):
         # if one of rss or atom is not set
         rss = register.get_api("rss")
         atom = register.get_api("atom")
-        hasrss = rss is None or len(rss) == 0
-        hasatom = atom is None or len(atom) == 0
-        return not (hasrss and hasatom) # if it doesn't have both try again
+        norss = rss is None or len(rss) == 0
+        noatom = atom is None or len(atom) == 0
+        return norss or noatom # if it doesn't have both try again
 
     def detect(self, register, info):
-        soup = info.soup(register.repo_url)
-        if soup is None:
+        page = info.page(register.repo_url)
+        if page is None:
             return
 
         # look in the link headers in the html
@@ -793,22 +1642,17 @@ class Feed(Detector):
         # <link type="application/rss+xml" rel="alternate" href="/feed/rss_2.0/site" />
         # <link type="application/atom+xml" rel="alternate" href="/feed/atom_1.0/site" />
         alts = []
-        for link in soup.find_all("link"):
-            rels = link.get("rel")
-            if rels is None:
-                continue
-            if "alternate" in rels:
-                if link.get("type") is not None and link.get("type") in ["application/rss+xml", "application/atom+xml"]:
-                    url = self._expand_url(register.repo_url, link.get("href"))
-                    if url is not None:
-                        alts.append((url, link.get("type")))
+        for link in page.links_by_rel("alternate"):
+            if link.get("type") is not None and link.get("type") in ["application/rss+xml", "application/atom+xml"]:
+                if link.get("url") is not None:
+                    alts.append((link.get("url"), link.get("type")))
 
         for url, mime in alts:
-            feed = info.feed(url)
+            header = info.feed_header(url)
             api = {"api_type" : self.type_map.get(mime), "base_url" :  url}
 
-            if feed.bozo == 0:
-                v = self.version_map.get(feed.version)
+            if header is not None:
+                v = self.version_map.get(header.get("version"))
                 if v is not None:
                     api["version"] = v
 
@@ -820,26 +1664,31 @@ class Feed(Detector):
         # <a href="/feed/rss_2.0/site" style="background: url(/static/icons/feed.png) no-repeat">RSS 2.0</a>
         # <a href="/feed/atom_1.0/site" style="background: url(/static/icons/feed.png) no-repeat">Atom</a>
         possibles = []
-        for a in soup.find_all("a"):
-            norm = " " + a.text.lower().strip() + " "
-            url = self._expand_url(register.repo_url, a.get("href"))
+        for a in page.anchors:
+            if a.get("url") is None:
+                continue
+            norm = " " + a.get("text").lower().strip() + " "
+            url = a.get("url")
             if " rss " in norm:
                 possibles.append((url, "rss"))
             elif " atom " in norm:
                 possibles.append((url, "atom"))
 
         for url, t in possibles:
-            feed = info.feed(url)
-            if feed.bozo > 0:
+            header = info.feed_header(url)
+            if header is None:
                 continue
-            api = {"api_type" : t, "base_url" : url}
-            v = self.version_map.get(feed.version)
+            api = {"api_type" : header.get("type", t), "base_url" : url}
+            v = self.version_map.get(header.get("version"))
             api["version"] = v
 
             log.info(api.get("api_type") + " at " + api.get("base_url") + " detected from html body")
             register.add_api_object(api)
 
 class OAI_PMH(Detector):
+    reads = ["repo_url"]
+    writes = ["api"]
+
     guesses = [
         "/oai",
         "/oaipmh",
@@ -862,19 +1711,14 @@ class OAI_PMH(Detector):
         return pmh is None or len(pmh) == 0
 
     def detect(self, register, info):
-        oai = None
-        for guess in self.guesses:
-            url = self._expand_url(register.repo_url, guess)
-            resp = info.url_get(url + "?verb=Identify")
-            if resp is None:
-                continue
-            if resp.status_code == requests.codes.ok:
-                oai = url
-                break
+        # probe all the guesses at once, and go with the first one which responds
+        identifies = [self._expand_url(register.repo_url, guess) + "?verb=Identify" for guess in self.guesses]
+        identify, resp = info.url_get_first(identifies, lambda r: r.status_code == requests.codes.ok and info.parseable(r, "xml"), "xml")
 
-        if oai is None:
+        if identify is None:
             log.info("Unable to locate OAI-PMH endpoint which responds")
             return
+        oai = identify[:-len("?verb=Identify")]
 
         # we have an oai endpoint
 
@@ -884,7 +1728,7 @@ class OAI_PMH(Detector):
             log.info("Detected possible OAI-PMH at " + oai + " but unable to parse feed")
             return
 
-        info.set("oai_identify", url + "?verb=Identify")
+        info.set("oai_identify", identify)
         log.info("OAI-PMH found by guessing at " + oai)
         api = {"api_type" : "oai-pmh", "base_url" : oai}
 
@@ -895,6 +1739,10 @@ class OAI_PMH(Detector):
             api["version"] = v
 
         lmfdoc = info.xml(oai + "?verb=ListMetadataFormats")
+        if lmfdoc is None:
+            register.add_api_object(api)
+            return
+
         lmf = lmfdoc.getroot()
         for element in lmf.xpath("//*[local-name() = 'metadataFormat']"):
             prefix = None
@@ -923,6 +1771,9 @@ class OAI_PMH(Detector):
         register.add_api_object(api)
 
 class Sword(Detector):
+    reads = ["repo_url", "software"]
+    writes = ["api"]
+
     guesses = [
         "/sword/servicedocument",
         "/sword/service-document",
@@ -948,36 +1799,27 @@ class Sword(Detector):
         # first check standard sword auto-discovery
         # <html:link rel="sword" href="[Service Document URL]"/> <!-- probably v1 -->
         # <html:link rel="http://purl.org/net/sword/discovery/service-document" href="[Service Document URL]"/> <!-- probably v2 -->
-        soup = info.soup(register.repo_url)
-        if soup is not None:
-            links = soup.find_all("link")
-            for link in links:
-                rels = link.get("rel")
-                if rels is None:
-                    continue
-
-                # the swordv1 case
-                if "sword" in rels:
-                    path = link.get("href")
-                    url = self._expand_url(register.repo_url, path)
-                    api = {"api_type" : "sword", "version" : "1.3", "base_url" : url}
-                    self._add_info(api, info)
-                    log.info("Found SWORD 1.3 url in link headers: " + url)
-                    register.add_api_object(api)
-
-                # the swordv2 case
-                if "http://purl.org/net/sword/discovery/service-document" in rels:
-                    path = link.get("href")
-                    url = self._expand_url(register.repo_url, path)
-                    api = {"api_type" : "sword", "version" : "2.0", "base_url" : url}
-                    self._add_info(api, info)
-                    log.info("Found SWORD 2.0 url in link headers: " + url)
-                    register.add_api_object(api)
-
-        # now try the standard guesses
-        for guess in self.guesses:
-            url = self._expand_url(register.repo_url, guess)
-            resp = info.url_get(url)
+        page = info.page(register.repo_url)
+        if page is not None:
+            # the swordv1 case
+            for link in page.links_by_rel("sword"):
+                url = link.get("url")
+                api = {"api_type" : "sword", "version" : "1.3", "base_url" : url}
+                self._add_info(api, info)
+                log.info("Found SWORD 1.3 url in link headers: " + url)
+                register.add_api_object(api)
+
+            # the swordv2 case
+            for link in page.links_by_rel("http://purl.org/net/sword/discovery/service-document"):
+                url = link.get("url")
+                api = {"api_type" : "sword", "version" : "2.0", "base_url" : url}
+                self._add_info(api, info)
+                log.info("Found SWORD 2.0 url in link headers: " + url)
+                register.add_api_object(api)
+
+        # now try the standard guesses, all at once
+        urls = [self._expand_url(register.repo_url, guess) for guess in self.guesses]
+        for url, resp in zip(urls, info.url_get_all(urls, "xml")):
             if resp is None:
                 continue
             if not (resp.status_code == requests.codes.ok or resp.status_code == 401 or resp.status_code == 403):
@@ -985,12 +1827,16 @@ class Sword(Detector):
 
             api = {"api_type" : "sword", "base_url" : url}
             self._guess_version(api, register)
-            self._add_info(api, info)
+            self._add_info(api, info, resp)
             log.info("Found SWORD url by guessing: " + url)
             register.add_api_object(api)
 
-    def _add_info(self, api, info):
-        resp = info.url_get(api["base_url"])
+    def _add_info(self, api, info, resp=None):
+        # use the response we already have if there is one
+        if resp is None:
+            resp = info.url_get(api["base_url"], "xml")
+        if resp is None:
+            return
         if resp.status_code == 401 or resp.status_code == 403:
             api["authenticated"] = True
         elif resp.status_code == requests.codes.ok:
@@ -1005,7 +1851,7 @@ class Sword(Detector):
             return
 
         for name, version, url in register.software:
-            if name == "EPrints":
+            if name == "EPrints" and version is not None:
                 if version.startswith("3.2"):
                     api["version"] = "1.3"
                 elif version.startswith("3.3"):
@@ -1015,6 +1861,9 @@ class Sword(Detector):
                     api["version"] = "1.3"
 
 class OpenSearch(Detector):
+    reads = ["repo_url"]
+    writes = ["api"]
+
     def name(self):
         return "OpenSearch"
 
@@ -1028,14 +1877,13 @@ class OpenSearch(Detector):
 
     def detect(self, register, info):
         # <link type="application/opensearchdescription+xml" rel="search" href="http://www.repository.cam.ac.uk:80/open-search/description.xml" title="DSpace" />
-        soup = info.soup(register.repo_url)
-        if soup is not None:
-            for link in soup.find_all("link"):
-                if link.get("type") == "application/opensearchdescription+xml":
-                    api = {"api_type" : "opensearch", "base_url" : link.get("href")}
-                    self._detect_version(api, info)
-                    register.add_api_object(api)
-                    log.info("Found opensearch in link headers: " + api["base_url"])
+        page = info.page(register.repo_url)
+        if page is not None:
+            for link in page.links_by_type("application/opensearchdescription+xml"):
+                api = {"api_type" : "opensearch", "base_url" : link.get("url")}
+                self._detect_version(api, info)
+                register.add_api_object(api)
+                log.info("Found opensearch in link headers: " + api["base_url"])
 
     def _detect_version(self, api, info):
         osdoc = info.xml(api["base_url"])
@@ -1046,6 +1894,9 @@ class OpenSearch(Detector):
             api["version"] = "1.0"
 
 class Title(Detector):
+    reads = ["repo_url", "api"]
+    writes = ["repo_name"]
+
     def name(self):
         return "Title"
 
@@ -1070,38 +1921,23 @@ class Title(Detector):
                 register.repo_name = name
                 return
 
-        # get it from atom feed title
-        atom_urls = register.get_api(type="atom")
-        for atom_url in atom_urls:
-            atom = info.feed(atom_url)
-            try:
-                name = atom.feed.title
-                register.repo_name = name
+        # get it from the atom feed title, then the rss one
+        for api in register.get_api(type="atom") + register.get_api(type="rss"):
+            header = info.feed_header(api.get("base_url")) if api.get("base_url") else None
+            if header is not None and header.get("title"):
+                register.repo_name = header.get("title").strip()
                 return
-            except:
-                pass
-
-        # get it from rss feed title
-        rss_urls = register.get_api(type="rss")
-        for rss_url in rss_urls:
-            rss = info.feed(rss_url)
-            try:
-                name = rss.feed.title
-                register.repo_name = name
-                return
-            except:
-                pass
 
         # html title element of home page
-        soup = info.soup(register.repo_url)
-        if soup is not None:
-            titles = soup.find_all("title")
-            if len(titles) > 0:
-                name = titles[0].text
-                register.repo_name = name
-                return
+        page = info.page(register.repo_url)
+        if page is not None and page.title is not None:
+            register.repo_name = page.title
+            return
 
 class Description(Detector):
+    reads = ["repo_url", "api", "repo_name"]
+    writes = ["description"]
+
     def name(self):
         return "Description"
 
@@ -1119,41 +1955,33 @@ class Description(Detector):
         td_desc = ""
 
         # get it from atom feed subtitle
-        atom_urls = register.get_api(type="atom")
-        for atom_url in atom_urls:
-            atom = info.feed(atom_url)
-            try:
-                atom_desc = atom.feed.subtitle
-            except:
-                pass
-
-        # get it from rss feed description
-        rss_urls = register.get_api(type="rss")
-        for rss_url in rss_urls:
-            rss = info.feed(rss_url)
-            try:
-                desc = rss.feed.description
+        for api in register.get_api(type="atom"):
+            header = info.feed_header(api.get("base_url")) if api.get("base_url") else None
+            if header is not None and header.get("subtitle"):
+                atom_desc = header.get("subtitle").strip()
+
+        # get it from the longest rss feed description
+        for api in register.get_api(type="rss"):
+            header = info.feed_header(api.get("base_url")) if api.get("base_url") else None
+            if header is not None and header.get("subtitle"):
+                desc = header.get("subtitle").strip()
                 if len(desc) > len(rss_desc):
                     rss_desc = desc
-            except:
-                pass
 
-        soup = info.soup(register.repo_url)
+        page = info.page(register.repo_url)
         name = register.repo_name
 
         # p element on home page (which ideally mentions the name) and is the longest text string
-        if soup is not None:
-            p_desc = self._desc_from_element(soup, "p", name)
-            td_desc = self._desc_from_element(soup, "td", name)
-
-        if name in p_desc:
-            register.description = p_desc
-        if name in atom_desc:
-            register.description = atom_desc
-        if name in rss_desc:
-            register.description = rss_desc
-        if name in td_desc:
-            register.description = td_desc
+        if page is not None:
+            p_desc = self._desc_from_element(page, "p", name)
+            td_desc = self._desc_from_element(page, "td", name)
+
+        # prefer a description which mentions the repository by name, the feeds' first
+        if name:
+            for desc in [atom_desc, rss_desc, p_desc, td_desc]:
+                if name in desc:
+                    register.description = desc
+                    return
 
         if len(p_desc) > 0:
             register.description = p_desc
@@ -1168,16 +1996,15 @@ class Description(Detector):
             register.description = td_desc
             return
 
-    def _desc_from_element(self, soup, el, name=None):
+    def _desc_from_element(self, page, el, name=None):
         likely = ""
         fallback = ""
-        ps = soup.find_all(el)
-        for p in ps:
-            if name is not None and name in p.text:
-                if len(p.text) > len(likely):
-                    likely = p.text
-            if len(p.text) > len(fallback):
-                fallback = p.text
+        for text, length in page.blocks.get(el, []):
+            if name is not None and name in text:
+                if length > len(likely):
+                    likely = text
+            if length > len(fallback):
+                fallback = text
 
         if likely != "":
             return likely
@@ -1186,6 +2013,9 @@ class Description(Detector):
         return ""
 
 class Twitter(Detector):
+    reads = ["repo_url"]
+    writes = ["twitter"]
+
     pattern = "http[s]{0,1}://twitter.com/(.+)"
 
     def name(self):
@@ -1200,12 +2030,12 @@ class Twitter(Detector):
 
     def detect(self, register, info):
         # twitter url looks like this: https://twitter.com/CamPuce
-        soup = info.soup(register.repo_url)
-        if soup is None:
+        page = info.page(register.repo_url)
+        if page is None:
             return
 
         tls = [a.get("href")
-               for a in soup.find_all("a")
+               for a in page.anchors
                if a.get("href") is not None and
                   (a.get("href").startswith("https://twitter.com") or a.get("href").startswith("http://twitter.com"))
             ]
@@ -1218,6 +2048,9 @@ class Twitter(Detector):
                 return
 
 class TechnicalContact(Detector):
+    reads = ["repo_url"]
+    writes = ["contact"]
+
     def name(self):
         return "Technical Contact"
 
@@ -1237,6 +2070,8 @@ class TechnicalContact(Detector):
         # do the lookup.  This helpfully recurses up the domain tree until it
         # gets an answer
         who = info.whois(host)
+        if who is None:
+            return
 
         name = who.get("contact_name")
         email = who.get("email")
@@ -0,0 +1,213 @@
+"""
+Recognising repository software from its home page.
+
+Each platform is described by a table of rules, saying where to look (the Generator meta, the
+titles of the page's <link>s, the repository url, or the raw html), a literal string which must be
+there, optionally a regular expression to confirm it (whose "version" group, if it has one, gives
+the version), and how confident a match makes us.  All the literals of all the rules are compiled
+into a single regular expression, shaped as a trie so that its cost doesn't grow with the number
+of rules, and the page is scanned once; only the rules whose literal was found go on to run their
+own expression
+"""
+import bisect, re
+
+# the places a rule can look, in the order they are laid out for the scan
+SOURCES = ["generator", "link", "url", "body"]
+
+# name : url of the software's home
+PLATFORMS = {
+    "DSpace" : "http://dspace.org",
+    "EPrints" : "http://eprints.org",
+    "Fedora" : "http://fedorarepository.org",
+    "Islandora" : "http://islandora.ca",
+    "Invenio" : "http://invenio-software.org",
+    "Digital Commons" : "http://www.bepress.com/ir/",
+    "Dataverse" : "http://dataverse.org",
+    "Open Journal Systems" : "http://pkp.sfu.ca/ojs/",
+    "Greenstone" : "http://www.greenstone.org",
+    "CONTENTdm" : "http://www.contentdm.org",
+    "OPUS" : "http://www.opus-repository.org",
+    "Omeka" : "http://omeka.org"
+}
+
+# (platform, source, literal, expression, confidence).  Literals are matched case insensitively;
+# expressions are searched for (case insensitively) in the same source
+RULES = [
+    # <meta name="Generator" content="DSpace 3.1" /> (has the version back to ~1.8)
+    ("DSpace", "generator", "dspace", r"DSpace(?:\s+(?P<version>\d\S*))?", 1.0),
+    # embedded opensearch link titled "DSpace"
+    ("DSpace", "link", "dspace", r"^DSpace$", 1.0),
+    # <a href="/dspace/help/index.html" target="dspacepopup">Help</a>
+    ("DSpace", "body", 'target="dspacepopup">help', None, 1.0),
+    # the XMLUI themes
+    ("DSpace", "body", 'id="ds-main"', None, 0.9),
+    ("DSpace", "url", "dspace", None, 0.9),
+    ("DSpace", "url", "jspui", None, 0.9),
+    ("DSpace", "url", "xmlui", None, 0.9),
+    ("DSpace", "body", "communities &amp; collections", None, 0.8),
+    ("DSpace", "body", "communities & collections", None, 0.8),
+    ("DSpace", "body", "dspace", None, 0.5),
+
+    # <meta name="Generator" content="EPrints 3.3.11" />
+    ("EPrints", "generator", "eprints", r"EPrints(?:\s+(?P<version>\d\S*))?", 1.0),
+    # repository summary RDF, which has the version in an rdfs:comment
+    ("EPrints", "link", "repository summary", None, 1.0),
+    # powered by <em><a href="http://eprints.org/software/">EPrints 3</a></em>
+    ("EPrints", "body", "eprints.org/software/", r'powered by <em><a href="http://eprints\.org/software/">EPrints (?P<version>\d+)</a></em>', 1.0),
+    # the templates' classes
+    ("EPrints", "body", 'class="ep_tm_', None, 0.9),
+    # which is developed by the <a href="http://www.ecs.soton.ac.uk/">School of Electronics and Computer Science</a>
+    ("EPrints", "body", 'developed by the <a href="http://www.ecs.soton.ac.uk/">school of electronics and computer science</a>', None, 0.8),
+    ("EPrints", "url", "eprints", None, 0.5),
+    ("EPrints", "url", "e-prints", None, 0.5),
+
+    ("Fedora", "body", "fedora commons", None, 0.6),
+    ("Fedora", "url", "/fedora/", None, 0.6),
+
+    # the Drupal module's assets
+    ("Islandora", "body", "/modules/islandora", None, 1.0),
+    ("Islandora", "body", "islandora", None, 0.6),
+
+    # Powered by <a href="http://invenio-software.org/">Invenio</a> v1.1.1
+    ("Invenio", "body", "invenio-software.org", r"invenio-software\.org/?\"?[^>]*>\s*Invenio\s*</a>\s*v?(?P<version>\d[\w.-]*)?", 1.0),
+    ("Invenio", "body", "powered by invenio", None, 0.9),
+
+    ("Digital Commons", "generator", "digital commons", None, 1.0),
+    ("Digital Commons", "url", "digitalcommons.", None, 0.9),
+    ("Digital Commons", "body", "bepress", None, 0.8),
+    ("Digital Commons", "body", "digital commons", None, 0.6),
+
+    ("Dataverse", "url", "dataverse", None, 0.8),
+    ("Dataverse", "body", "/dataverse/", None, 0.8),
+    ("Dataverse", "body", "dataverse", None, 0.5),
+
+    # <meta name="generator" content="Open Journal Systems 2.4.2.0" />
+    ("Open Journal Systems", "generator", "open journal systems", r"Open Journal Systems(?:\s+(?P<version>\d\S*))?", 1.0),
+    ("Open Journal Systems", "body", "pkp.sfu.ca/ojs", None, 0.8),
+
+    ("Greenstone", "generator", "greenstone", r"Greenstone(?:\s+(?P<version>\d\S*))?", 1.0),
+    ("Greenstone", "body", "greenstone digital library", None, 0.9),
+    ("Greenstone", "url", "/gsdl", None, 0.8),
+    ("Greenstone", "body", "greenstone", None, 0.5),
+
+    ("CONTENTdm", "generator", "contentdm", r"CONTENTdm(?:\s+(?P<version>\d\S*))?", 1.0),
+    ("CONTENTdm", "body", "contentdm", None, 0.8),
+
+    ("OPUS", "generator", "opus", r"^OPUS(?:\s+(?P<version>\d\S*))?", 1.0),
+
+    ("Omeka", "generator", "omeka", r"Omeka(?:\s+(?P<version>\d\S*))?", 1.0),
+    ("Omeka", "body", 'powered by <a href="http://omeka.org', None, 0.9)
+]
+
+# separates the sources in the text which is scanned; it can't appear in any literal, so no
+# match can span two of them
+SEPARATOR = "\x00"
+
+def _trie(literals):
+    """
+    a regular expression matching any of the literals, with their common prefixes factored
+    out, so that at each position of the text it makes at most one attempt per character
+    """
+    tree = {}
+    for literal in literals:
+        node = tree
+        for c in literal:
+            node = node.setdefault(c, {})
+        node[""] = {}
+    return _pattern(tree)
+
+def _pattern(node):
+    ends = "" in node
+    branches = [re.escape(c) + _pattern(child) for c, child in sorted(node.items()) if c != ""]
+    if len(branches) == 0:
+        return ""
+    if len(branches) == 1 and not ends:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ")" + ("?" if ends else "")
+
+class Fingerprinter(object):
+    """
+    The rules compiled for scanning.  Build one and share it; it holds no state between pages
+    """
+    def __init__(self, rules=None, platforms=None):
+        self.rules = rules if rules is not None else RULES
+        self.platforms = platforms if platforms is not None else PLATFORMS
+
+        # the rules waiting on each (source, literal), and their compiled expressions
+        self._waiting = {}
+        for i, (platform, source, literal, expression, confidence) in enumerate(self.rules):
+            compiled = re.compile(expression, re.I | re.M) if expression is not None else None
+            self._waiting.setdefault((source, literal.lower()), []).append((platform, compiled, confidence))
+
+        # a literal implies every other literal it contains, which the scan (taking the longest
+        # match at each position) would otherwise miss
+        literals = set([literal for source, literal in self._waiting.keys()])
+        self._implied = dict([(l, [o for o in literals if o in l]) for l in literals])
+
+        # the lookahead lets matches overlap, so a literal inside another match is still found
+        self._scan = re.compile("(?=(" + _trie(sorted(literals)) + "))")
+
+    def _layout(self, sources):
+        """
+        the text to scan, being each of the sources in turn, and the offsets at which they start
+        """
+        parts = []
+        starts = []
+        offset = 0
+        for source in SOURCES:
+            text = sources.get(source) or ""
+            starts.append(offset)
+            parts.append(text)
+            offset += len(text) + len(SEPARATOR)
+        return SEPARATOR.join(parts), starts
+
+    def identify(self, url=None, generator=None, links=None, body=None):
+        """
+        The platforms the page looks like, best first, as dicts of name, version, url and
+        confidence.  generator and links are lists of the Generator meta contents and of the
+        link titles.  The confidence of a platform combines that of all its rules which matched,
+        as independent evidence (so two 0.5 hints make 0.75), and its version comes from the most
+        confident rule which gave one
+        """
+        sources = {
+            "generator" : "\n".join([g for g in (generator or []) if g is not None]),
+            "link" : "\n".join([l for l in (links or []) if l is not None]),
+            "url" : url,
+            "body" : body
+        }
+        text, starts = self._layout(sources)
+
+        # which literals were found in which sources
+        found = set()
+        for m in self._scan.finditer(text.lower()):
+            source = SOURCES[bisect.bisect_right(starts, m.start()) - 1]
+            for literal in self._implied[m.group(1)]:
+                found.add((source, literal))
+
+        # confirm the rules that are waiting on them
+        evidence = {}
+        for key in found:
+            source_text = sources[key[0]]
+            for platform, compiled, confidence in self._waiting.get(key, []):
+                version = None
+                if compiled is not None:
+                    m = compiled.search(source_text)
+                    if m is None:
+                        continue
+                    version = m.groupdict().get("version")
+                evidence.setdefault(platform, []).append((confidence, version))
+
+        results = []
+        for platform, matches in evidence.iteritems():
+            doubt = 1.0
+            for confidence, version in matches:
+                doubt *= 1.0 - confidence
+            versions = sorted([m for m in matches if m[1] is not None], reverse=True)
+            results.append({
+                "name" : platform,
+                "version" : versions[0][1] if len(versions) > 0 else None,
+                "url" : self.platforms.get(platform),
+                "confidence" : round(1.0 - doubt, 4)
+            })
+        results.sort(key=lambda r: (-r["confidence"], r["name"]))
+        return results
@@ -0,0 +1,155 @@
+"""
+Offline IP address to country lookup.
+
+The ranges are held in a binary file of fixed width records sorted by the start of the range,
+which is memory mapped and searched with bisect, so a lookup touches only a handful of pages
+and the file is shared between all the processes on a machine.  Build it from the CSV range
+files that the usual free IP geolocation databases are published as, with
+portality/scripts/geoip.py
+"""
+import bisect, csv, mmap, socket, struct
+
+MAGIC = "OARRGEO1"
+
+# magic, then the number of IPv4 and IPv6 records
+HEADER = struct.Struct(">8sII")
+
+# the address families, and the width of their packed addresses.  Each record is the start and end
+# addresses of a range (packed, big-endian, so that comparing the bytes compares the addresses)
+# followed by the two letter country code
+FAMILIES = [(socket.AF_INET, 4), (socket.AF_INET6, 16)]
+
+# the prefix of IPv4 addresses mapped into IPv6 (::ffff:0:0/96), in which some databases give their IPv4 ranges
+V4_MAPPED = 0xffff << 32
+V4_MAPPED_PREFIX = "\x00" * 10 + "\xff\xff"
+
+def pack_ip(ip):
+    """
+    (family, packed address) of an address written as a string, or as an integer as some of the
+    CSV files have them.  Raises ValueError if it is neither
+    """
+    if isinstance(ip, basestring):
+        ip = ip.strip()
+        if ip.isdigit():
+            ip = long(ip)
+        else:
+            for family, width in FAMILIES:
+                try:
+                    packed = socket.inet_pton(family, ip)
+                except (socket.error, UnicodeError):
+                    continue
+                if family == socket.AF_INET6 and packed.startswith(V4_MAPPED_PREFIX):
+                    return socket.AF_INET, packed[12:]
+                return family, packed
+            raise ValueError("not an ip address: " + ip)
+
+    if ip < 0 or ip >= 1 << 128:
+        raise ValueError("not an ip address: " + str(ip))
+    if ip <= 0xffffffff:
+        return socket.AF_INET, struct.pack(">I", ip)
+    if ip >> 32 == 0xffff:
+        return socket.AF_INET, struct.pack(">I", ip - V4_MAPPED)
+    return socket.AF_INET6, struct.pack(">QQ", ip >> 64, ip & 0xffffffffffffffff)
+
+def read_csv(path):
+    """
+    Read the ranges from a CSV file whose first two columns are the start and end of the range
+    (as addresses or integers) and which has the ISO 3166-1 country code in a later column, as
+    in the DB-IP, IP2Location LITE and GeoLite country files.  Yields (family, start, end, code);
+    header lines and rows without a country are skipped
+    """
+    with open(path, "rb") as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            try:
+                family, start = pack_ip(row[0])
+                end_family, end = pack_ip(row[1])
+            except ValueError:
+                continue
+            if family != end_family:
+                continue
+            code = None
+            for col in row[2:]:
+                col = col.strip()
+                if len(col) == 2 and col.isalpha():
+                    code = col.upper()
+                    break
+            # ZZ is the reserved/unknown country in several of the databases
+            if code is None or code == "ZZ":
+                continue
+            yield family, start, end, code
+
+def build(csv_paths, out):
+    """
+    Write the binary database from one or more CSV range files; returns the number of IPv4
+    and IPv6 ranges written
+    """
+    records = dict([(family, []) for family, width in FAMILIES])
+    for path in csv_paths:
+        for family, start, end, code in read_csv(path):
+            records[family].append((start, end, code))
+
+    with open(out, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records[socket.AF_INET]), len(records[socket.AF_INET6])))
+        for family, width in FAMILIES:
+            for start, end, code in sorted(records[family]):
+                f.write(start + end + code)
+    return len(records[socket.AF_INET]), len(records[socket.AF_INET6])
+
+class RangeTable(object):
+    """
+    The sorted range records of one address family within the mapped file.  Indexing it gives
+    the start address of a record, which is all that bisect needs
+    """
+    def __init__(self, data, offset, count, width):
+        self.data = data
+        self.offset = offset
+        self.count = count
+        self.width = width
+        self.size = 2 * width + 2
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        pos = self.offset + i * self.size
+        return self.data[pos:pos + self.width]
+
+    def find(self, address):
+        i = bisect.bisect_right(self, address) - 1
+        if i < 0:
+            return None
+        pos = self.offset + i * self.size
+        end = self.data[pos + self.width:pos + 2 * self.width]
+        if address > end:
+            return None
+        return self.data[pos + 2 * self.width:pos + self.size]
+
+class GeoIP(object):
+    """
+    A database built by build(), opened read-only
+    """
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, v4, v6 = HEADER.unpack(self.data[:HEADER.size])
+        if magic != MAGIC:
+            raise ValueError(path + " is not an ip to country database")
+        v4_table = RangeTable(self.data, HEADER.size, v4, 4)
+        v6_table = RangeTable(self.data, HEADER.size + v4 * v4_table.size, v6, 16)
+        self.tables = {socket.AF_INET : v4_table, socket.AF_INET6 : v6_table}
+
+    def country(self, ip):
+        """
+        the ISO 3166-1 alpha-2 code of the country the address is in, or None if we don't know
+        """
+        try:
+            family, address = pack_ip(ip)
+        except ValueError:
+            return None
+        return self.tables[family].find(address)
+
+    def close(self):
+        self.data.close()
+        self._file.close()
@@ -0,0 +1,239 @@
+"""
+Counting the records in an OAI-PMH repository.
+
+The Harvester walks ListIdentifiers from a detected OAI-PMH base url, following the
+resumptionTokens page by page.  Each page is parsed as it arrives, and each header is
+discarded once it has been counted, so the memory used doesn't depend on the size of the
+page or of the repository.  Given a from date it counts only the records added, changed or
+deleted since then, which is how the counts can be brought up to date without walking the
+whole repository again.  count_register does this for each of a register's oai-pmh apis
+"""
+from portality.autodiscovery import detectors
+from portality.autodiscovery.resolver import host_of
+from portality.autodiscovery.throttle import retry_after
+from lxml import etree
+from datetime import datetime
+import requests, logging
+
+# FIXME: this should probably come from configuration somewhere
+LOG_FORMAT = '%(asctime)-15s %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+log = logging.getLogger(__name__)
+
+OAI_NS = "{http://www.openarchives.org/OAI/2.0/}"
+
+class HarvestException(Exception):
+    def __init__(self, message, code=None):
+        super(HarvestException, self).__init__(message)
+        self.code = code
+
+class Harvester(object):
+    """
+    Walks the identifiers of one OAI-PMH endpoint.  It fetches through an Info (its own, if
+    none is given), so it shares that Info's connections and politeness towards the host
+    """
+    metadata_prefix = "oai_dc"
+
+    # seconds to wait for each page (which some repositories take a long time to put together),
+    # and the longest we will wait when the repository asks us to come back later, as OAI-PMH
+    # repositories often do in the middle of a long list
+    page_timeout = 60
+    max_retry_after = 300
+
+    # bytes to hand the parser at a time
+    chunk_size = 65536
+
+    @classmethod
+    def configure(cls, config):
+        cls.page_timeout = config.get("AUTODISCOVERY_OAI_PAGE_TIMEOUT", cls.page_timeout)
+        cls.max_retry_after = config.get("AUTODISCOVERY_OAI_MAX_RETRY_AFTER", cls.max_retry_after)
+
+    def __init__(self, base_url, info=None, metadata_prefix=None):
+        self.base_url = base_url
+        self.info = info
+        self._own_info = info is None
+        if self._own_info:
+            self.info = detectors.Info()
+        if metadata_prefix is not None:
+            self.metadata_prefix = metadata_prefix
+
+        # what the last list told us: the number of pages fetched, and the size of the whole
+        # list, if the repository gives it in its resumptionTokens
+        self.pages = 0
+        self.complete_list_size = None
+
+    def close(self):
+        if self._own_info:
+            self.info.close()
+
+    def list_identifiers(self, from_date=None, until=None, set_spec=None):
+        """
+        Yield (identifier, datestamp, deleted) for each record header, following the list to
+        its end.  Raises HarvestException if the repository returns an error (other than that
+        there are no records to list) or can't be reached
+        """
+        params = {"verb" : "ListIdentifiers", "metadataPrefix" : self.metadata_prefix}
+        if from_date is not None:
+            params["from"] = from_date
+        if until is not None:
+            params["until"] = until
+        if set_spec is not None:
+            params["set"] = set_spec
+
+        self.pages = 0
+        self.complete_list_size = None
+        while True:
+            resp = self._get(params)
+            self.pages += 1
+            state = {}
+            for header in self._headers(resp, state):
+                yield header
+
+            error = state.get("error")
+            if error is not None:
+                code, message = error
+                if code == "noRecordsMatch":
+                    return
+                raise HarvestException("OAI-PMH error from " + self.base_url + ": " + code + " " + (message or ""), code)
+
+            token = state.get("token")
+            if not token:
+                return
+            params = {"verb" : "ListIdentifiers", "resumptionToken" : token}
+
+    def count(self, from_date=None, until=None, set_spec=None):
+        """
+        Walk the list, counting the records and the deleted records, and noting the earliest and
+        latest datestamps
+        """
+        result = {"count" : 0, "deleted" : 0, "earliest" : None, "latest" : None}
+        for identifier, datestamp, deleted in self.list_identifiers(from_date, until, set_spec):
+            if deleted:
+                result["deleted"] += 1
+            else:
+                result["count"] += 1
+            if datestamp is not None:
+                if result["earliest"] is None or datestamp < result["earliest"]:
+                    result["earliest"] = datestamp
+                if result["latest"] is None or datestamp > result["latest"]:
+                    result["latest"] = datestamp
+        result["pages"] = self.pages
+        result["complete_list_size"] = self.complete_list_size
+        return result
+
+    def _get(self, params):
+        """
+        One page of the list, not yet read.  Waits (once) if the repository asks us to with a
+        503 and a Retry-After we can afford
+        """
+        host = host_of(self.base_url)
+        gate = self.info.politeness
+        for attempt in range(2):
+            try:
+                with gate.slot(host):
+                    session = self.info.session(self.base_url)
+                    if session is None:
+                        raise HarvestException("Not fetching " + self.base_url + ": the Info it was to be fetched through is closed")
+                    resp = session.get(self.base_url, params=params, timeout=self.page_timeout, verify=False, stream=True)
+            except requests.exceptions.RequestException as e:
+                raise HarvestException("Unable to reach " + self.base_url + ": " + str(e))
+
+            if resp.status_code == requests.codes.ok:
+                return resp
+            wait = retry_after(resp.headers.get("retry-after"))
+            detectors.discard_connection(resp)
+            if resp.status_code in [429, 503] and wait is not None and wait <= self.max_retry_after and attempt == 0:
+                log.info(host + " asked us to retry the list after " + str(wait) + " seconds")
+                gate.back_off(host, wait)
+                continue
+            raise HarvestException(self.base_url + " responded " + str(resp.status_code))
+
+    def _headers(self, resp, state):
+        """
+        Parse a page as it arrives, yielding each header in it.  The resumptionToken (and the
+        completeListSize it may carry) and any error are put into state
+        """
+        parser = etree.XMLPullParser(events=("end",), **detectors.XML_PARSER_OPTIONS)
+        finished = False
+        try:
+            for chunk in resp.iter_content(self.chunk_size):
+                parser.feed(chunk)
+                for header in self._read_events(parser, state):
+                    yield header
+            parser.close()
+            for header in self._read_events(parser, state):
+                yield header
+            finished = True
+        except etree.XMLSyntaxError as e:
+            raise HarvestException("Unable to parse the list from " + self.base_url + ": " + str(e))
+        finally:
+            # the rest of a page we stopped reading can't be left on the connection
+            if not finished:
+                detectors.discard_connection(resp)
+
+    def _read_events(self, parser, state):
+        for event, el in parser.read_events():
+            if el.tag == OAI_NS + "header":
+                identifier = el.findtext(OAI_NS + "identifier")
+                datestamp = el.findtext(OAI_NS + "datestamp")
+                deleted = el.get("status") == "deleted"
+                # we are done with it, and with any headers before it
+                el.clear()
+                while el.getprevious() is not None:
+                    del el.getparent()[0]
+                yield (identifier.strip() if identifier else None, datestamp.strip() if datestamp else None, deleted)
+            elif el.tag == OAI_NS + "resumptionToken":
+                state["token"] = (el.text or "").strip()
+                size = el.get("completeListSize")
+                if size is not None and size.isdigit():
+                    self.complete_list_size = int(size)
+            elif el.tag == OAI_NS + "error":
+                state["error"] = (el.get("code"), el.text)
+
+def count_records(api, since=None, info=None):
+    """
+    Count the records of an oai-pmh api object and record what we found on it.  Without since,
+    the whole list is walked and the record_count, deleted_count and earliest and latest
+    datestamps are set.  With since (an OAI-PMH datestamp, usually the latest_datestamp of the
+    last count), only the records changed since then are walked; how many is recorded as
+    changed_count, and the latest datestamp is moved on.  Returns the api object
+    """
+    harvester = Harvester(api.get("base_url"), info=info)
+    try:
+        result = harvester.count(from_date=since)
+    finally:
+        harvester.close()
+
+    now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    if since is None:
+        api["record_count"] = result["count"]
+        api["deleted_count"] = result["deleted"]
+        api["earliest_datestamp"] = result["earliest"]
+        api["latest_datestamp"] = result["latest"]
+        api["counted_date"] = now
+    else:
+        api["changed_count"] = result["count"] + result["deleted"]
+        api["changed_since"] = since
+        if result["latest"] is not None and (api.get("latest_datestamp") is None or result["latest"] > api["latest_datestamp"]):
+            api["latest_datestamp"] = result["latest"]
+        api["changes_counted_date"] = now
+    log.info("Counted " + str(result["count"]) + " records (" + str(result["deleted"]) + " deleted) in " +
+             str(result["pages"]) + " pages at " + api.get("base_url") + ("" if since is None else " since " + since))
+    return api
+
+def count_register(register, info=None):
+    """
+    Count the records of each of the register's oai-pmh apis (see count_records): the whole list
+    for an api which hasn't been counted before, and only what has changed since its latest
+    datestamp for one which has.  An api which can't be counted is logged and left as it was.
+    Returns the register
+    """
+    for api in register.get_api("oai-pmh"):
+        if api.get("base_url") is None:
+            continue
+        since = api.get("latest_datestamp") if api.get("record_count") is not None else None
+        try:
+            count_records(api, since=since, info=info)
+        except HarvestException as e:
+            log.info("Unable to count the records at " + api.get("base_url") + ": " + str(e))
+    return register
@@ -0,0 +1,71 @@
+from bs4 import BeautifulSoup
+from lxml import etree
+import lxml.html
+
+# the parser backends that Info.soup can use
+BACKENDS = ["bs4", "lxml"]
+
+# the tree builder BeautifulSoup uses for the bs4 backend.  lxml is what it picks anyway when it is
+# installed, as it always is for us, but named so that it doesn't have to guess (and warn) each time
+BS4_FEATURES = "lxml"
+
+def parse(text, backend="bs4"):
+    """
+    Parse an html page with the chosen backend.  Both return an object answering the same
+    queries (find_all, get_text, and name/get/text on the elements found), so the detectors
+    do not need to know which one they have
+    """
+    if backend == "lxml":
+        return LxmlSoup(text)
+    if backend == "bs4":
+        return BeautifulSoup(text, BS4_FEATURES)
+    raise ValueError("unknown html parser backend " + str(backend))
+
+class LxmlTag(object):
+    """
+    An lxml.html element dressed up as much like a BeautifulSoup Tag as the detectors need
+    """
+    # attributes which BeautifulSoup splits into lists of values
+    multi_valued = ["class", "rel", "rev", "accept-charset", "headers", "accesskey"]
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    def get(self, attr, default=None):
+        val = self.element.get(attr)
+        if val is None:
+            return default
+        if attr in self.multi_valued:
+            return val.split()
+        return val
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def get_text(self):
+        return self.element.text_content()
+
+class LxmlSoup(LxmlTag):
+    """
+    Page parsed with lxml.html, which is a good deal faster and lighter than BeautifulSoup
+    on large repository home pages
+    """
+    def __init__(self, text):
+        try:
+            root = lxml.html.document_fromstring(text)
+        except ValueError:
+            # lxml won't take unicode text which still carries an xml encoding declaration
+            root = lxml.html.document_fromstring(text.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+        except etree.ParserError:
+            # an empty document
+            root = lxml.html.document_fromstring("<html></html>")
+        super(LxmlSoup, self).__init__(root)
+
+    def find_all(self, name):
+        names = name if isinstance(name, list) else [name]
+        return [LxmlTag(el) for el in self.element.iter(*names)]
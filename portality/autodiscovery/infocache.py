@@ -0,0 +1,142 @@
+"""
+The cache of what an Info has fetched and parsed.
+
+Each entry is of a kind (a response, a page's index, an xml tree, an rdf graph, a parsed feed
+...) and is given an estimate of the memory it takes, from the size of the document it was made
+from and how much bigger that kind of thing typically is once parsed.  When the entries come to
+more than the budget, the least recently used are evicted, and will be fetched (from the HTTP
+cache, if there is one) or parsed again if they are wanted.  The urls which could not be fetched,
+and the notes detectors leave for each other, are never evicted
+"""
+from collections import OrderedDict
+import threading
+
+# the kinds of entry
+RESPONSE = "response"
+PAGE = "page"
+XML = "xml"
+GRAPH = "graph"
+FEED = "feed"
+FEED_HEADER = "feed_header"
+WHOIS = "whois"
+FAILED = "failed"
+NOTE = "note"
+
+# kinds which are kept whatever the budget, being small and not to be had again by fetching
+PINNED = [FAILED, NOTE]
+
+# roughly how many bytes of memory each kind of entry takes per byte of the document it was
+# made from (measured on dense repository pages, feeds and rdf), and for a page's index, by
+# which html parser.  Anything else is counted as SMALL
+SIZE_FACTORS = {
+    RESPONSE : 1,
+    PAGE : {"bs4" : 75, "lxml" : 30},
+    XML : 15,
+    GRAPH : 20,
+    FEED : 20
+}
+SMALL = 1024
+
+# the parses which are made of a response read as each kind of document (see Info.url_get); once
+# they have all been made, the response's body isn't needed unless someone asks for it again
+DERIVED = {
+    "html" : [PAGE],
+    "xml" : [XML],
+    "rdf" : [GRAPH],
+    "feed" : [FEED_HEADER]
+}
+
+def estimate(kind, source_size, parser=None):
+    """
+    the bytes an entry of the kind made from a document of source_size bytes is taken to use
+    """
+    factor = SIZE_FACTORS.get(kind)
+    if isinstance(factor, dict):
+        factor = factor.get(parser, max(factor.values()))
+    if factor is None or source_size is None:
+        return SMALL
+    return factor * source_size + SMALL
+
+class InfoCache(object):
+    """
+    Entries by (kind, key), in order of use, with their estimated sizes.  budget is the most
+    bytes they may come to (None for no limit).  The entry just put, and any others under the
+    same key (a response and what has been parsed from it), are kept even if they come to more
+    than the budget on their own, so that a document too big for the budget isn't fetched and
+    parsed over and over, each pushing out the other.  Safe to use from many threads
+    """
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.size = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, default=None):
+        with self._lock:
+            if kind in PINNED:
+                return self._pinned.get((kind, key), default)
+            entry = self._entries.pop((kind, key), None)
+            if entry is None:
+                return default
+            # it is now the most recently used
+            self._entries[(kind, key)] = entry
+            return entry[0]
+
+    def contains(self, kind, key):
+        """
+        whether there is an entry, without counting this as a use of it
+        """
+        with self._lock:
+            if kind in PINNED:
+                return (kind, key) in self._pinned
+            return (kind, key) in self._entries
+
+    def put(self, kind, key, value, size=None):
+        with self._lock:
+            if kind in PINNED:
+                self._pinned[(kind, key)] = value
+                return
+            if size is None:
+                size = SMALL
+            old = self._entries.pop((kind, key), None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[(kind, key)] = (value, size)
+            self.size += size
+            self._evict(key)
+
+    def remove(self, kind, key):
+        with self._lock:
+            if kind in PINNED:
+                self._pinned.pop((kind, key), None)
+                return
+            old = self._entries.pop((kind, key), None)
+            if old is not None:
+                self.size -= old[1]
+
+    def sizes(self):
+        """
+        the number of entries and the bytes they are estimated to take, by kind
+        """
+        with self._lock:
+            sizes = {}
+            for (kind, key), (value, size) in self._entries.iteritems():
+                counts = sizes.setdefault(kind, {"entries" : 0, "bytes" : 0})
+                counts["entries"] += 1
+                counts["bytes"] += size
+            return sizes
+
+    def _evict(self, key):
+        # least recently used first, except for the entries under the key just put
+        if self.budget is None or self.size <= self.budget:
+            return
+        for entry_key in list(self._entries.keys()):
+            if self.size <= self.budget:
+                return
+            if entry_key[1] == key:
+                continue
+            value, size = self._entries.pop(entry_key)
+            self.size -= size
+            self.evictions += 1
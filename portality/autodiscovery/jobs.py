@@ -0,0 +1,122 @@
+"""
+Running discovery in the background for the web app.
+
+Discovering a repository can take minutes when its server is slow, which is far too long to
+hold a gunicorn worker.  Instead the url is submitted to a JobQueue, which runs the discovery
+on a small pool of threads in the process that took the request and hands back a job id at
+once.  The job and, when it is done, its result are kept in a JobStore, so that whichever
+worker is asked can say how the job is going.  A url which is already being discovered, or
+which was discovered recently, is not discovered again: its job is reused
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging, os, threading, time, uuid
+
+# FIXME: this should probably come from configuration somewhere
+LOG_FORMAT = '%(asctime)-15s %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+log = logging.getLogger(__name__)
+
+# the states a job goes through
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class JobQueue(object):
+    """
+    Runs work(url) for each url submitted, recording its (json serialisable) result in the store
+    """
+    # the number of jobs each process runs at once; the rest wait their turn
+    workers = 2
+
+    # seconds for which a finished result is given out again, rather than the url being re-run
+    result_ttl = 3600
+
+    # seconds after which a job which has not finished is given up on, as lost with the process
+    # which was running it, or stuck
+    job_timeout = 900
+
+    @classmethod
+    def configure(cls, config):
+        cls.workers = config.get("AUTODISCOVERY_JOB_WORKERS", cls.workers)
+        cls.result_ttl = config.get("AUTODISCOVERY_JOB_RESULT_TTL", cls.result_ttl)
+        cls.job_timeout = config.get("AUTODISCOVERY_JOB_TIMEOUT", cls.job_timeout)
+
+    def __init__(self, store, work):
+        self.store = store
+        self.work = work
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # threads don't survive a fork, so each (gunicorn worker) process starts its own
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._pool
+
+    def submit(self, url):
+        """
+        The id of the job for the url: the one already under way, or finished recently enough,
+        if there is one, otherwise a new one which is queued to run.  Any number of processes may
+        submit the same url at once; only one job is created
+        """
+        job = self.current(url)
+        if job is not None:
+            return job["id"]
+
+        self.store.purge(time.time() - self.job_timeout - self.result_ttl)
+        job, created = self.store.create_unless(uuid.uuid4().hex, url, self._reusable)
+        if created:
+            self._executor().submit(self._run, job["id"], url)
+        return job["id"]
+
+    def status(self, job_id):
+        """
+        the job, as a dict of its id, url, status, the times it was submitted, started and
+        finished, and its error or result; or None if there is no such job
+        """
+        return self._checked(self.store.get(job_id))
+
+    def current(self, url):
+        """
+        the latest job for the url if it is still queued or running, or if it finished successfully
+        within the last result_ttl seconds; otherwise None
+        """
+        job = self._checked(self.store.latest(url))
+        if job is None or not self._reusable(job):
+            return None
+        return job
+
+    def _reusable(self, job):
+        # a job still under way (and not given up on), or finished successfully recently enough
+        if job["status"] in [QUEUED, RUNNING]:
+            return job["submitted"] + self.job_timeout >= time.time()
+        return job["status"] == DONE and job["finished"] + self.result_ttl > time.time()
+
+    def result(self, url):
+        """
+        the recent result for the url, or None if there isn't one (yet)
+        """
+        job = self.current(url)
+        if job is not None and job["status"] == DONE:
+            return job["result"]
+        return None
+
+    def _checked(self, job):
+        if job is not None and job["status"] in [QUEUED, RUNNING] and job["submitted"] + self.job_timeout < time.time():
+            self.store.fail(job["id"], "timed out")
+            job = self.store.get(job["id"])
+        return job
+
+    def _run(self, job_id, url):
+        self.store.start(job_id)
+        try:
+            result = self.work(url)
+        except Exception as e:
+            log.exception("Discovery job " + job_id + " for " + url + " failed")
+            self.store.fail(job_id, str(e))
+            return
+        self.store.finish(job_id, result)
@@ -1,4 +1,5 @@
 from portality.autodiscovery import detectors
+from portality.autodiscovery.stats import bind
 from portality import schema
 from portality import oarr
 import requests, logging, json, pycountry, urlparse, babel
@@ -87,9 +88,10 @@ class RegistryFile(object):
     _operational_status = ["Trial", "Operational"]
 
     @classmethod
-    def get(cls, repo_url):
-        # first locate and retrieve the file
-        resp = cls.autodetect(repo_url)
+    def get(cls, repo_url, deadline=None, info=None):
+        # first locate and retrieve the file (giving up at the deadline, if there is one), fetching
+        # through the Info of the discovery this is part of, if any
+        resp = cls.autodetect(repo_url, deadline, info)
         if resp is None:
             log.info("Unable to locate OARR file for " + repo_url)
             return None
@@ -529,38 +531,62 @@ class RegistryFile(object):
         return len(msgs) == 0, msgs
 
     @classmethod
-    def autodetect(cls, repo_url):
-        info = detectors.Info()
-        href = None
-
-        # check for auto-discovery headers
-        soup = info.soup(repo_url)
-        if soup is not None:
-            for link in soup.find_all("link"):
-                if "oarr" in link.get("rel"):
-                    href = cls._expand_url(repo_url, link.get("href"))
+    def autodetect(cls, repo_url, deadline=None, info=None):
+        """
+        The response holding the registry file for the repository, found by way of the link to
+        it from the home page, or else at its default location; None if there isn't one.  Given
+        the Info of a discovery, the home page fetched here is the one the detectors then use
+        """
+        own_info = info is None
+        if own_info:
+            info = detectors.Info(deadline=deadline)
+        try:
+            # try the default location while the home page is fetched and searched for a link
+            default = cls._expand_url(repo_url, "/oarr.json")
+            guess = info.fetch_pool().submit(bind(cls.retrieve), default, info=info)
+
+            # check for auto-discovery headers
+            href = None
+            page = info.page(repo_url)
+            if page is not None:
+                for link in page.links_by_rel("oarr"):
+                    href = link.get("url")
                     break
 
-        if href is not None:
-            resp = cls.retrieve(href)
-            if resp is not None:
-                return resp
-
-        # if we didn't find the headers, then try the default location
-        href = cls._expand_url(repo_url, "/oarr.json")
-        resp = cls.retrieve(href)
-        if resp is not None:
-            return resp
+            if href is not None and href != default:
+                resp = cls.retrieve(href, info=info)
+                if resp is not None:
+                    guess.cancel()
+                    return resp
 
-        # couldn't find the file, or there was an error
-        return None
+            # if we didn't find the headers (or the file they pointed to), then use the default
+            # location; None if we couldn't find the file, or there was an error
+            return guess.result()
+        finally:
+            if own_info:
+                info.close()
 
     @classmethod
-    def retrieve(cls, registry_file_url):
-        resp = requests.get(registry_file_url)
-        if resp.status_code == requests.codes.ok:
+    def retrieve(cls, registry_file_url, info=None):
+        """
+        The response holding the registry file at the url; None if it couldn't be fetched, wasn't
+        there, or was too big to read whole.  It is read whatever type it is served as, since
+        registry files are as often served as application/octet-stream or text/plain as json
+        """
+        own_info = info is None
+        if own_info:
+            info = detectors.Info()
+        try:
+            resp = info.url_get(registry_file_url)
+            if resp is None or resp.status_code != requests.codes.ok:
+                return None
+            if getattr(resp, "truncated", False):
+                log.info("Not reading OARR file " + registry_file_url + ": it is too big")
+                return None
             return resp
-        return None
+        finally:
+            if own_info:
+                info.close()
 
     @classmethod
     def _validate_url(cls, url, msgs):
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urlparse import urlparse
+import socket, threading, time, logging
+
+# FIXME: this should probably come from configuration somewhere
+LOG_FORMAT = '%(asctime)-15s %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+log = logging.getLogger(__name__)
+
+def host_of(url):
+    """
+    the host name of a url, without any port or credentials, lower cased
+    """
+    if url is None:
+        return None
+    return urlparse(url).hostname
+
+class Resolver(object):
+    """
+    In-process cache of host name lookups.  The system resolver doesn't tell us the ttl of the
+    records it returns, so answers are kept for a fixed time, and hosts which don't resolve are
+    remembered too, so that nothing else waits on a name we already know is dead.  Safe to share
+    between threads; concurrent lookups of the same host wait for the first one
+    """
+    ttl = 300
+    negative_ttl = 300
+
+    # the most lookups to run at once when resolving hosts in bulk
+    max_workers = 16
+
+    def __init__(self, ttl=None, negative_ttl=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if negative_ttl is not None:
+            self.negative_ttl = negative_ttl
+        self._cache = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _host_lock(self, host):
+        with self._lock:
+            l = self._locks.get(host)
+            if l is None:
+                l = threading.Lock()
+                self._locks[host] = l
+            return l
+
+    def cached(self, host):
+        """
+        (True, addresses) if we have a fresh answer for the host, where addresses is None if it
+        did not resolve; otherwise (False, None)
+        """
+        with self._lock:
+            entry = self._cache.get(host)
+        if entry is None or entry[1] < time.time():
+            return False, None
+        return True, entry[0]
+
+    def failed(self, host):
+        """
+        do we know, without looking it up again, that the host does not resolve
+        """
+        hit, addresses = self.cached(host)
+        return hit and addresses is None
+
+    def seed(self, host, addresses):
+        """
+        record the answer for a host which was looked up elsewhere (e.g. by the parent of a batch run)
+        """
+        if host is None:
+            return
+        ttl = self.ttl if addresses is not None else self.negative_ttl
+        with self._lock:
+            self._cache[host] = (addresses, time.time() + ttl)
+
+    def resolve(self, host):
+        """
+        The addresses for the host, IPv4 first, or None if it does not resolve
+        """
+        if host is None:
+            return None
+        hit, addresses = self.cached(host)
+        if hit:
+            return addresses
+
+        with self._host_lock(host):
+            # someone else may have looked it up while we waited
+            hit, addresses = self.cached(host)
+            if hit:
+                return addresses
+            addresses = self._lookup(host)
+            self.seed(host, addresses)
+            return addresses
+
+    def _lookup(self, host):
+        try:
+            infos = socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+        except (socket.gaierror, socket.herror, UnicodeError) as e:
+            log.info("Unable to resolve " + host + ": " + str(e))
+            return None
+        v4 = [info[4][0] for info in infos if info[0] == socket.AF_INET]
+        v6 = [info[4][0] for info in infos if info[0] == socket.AF_INET6]
+        addresses = []
+        for a in v4 + v6:
+            if a not in addresses:
+                addresses.append(a)
+        return addresses if len(addresses) > 0 else None
+
+    def resolve_all(self, hosts):
+        """
+        Look up all of the hosts concurrently, yielding (host, addresses) for each as soon as
+        its answer arrives, so that the caller can get on with the hosts which answer quickly
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = dict([(executor.submit(self.resolve, host), host) for host in set(hosts)])
+            for f in as_completed(futures.keys()):
+                yield futures[f], f.result()
+        finally:
+            executor.shutdown(wait=False)
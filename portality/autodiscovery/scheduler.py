@@ -0,0 +1,294 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from copy import deepcopy
+import logging, json, hashlib, threading
+
+# FIXME: this should probably come from configuration somewhere
+LOG_FORMAT = '%(asctime)-15s %(message)s'
+logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+log = logging.getLogger(__name__)
+
+# how each detector fared, as recorded on the register
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+TIMED_OUT = "timed_out"
+
+# the Register fields which are lists kept on the register itself rather than in its metadata
+REGISTER_LISTS = ["software", "organisation", "contact", "api"]
+
+# the Register methods by which detectors add to each of those lists
+LIST_ADDERS = {
+    "add_software" : "software",
+    "add_organisation_object" : "organisation",
+    "add_contact_object" : "contact",
+    "add_api_object" : "api"
+}
+
+# the prefixes of the names of the Register methods which change it
+WRITE_PREFIXES = ("add_", "set_", "clear_", "ensure_")
+
+def field_value(register, field):
+    """
+    the current value of one of the fields detectors read and write (see Detector.reads)
+    """
+    if field in REGISTER_LISTS:
+        return register.raw.get("register", {}).get(field, [])
+    return getattr(register, field)
+
+def inputs_hash(register, detector):
+    """
+    fingerprint of the values of the fields the detector reads
+    """
+    values = [field_value(register, field) for field in detector.reads]
+    return hashlib.sha1(json.dumps(values, sort_keys=True)).hexdigest()
+
+def detector_output(register, detector, before, added=None):
+    """
+    What the detector contributed to the register: the value of each field it writes, except
+    for lists, which may be shared with other detectors, where it is just the items it added.
+    Those are the items noted by its RecordingRegister (added) where there is one, and
+    otherwise those which weren't there before it ran
+    """
+    output = {}
+    for field in detector.writes:
+        if added is not None and field in REGISTER_LISTS:
+            value = added.get(field, [])
+        else:
+            value = field_value(register, field)
+            if isinstance(value, list):
+                value = [item for item in value if item not in (before.get(field) or [])]
+        output[field] = deepcopy(value)
+    return output
+
+def retract(register, output):
+    """
+    take the list items a detector contributed last time back out of the register, so that
+    running it again replaces them rather than adding to them.  Other fields are simply
+    overwritten when it runs
+    """
+    for field, items in output.iteritems():
+        current = field_value(register, field)
+        if not isinstance(items, list) or not isinstance(current, list):
+            continue
+        for item in items:
+            while item in current:
+                current.remove(item)
+
+class RecordingRegister(object):
+    """
+    Stands in for the register while a detector runs.  Its writes (setting a field, or calling
+    one of the register's add_, set_ and the like) are made under the lock shared by all the
+    detectors in the run, and once the run has been abandoned they are dropped, so that a
+    detector left running after the deadline can't change the register while whoever the run
+    returned it to is reading it.  The items the detector adds to each of the REGISTER_LISTS are
+    noted, so that what it contributed is known exactly even while other detectors are adding
+    to the same lists.  Reads are passed straight through to the register
+    """
+    def __init__(self, register, lock, abandoned=None):
+        object.__setattr__(self, "_register", register)
+        object.__setattr__(self, "_lock", lock)
+        object.__setattr__(self, "_abandoned", abandoned)
+        object.__setattr__(self, "added", {})
+
+    def _accepting(self):
+        return self._abandoned is None or not self._abandoned.is_set()
+
+    def __getattr__(self, name):
+        attr = getattr(self._register, name)
+        if not name.startswith(WRITE_PREFIXES) or not callable(attr):
+            return attr
+        field = LIST_ADDERS.get(name)
+
+        def write(*args, **kwargs):
+            with self._lock:
+                if not self._accepting():
+                    return
+                if field is None:
+                    return attr(*args, **kwargs)
+                before = len(field_value(self._register, field))
+                attr(*args, **kwargs)
+                self.added.setdefault(field, []).extend(field_value(self._register, field)[before:])
+        return write
+
+    def __setattr__(self, name, value):
+        with self._lock:
+            if self._accepting():
+                setattr(self._register, name, value)
+
+class Scheduler(object):
+    """
+    Runs a list of detectors against a register, concurrently where possible.
+
+    Each detector declares the Register fields it reads and writes.  A detector
+    depends on every detector earlier in the list which writes a field that it
+    reads, and will not be started until all of those have finished.  Everything
+    else runs in parallel, so the total time is roughly that of the slowest chain.
+
+    Given a DetectionLedger, the results of the detectors which run are recorded in it, and
+    (if incremental) detectors whose last results for the repository are still current are not
+    run at all.  What each detector added to the lists it shares with others (e.g. api) is noted
+    by its RecordingRegister (see below), so it is known without the detectors having to take
+    turns.  Detectors which write the same field of any other sort still do.
+
+    If the Info has a deadline, detectors which are ready to start once it has passed are skipped,
+    and those still running grace seconds after it are given up on, so that the run ends on time
+    with whatever has been found.  How each detector fared is recorded on the register.  Every
+    detector works on the register through a RecordingRegister, which stops taking its writes once
+    the run has been given up on, so the register returned isn't changed by those left running.
+
+    A run may be cancelled from another thread (e.g. when it was started speculatively and turns
+    out not to be needed), after which no more detectors are started and nothing more is
+    recorded in the ledger.
+    """
+    max_workers = 8
+    grace = 1
+
+    def __init__(self, detector_classes, max_workers=None, ledger=None, incremental=True):
+        self.detectors = [klazz() for klazz in detector_classes]
+        self.ledger = ledger
+        self.incremental = incremental
+        self.dependencies = self.dependency_graph(self.detectors, exclusive_writes=ledger is not None)
+        self._cancelled = threading.Event()
+        self._register_lock = threading.Lock()
+        if max_workers is not None:
+            self.max_workers = max_workers
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @classmethod
+    def dependency_graph(cls, detectors, exclusive_writes=False):
+        """
+        map the index of each detector to the set of indices of the detectors it must wait for.
+        With exclusive_writes, a detector also waits for those earlier in the list which write
+        any of the same fields, other than the REGISTER_LISTS (see RecordingRegister)
+        """
+        graph = {}
+        for i, detector in enumerate(detectors):
+            graph[i] = set()
+            reads = set(detector.reads)
+            writes = set(detector.writes) - set(REGISTER_LISTS)
+            for j in range(i):
+                if len(reads.intersection(detectors[j].writes)) > 0:
+                    graph[i].add(j)
+                elif exclusive_writes and len(writes.intersection(detectors[j].writes)) > 0:
+                    graph[i].add(j)
+        return graph
+
+    def run(self, register, info, check_required=True):
+        pending = range(len(self.detectors))
+        done = set()
+        running = {}
+        abandoned = threading.Event()
+        register.clear_detection()
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                if self._cancelled.is_set():
+                    self._abandon(abandoned)
+                    break
+
+                # start everything whose dependencies have all finished.  Skipping a detector
+                # may free up others, so keep going until nothing more can be started
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for i in list(pending):
+                        if not self.dependencies[i].issubset(done):
+                            continue
+                        pending.remove(i)
+                        progressed = True
+                        detector = self.detectors[i]
+                        if info.expired():
+                            log.info(str(register.repo_url) + " - " + detector.name() + " out of time, skipping")
+                            register.add_detection_outcome(detector.name(), SKIPPED)
+                            done.add(i)
+                            continue
+                        if not self._should_run(detector, register, check_required):
+                            done.add(i)
+                            continue
+                        running[executor.submit(self._run_detector, detector, register, info, abandoned)] = i
+
+                if len(running) == 0:
+                    continue
+
+                timeout = None
+                if info.remaining() is not None:
+                    timeout = max(0, info.remaining() + self.grace)
+                finished, _ = wait(running.keys(), timeout=timeout, return_when=FIRST_COMPLETED)
+                if len(finished) == 0:
+                    # out of time: leave the detectors still running to finish (or not) on their
+                    # own, no longer writing to the register
+                    self._abandon(abandoned)
+                    for f, i in running.iteritems():
+                        log.info(str(register.repo_url) + " - " + self.detectors[i].name() + " timed out")
+                        register.add_detection_outcome(self.detectors[i].name(), TIMED_OUT)
+                    for i in pending:
+                        register.add_detection_outcome(self.detectors[i].name(), SKIPPED)
+                    break
+                for f in finished:
+                    i = running.pop(f)
+                    register.add_detection_outcome(self.detectors[i].name(), f.result())
+                    done.add(i)
+        finally:
+            executor.shutdown(wait=not abandoned.is_set())
+
+        return register
+
+    def _abandon(self, abandoned):
+        # once any write in progress is over, no more are taken (see RecordingRegister)
+        with self._register_lock:
+            abandoned.set()
+
+    def _should_run(self, detector, register, check_required):
+        if self.ledger is not None and self.incremental and register.repo_url is not None:
+            entry = self.ledger.get(register.repo_url, detector.name())
+            if entry is not None:
+                return self._should_refresh(detector, register, entry)
+
+        # only bother if the fields this detector fills are still empty
+        if check_required and not detector.required(register):
+            log.info(str(register.repo_url) + " - " + detector.name() + " not required, skipping")
+            return False
+        # and only if the register contains enough info for the detector to run
+        return detector.detectable(register)
+
+    def _should_refresh(self, detector, register, entry):
+        if self.ledger.is_current(entry, detector.version, inputs_hash(register, detector), detector.max_age):
+            log.info(str(register.repo_url) + " - " + detector.name() + " up to date, skipping")
+            return False
+
+        # the fields should still hold what the detector found last time; if they don't, someone
+        # has changed them since, and we leave them be
+        for field, value in entry["output"].iteritems():
+            if not isinstance(value, list) and field_value(register, field) != value:
+                log.info(str(register.repo_url) + " - " + detector.name() + " results have been edited, skipping")
+                return False
+
+        if not detector.detectable(register):
+            return False
+        with self._register_lock:
+            retract(register, entry["output"])
+        return True
+
+    def _run_detector(self, detector, register, info, abandoned=None):
+        log.info(str(register.repo_url) + " - " + detector.name())
+        if self.ledger is not None and register.repo_url is not None:
+            inputs = inputs_hash(register, detector)
+            before = dict([(field, deepcopy(field_value(register, field))) for field in detector.writes])
+        target = RecordingRegister(register, self._register_lock, abandoned)
+        try:
+            if info.stats is not None:
+                with info.stats.measure(detector.name()):
+                    detector.detect(target, info)
+            else:
+                detector.detect(target, info)
+        except Exception as e:
+            log.info(e.message)
+            return FAILED
+        # a detector which finished after the deadline may have had its fetches cut short, so what
+        # it found may be incomplete, and isn't recorded in the ledger
+        if self.ledger is not None and register.repo_url is not None and not self._cancelled.is_set() and not info.expired():
+            self.ledger.put(register.repo_url, detector.name(), detector.version, inputs, detector_output(register, detector, before, target.added))
+        return COMPLETED
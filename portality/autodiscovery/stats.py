@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+import resource, sys, threading, time
+
+# the cpu time of just the calling thread, where the platform can tell us (RUSAGE_THREAD is 1 on
+# linux, but python 2 doesn't give it a name); otherwise that of the whole process
+RUSAGE_THREAD = getattr(resource, "RUSAGE_THREAD", 1 if sys.platform.startswith("linux") else resource.RUSAGE_SELF)
+
+# the counters kept for each detector
+COUNTERS = ["runs", "wall", "cpu", "fetches", "bytes", "cache_hits", "cache_misses", "whois_lookups", "exceptions"]
+
+# the name under which anything done outside of a detector is counted
+OTHER = "other"
+
+_local = threading.local()
+
+def cpu_time():
+    usage = resource.getrusage(RUSAGE_THREAD)
+    return usage.ru_utime + usage.ru_stime
+
+def current():
+    """
+    the name of the detector the calling thread is working for
+    """
+    return getattr(_local, "detector", None) or OTHER
+
+def bind(fn):
+    """
+    Wrap a function which is to be run on another thread (e.g. a fetch submitted to Info's
+    pool) so that what it does is counted against the detector which asked for it
+    """
+    detector = current()
+    def bound(*args, **kwargs):
+        previous = getattr(_local, "detector", None)
+        _local.detector = detector
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.detector = previous
+    return bound
+
+def new_counters():
+    return dict([(c, 0) for c in COUNTERS])
+
+def add_summary(total, summary):
+    """
+    add the per-detector counts of one summary into a running total of the same form, e.g.
+    over all the urls of a batch run
+    """
+    for name, counts in summary.get("detectors", {}).iteritems():
+        into = total.setdefault("detectors", {}).setdefault(name, new_counters())
+        for c in COUNTERS:
+            into[c] += counts.get(c, 0)
+    into = total.setdefault("totals", new_counters())
+    for c in COUNTERS:
+        into[c] += summary.get("totals", {}).get(c, 0)
+    return total
+
+class Stats(object):
+    """
+    Where the time goes in a discover or enhance run: for each detector, the wall and cpu time
+    it took, the fetches it made and the bytes they brought back, its hits and misses on the
+    Info cache, whois lookups, and the exceptions it raised.  Fetches are counted against the
+    detector which first asked for the url; later detectors using it get a cache hit
+    """
+    def __init__(self):
+        self.detectors = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def count(self, counter, n=1):
+        name = current()
+        with self._lock:
+            counts = self.detectors.setdefault(name, new_counters())
+            counts[counter] += n
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Count everything done in the block (and in the fetches it binds to other threads)
+        against the named detector:
+
+            with stats.measure(detector.name()):
+                detector.detect(register, info)
+        """
+        previous = getattr(_local, "detector", None)
+        _local.detector = name
+        wall = time.time()
+        cpu = cpu_time()
+        try:
+            yield
+        except Exception as e:
+            self.count("exceptions")
+            with self._lock:
+                self.errors.setdefault(name, []).append(str(e))
+            raise
+        finally:
+            self.count("runs")
+            self.count("wall", time.time() - wall)
+            self.count("cpu", cpu_time() - cpu)
+            _local.detector = previous
+
+    def summary(self):
+        """
+        the counts for each detector, their totals, and the exceptions raised.  The detectors
+        run concurrently, so the total wall time is more than the run itself took
+        """
+        with self._lock:
+            detectors = dict([(name, dict(counts)) for name, counts in self.detectors.iteritems()])
+            errors = dict([(name, list(e)) for name, e in self.errors.iteritems()])
+        totals = new_counters()
+        for counts in detectors.values():
+            for c in COUNTERS:
+                totals[c] += counts[c]
+        return {"detectors" : detectors, "totals" : totals, "errors" : errors}
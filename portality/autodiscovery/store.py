@@ -0,0 +1,302 @@
+import sqlite3, threading, os, json, time
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+class SQLiteStore(object):
+    """
+    Base class for the on-disk stores used by autodiscovery.  SQLite connections may not be
+    shared between threads or across a fork, so each thread in each process gets its own.
+    The database is put in WAL mode so that many gunicorn workers and batch processes can
+    read it while one of them writes
+    """
+    schema = []
+    busy_timeout = 30
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self.connection()
+        with conn:
+            for statement in self.schema:
+                conn.execute(statement)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+class HTTPCache(SQLiteStore):
+    """
+    Persistent response cache for Info.url_get.  Responses are fresh for ttl seconds; after
+    that they are revalidated with If-None-Match/If-Modified-Since where the server gave us
+    an ETag or Last-Modified.  Urls which could not be reached at all are remembered as
+    negative entries for negative_ttl seconds.  5xx responses are not stored
+    """
+    schema = [
+        """CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            status INTEGER,
+            headers TEXT,
+            body BLOB,
+            etag TEXT,
+            last_modified TEXT,
+            fetched REAL,
+            expires REAL,
+            negative INTEGER
+        )"""
+    ]
+
+    def __init__(self, path, ttl=86400, negative_ttl=3600):
+        super(HTTPCache, self).__init__(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    def get(self, url):
+        row = self.connection().execute("SELECT * FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return dict(row)
+
+    def is_fresh(self, entry):
+        return entry["expires"] > time.time()
+
+    def validators(self, entry):
+        """
+        headers for a conditional GET which revalidates this entry
+        """
+        headers = {}
+        if entry is None or entry["negative"]:
+            return headers
+        if entry["etag"] is not None:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"] is not None:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, resp):
+        # server errors and "too many requests" say nothing about the page itself
+        if resp.status_code >= 500 or resp.status_code == 429:
+            return
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                         (url, resp.status_code, json.dumps(dict(resp.headers)), sqlite3.Binary(resp.content),
+                          resp.headers.get("etag"), resp.headers.get("last-modified"), now, now + self.ttl))
+
+    def put_negative(self, url):
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO http_cache VALUES (?, NULL, NULL, NULL, NULL, NULL, ?, ?, 1)",
+                         (url, now, now + self.negative_ttl))
+
+    def refresh(self, url):
+        """
+        the server told us our copy is still good (304), so make it fresh again
+        """
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE http_cache SET fetched = ?, expires = ? WHERE url = ?", (now, now + self.ttl, url))
+
+    def response(self, entry):
+        """
+        rebuild a requests Response from a (non-negative) cache entry
+        """
+        resp = Response()
+        resp.url = entry["url"]
+        resp.status_code = entry["status"]
+        resp.headers = CaseInsensitiveDict(json.loads(entry["headers"]))
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp._content = bytes(entry["body"])
+        resp._content_consumed = True
+        return resp
+
+class WhoisCache(SQLiteStore):
+    """
+    Persistent cache of raw whois records, keyed by registrable domain so that all the hosts
+    under one domain share a single lookup.  Records are kept for ttl seconds
+    """
+    schema = [
+        """CREATE TABLE IF NOT EXISTS whois_cache (
+            domain TEXT PRIMARY KEY,
+            body TEXT,
+            fetched REAL,
+            expires REAL
+        )"""
+    ]
+
+    def __init__(self, path, ttl=2592000):
+        super(WhoisCache, self).__init__(path)
+        self.ttl = ttl
+
+    def get(self, domain):
+        """
+        the body of the whois record for the domain, or None if we don't have a fresh one
+        """
+        row = self.connection().execute("SELECT body FROM whois_cache WHERE domain = ? AND expires > ?",
+                                        (domain, time.time())).fetchone()
+        if row is None:
+            return None
+        return row["body"]
+
+    def put(self, domain, body):
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO whois_cache VALUES (?, ?, ?, ?)", (domain, body, now, now + self.ttl))
+
+class DetectionLedger(SQLiteStore):
+    """
+    What each detector found for each repository, and when, which version of the detector
+    found it and from what inputs, so that re-enriching a register need only re-run the
+    detectors whose results are out of date.  Results are considered stale after ttl seconds
+    unless the detector says otherwise
+    """
+    schema = [
+        """CREATE TABLE IF NOT EXISTS detection_ledger (
+            repo_url TEXT,
+            detector TEXT,
+            detected REAL,
+            version INTEGER,
+            inputs_hash TEXT,
+            output TEXT,
+            PRIMARY KEY (repo_url, detector)
+        )"""
+    ]
+
+    def __init__(self, path, ttl=2592000):
+        super(DetectionLedger, self).__init__(path)
+        self.ttl = ttl
+
+    def get(self, repo_url, detector):
+        row = self.connection().execute("SELECT * FROM detection_ledger WHERE repo_url = ? AND detector = ?",
+                                        (repo_url, detector)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["output"] = json.loads(entry["output"])
+        return entry
+
+    def is_current(self, entry, version, inputs_hash, max_age=None):
+        """
+        is the entry from this version of the detector, working from the same inputs, and recent enough
+        """
+        if max_age is None:
+            max_age = self.ttl
+        return entry["version"] == version and entry["inputs_hash"] == inputs_hash and entry["detected"] + max_age > time.time()
+
+    def put(self, repo_url, detector, version, inputs_hash, output):
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO detection_ledger VALUES (?, ?, ?, ?, ?, ?)",
+                         (repo_url, detector, time.time(), version, inputs_hash, json.dumps(output)))
+
+class JobStore(SQLiteStore):
+    """
+    The discovery jobs submitted by the web app, and the results of those which have finished.
+    Any gunicorn worker may be asked about a job which another one is running, so they are
+    kept here rather than in the memory of the process running them
+    """
+    schema = [
+        """CREATE TABLE IF NOT EXISTS discovery_jobs (
+            id TEXT PRIMARY KEY,
+            url TEXT,
+            status TEXT,
+            submitted REAL,
+            started REAL,
+            finished REAL,
+            error TEXT,
+            result TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS discovery_jobs_url ON discovery_jobs (url, submitted)"
+    ]
+
+    def get(self, job_id):
+        row = self.connection().execute("SELECT * FROM discovery_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return self._entry(row)
+
+    def latest(self, url):
+        """
+        the most recently submitted job for the url, or None if there is none
+        """
+        row = self.connection().execute("SELECT * FROM discovery_jobs WHERE url = ? ORDER BY submitted DESC LIMIT 1",
+                                        (url,)).fetchone()
+        if row is None:
+            return None
+        return self._entry(row)
+
+    def create(self, job_id, url):
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT INTO discovery_jobs VALUES (?, ?, 'queued', ?, NULL, NULL, NULL, NULL)",
+                         (job_id, url, time.time()))
+
+    def create_unless(self, job_id, url, reusable):
+        """
+        The latest job for the url if reusable(job) says it will do, otherwise a new queued job
+        with the given id, as a tuple of (job, whether it was created).  This is done in a single
+        write transaction, so that two processes submitting the same url at once can't both
+        create a job for it.  reusable must not itself use the store
+        """
+        conn = self.connection()
+        # take the write lock before looking, rather than when first writing, by managing the
+        # transaction ourselves
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT * FROM discovery_jobs WHERE url = ? ORDER BY submitted DESC LIMIT 1",
+                                   (url,)).fetchone()
+                if row is not None and reusable(self._entry(row)):
+                    conn.execute("COMMIT")
+                    return self._entry(row), False
+                conn.execute("INSERT INTO discovery_jobs VALUES (?, ?, 'queued', ?, NULL, NULL, NULL, NULL)",
+                             (job_id, url, time.time()))
+                conn.execute("COMMIT")
+            except:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.isolation_level = ""
+        return self.get(job_id), True
+
+    def start(self, job_id):
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE discovery_jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), job_id))
+
+    def finish(self, job_id, result):
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE discovery_jobs SET status = 'done', finished = ?, result = ? WHERE id = ?",
+                         (time.time(), json.dumps(result), job_id))
+
+    def fail(self, job_id, error):
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE discovery_jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+                         (time.time(), error, job_id))
+
+    def purge(self, before):
+        """
+        forget the jobs submitted before the given time
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM discovery_jobs WHERE submitted < ?", (before,))
+
+    def _entry(self, row):
+        entry = dict(row)
+        if entry["result"] is not None:
+            entry["result"] = json.loads(entry["result"])
+        return entry
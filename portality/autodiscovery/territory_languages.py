@@ -0,0 +1,260 @@
+# Generated by portality/scripts/territory_languages.py from supplementalData.xml - do not edit
+# Maps each ISO 3166-1 territory code to the languages assumed to be spoken there
+
+TERRITORY_LANGUAGES = {'AC': ['en'],
+ 'AD': ['ca'],
+ 'AE': ['ar'],
+ 'AF': ['fa', 'ps'],
+ 'AG': ['en'],
+ 'AI': ['en'],
+ 'AL': ['sq'],
+ 'AM': ['hy'],
+ 'AO': ['pt'],
+ 'AQ': ['und'],
+ 'AR': ['es'],
+ 'AS': ['sm'],
+ 'AT': ['de'],
+ 'AU': [],
+ 'AW': ['nl', 'pap'],
+ 'AX': ['sv'],
+ 'AZ': ['az_Cyrl', 'az_Latn'],
+ 'BA': ['bs_Cyrl', 'bs_Latn', 'hr', 'sr_Cyrl', 'sr_Latn'],
+ 'BB': ['en'],
+ 'BD': ['bn'],
+ 'BE': ['de', 'fr', 'nl'],
+ 'BF': ['fr'],
+ 'BG': ['bg'],
+ 'BH': ['ar'],
+ 'BI': ['fr', 'rn'],
+ 'BJ': ['fr'],
+ 'BL': ['fr'],
+ 'BM': ['en'],
+ 'BN': ['ms_Arab', 'ms_Latn'],
+ 'BO': ['ay', 'es', 'qu'],
+ 'BQ': ['nl', 'pap'],
+ 'BR': ['pt'],
+ 'BS': ['en'],
+ 'BT': ['dz'],
+ 'BV': ['und'],
+ 'BW': ['en', 'tn'],
+ 'BY': ['be', 'ru'],
+ 'BZ': ['en'],
+ 'CA': ['en', 'fr'],
+ 'CC': [],
+ 'CD': ['fr'],
+ 'CF': ['fr', 'sg'],
+ 'CG': ['fr', 'ln'],
+ 'CH': ['de', 'fr', 'it'],
+ 'CI': ['fr'],
+ 'CK': ['en'],
+ 'CL': ['es'],
+ 'CM': ['en', 'fr'],
+ 'CN': ['zh_Hans'],
+ 'CO': ['es'],
+ 'CP': ['und'],
+ 'CR': ['es'],
+ 'CU': ['es'],
+ 'CV': ['pt'],
+ 'CW': ['nl'],
+ 'CX': ['en'],
+ 'CY': ['el', 'tr'],
+ 'CZ': ['cs'],
+ 'DE': ['de'],
+ 'DG': ['en'],
+ 'DJ': ['ar', 'fr'],
+ 'DK': ['da'],
+ 'DM': ['en'],
+ 'DO': ['es'],
+ 'DZ': ['ar', 'fr'],
+ 'EA': ['es'],
+ 'EC': ['es', 'qu'],
+ 'EE': ['et'],
+ 'EG': ['ar'],
+ 'EH': ['ar'],
+ 'ER': ['ar', 'en'],
+ 'ES': ['es'],
+ 'ET': ['am'],
+ 'FI': ['fi', 'sv'],
+ 'FJ': ['en', 'fj'],
+ 'FK': ['en'],
+ 'FM': ['chk', 'en', 'kos', 'pon', 'uli', 'yap'],
+ 'FO': ['fo'],
+ 'FR': ['fr'],
+ 'GA': ['fr'],
+ 'GB': ['en'],
+ 'GD': ['en'],
+ 'GE': ['ka'],
+ 'GF': ['fr'],
+ 'GG': ['en'],
+ 'GH': ['en'],
+ 'GI': ['en'],
+ 'GL': ['da', 'kl'],
+ 'GM': ['en'],
+ 'GN': ['fr'],
+ 'GP': ['fr'],
+ 'GQ': ['es', 'fr'],
+ 'GR': ['el'],
+ 'GS': ['und'],
+ 'GT': ['es'],
+ 'GU': ['ch'],
+ 'GW': ['pt'],
+ 'GY': ['en'],
+ 'HK': ['en', 'zh_Hant'],
+ 'HM': ['und'],
+ 'HN': ['es'],
+ 'HR': ['hr'],
+ 'HT': ['fr', 'ht'],
+ 'HU': ['hu'],
+ 'IC': ['es'],
+ 'ID': ['id'],
+ 'IE': ['en', 'ga'],
+ 'IL': ['ar', 'he'],
+ 'IM': ['en', 'gv'],
+ 'IN': ['en', 'hi'],
+ 'IO': ['en'],
+ 'IQ': ['ar'],
+ 'IR': ['fa'],
+ 'IS': ['is'],
+ 'IT': ['it'],
+ 'JE': ['en'],
+ 'JM': ['en'],
+ 'JO': ['ar'],
+ 'JP': ['ja'],
+ 'KE': ['en', 'sw'],
+ 'KG': ['ky_Cyrl', 'ru'],
+ 'KH': ['km'],
+ 'KI': ['en', 'gil'],
+ 'KM': ['ar', 'fr', 'zdj'],
+ 'KN': ['en'],
+ 'KP': ['ko'],
+ 'KR': ['ko'],
+ 'KW': ['ar'],
+ 'KY': ['en'],
+ 'KZ': ['kk_Cyrl', 'ru'],
+ 'LA': ['lo'],
+ 'LB': ['ar'],
+ 'LC': ['en'],
+ 'LI': ['de'],
+ 'LK': ['si', 'ta'],
+ 'LR': ['en'],
+ 'LS': ['en', 'st'],
+ 'LT': ['lt'],
+ 'LU': ['de', 'fr', 'lb'],
+ 'LV': ['lv'],
+ 'LY': ['ar'],
+ 'MA': ['ar', 'tzm_Latn'],
+ 'MC': ['fr'],
+ 'MD': ['ro'],
+ 'ME': ['sr_Latn'],
+ 'MF': ['fr'],
+ 'MG': ['en', 'fr', 'mg'],
+ 'MH': ['en', 'mh'],
+ 'MK': ['mk'],
+ 'ML': ['fr'],
+ 'MM': ['my'],
+ 'MN': ['mn_Cyrl'],
+ 'MO': ['pt', 'zh_Hant'],
+ 'MP': [],
+ 'MQ': ['fr'],
+ 'MR': ['ar'],
+ 'MS': ['en'],
+ 'MT': ['en', 'mt'],
+ 'MU': ['en', 'fr'],
+ 'MV': ['dv'],
+ 'MW': ['en', 'ny'],
+ 'MX': [],
+ 'MY': ['ms_Latn'],
+ 'MZ': ['pt'],
+ 'NA': ['en'],
+ 'NC': ['fr'],
+ 'NE': ['fr'],
+ 'NF': ['en'],
+ 'NG': ['en', 'yo'],
+ 'NI': ['es'],
+ 'NL': ['nl'],
+ 'NO': ['nb', 'nn'],
+ 'NP': ['ne'],
+ 'NR': ['en', 'na'],
+ 'NU': ['en', 'niu'],
+ 'NZ': ['mi'],
+ 'OM': ['ar'],
+ 'PA': ['es'],
+ 'PE': ['es', 'qu'],
+ 'PF': ['fr', 'ty'],
+ 'PG': ['en', 'ho', 'tpi'],
+ 'PH': ['en', 'fil'],
+ 'PK': ['en', 'ur'],
+ 'PL': ['pl'],
+ 'PM': ['fr'],
+ 'PN': ['en'],
+ 'PR': ['es'],
+ 'PS': ['ar'],
+ 'PT': ['pt'],
+ 'PW': ['en', 'pau'],
+ 'PY': ['es', 'gn'],
+ 'QA': ['ar'],
+ 'RE': ['fr'],
+ 'RO': ['ro'],
+ 'RS': ['sr_Cyrl', 'sr_Latn'],
+ 'RU': ['ru'],
+ 'RW': ['en', 'fr', 'rw'],
+ 'SA': ['ar'],
+ 'SB': ['en'],
+ 'SC': ['en', 'fr'],
+ 'SD': ['ar', 'en'],
+ 'SE': ['sv'],
+ 'SG': ['en', 'ms_Latn', 'ta', 'zh_Hans'],
+ 'SH': ['en'],
+ 'SI': ['sl'],
+ 'SJ': ['nb'],
+ 'SK': ['sk'],
+ 'SL': ['en'],
+ 'SM': ['it'],
+ 'SN': ['fr', 'wo'],
+ 'SO': ['ar', 'so'],
+ 'SR': ['nl'],
+ 'SS': ['ar', 'en'],
+ 'ST': ['pt'],
+ 'SV': ['es'],
+ 'SX': ['en', 'nl'],
+ 'SY': ['ar', 'fr'],
+ 'SZ': ['en', 'ss'],
+ 'TA': ['en'],
+ 'TC': ['en'],
+ 'TD': ['ar', 'fr'],
+ 'TF': ['fr'],
+ 'TG': ['fr'],
+ 'TH': ['th'],
+ 'TJ': ['tg_Cyrl'],
+ 'TK': ['en', 'tkl'],
+ 'TL': ['pt', 'tet'],
+ 'TM': ['tk_Latn'],
+ 'TN': ['ar', 'fr'],
+ 'TO': ['en', 'to'],
+ 'TR': ['tr'],
+ 'TT': ['en'],
+ 'TV': ['en', 'tvl'],
+ 'TW': ['zh_Hant'],
+ 'TZ': ['en', 'sw'],
+ 'UA': ['uk'],
+ 'UG': ['en', 'sw'],
+ 'UM': ['en'],
+ 'US': [],
+ 'UY': ['es'],
+ 'UZ': ['uz_Cyrl', 'uz_Latn'],
+ 'VA': [],
+ 'VC': ['en'],
+ 'VE': ['es'],
+ 'VG': ['en'],
+ 'VI': ['en'],
+ 'VN': ['vi'],
+ 'VU': ['bi', 'en', 'fr'],
+ 'WF': ['fr'],
+ 'WS': ['en', 'sm'],
+ 'XK': ['sq', 'sr_Cyrl', 'sr_Latn'],
+ 'YE': ['ar'],
+ 'YT': ['fr'],
+ 'ZA': ['af', 'en', 'nr', 'nso', 'ss', 'st', 'tn', 'ts', 've', 'xh', 'zu'],
+ 'ZM': ['en'],
+ 'ZW': ['en', 'nd', 'sn'],
+ 'ZZ': []}
@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+from email.utils import parsedate_tz, mktime_tz
+import threading, time
+
+class TokenBucket(object):
+    """
+    Allows rate requests per second on average, with bursts of up to capacity requests.
+    Safe to share between threads; acquire() blocks until a token is available
+    """
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill(time.time())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter(object):
+    """
+    A token bucket for each key (e.g. each server we talk to), all with the same rate and capacity
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, key):
+        with self._lock:
+            if key not in self._buckets:
+                self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[key]
+
+    def acquire(self, key):
+        self.bucket(key).acquire()
+
+def retry_after(value):
+    """
+    The seconds to wait given by a Retry-After header, which may be a number of seconds or an
+    http date.  None if there is no (usable) header
+    """
+    if value is None:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return max(0, mktime_tz(parsed) - time.time())
+
+class HostGate(object):
+    """
+    Politeness towards the servers we crawl: no more than concurrency requests in flight to
+    any one host (None for no limit), at least delay seconds between the start of one request
+    to a host and the start of the next, and nothing at all to a host which has told us to
+    back off until it says so
+    """
+    def __init__(self, concurrency=None, delay=0):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = {
+                    "slots" : threading.Semaphore(self.concurrency) if self.concurrency else None,
+                    "next_start" : 0,
+                    "blocked_until" : 0
+                }
+                self._hosts[host] = state
+            return state
+
+    @contextmanager
+    def slot(self, host):
+        """
+        Wait until a request may be made to the host, and hold its place while it is made:
+
+            with gate.slot(host):
+                resp = session.get(url)
+        """
+        state = self._state(host)
+        if state["slots"] is not None:
+            state["slots"].acquire()
+        try:
+            with self._lock:
+                now = time.time()
+                start = max(now, state["next_start"], state["blocked_until"])
+                state["next_start"] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            if state["slots"] is not None:
+                state["slots"].release()
+
+    def back_off(self, host, seconds):
+        """
+        make no more requests to the host for the given number of seconds
+        """
+        state = self._state(host)
+        with self._lock:
+            state["blocked_until"] = max(state["blocked_until"], time.time() + seconds)
+
+    def blocked_for(self, host):
+        """
+        how many more seconds the host has asked us to leave it alone for
+        """
+        state = self._state(host)
+        with self._lock:
+            return max(0, state["blocked_until"] - time.time())
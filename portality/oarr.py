@@ -244,10 +244,7 @@ class Register(object):
         return l
 
     def add_software(self, name, version, url):
-        if "register" not in self.raw:
-            self.raw["register"] = {}
-        if "software" not in self.raw["register"]:
-            self.raw["register"]["software"] = []
+        self.raw.setdefault("register", {}).setdefault("software", [])
         obj = {"name" :  name}
         if version is not None:
             obj["version"] = version
@@ -265,10 +262,7 @@ class Register(object):
         need to extend the api to build the object?  Will do so later
         if necessary
         """
-        if "register" not in self.raw:
-            self.raw["register"] = {}
-        if "organisation" not in self.raw["register"]:
-            self.raw["register"]["organisation"] = []
+        self.raw.setdefault("register", {}).setdefault("organisation", [])
         self.raw["register"]["organisation"].append(org_obj)
 
     @property
@@ -281,21 +275,16 @@ class Register(object):
         need to extend the api to build the object?  Will do so later
         if necessary
         """
-        if "register" not in self.raw:
-            self.raw["register"] = {}
-        if "contact" not in self.raw["register"]:
-            self.raw["register"]["contact"] = []
+        self.raw.setdefault("register", {}).setdefault("contact", [])
         self.raw["register"]["contact"].append(contact_obj)
 
     def add_api_object(self, api_obj):
         """
         api obj needs to conform to correct structure
         """
-        # check that the api section of the object exists
-        if "register" not in self.raw:
-            self.raw["register"] = {}
-        if "api" not in self.raw["register"]:
-            self.raw["register"]["api"] = []
+        # check that the api section of the object exists (setdefault rather than test-and-set,
+        # as detectors may be adding concurrently)
+        self.raw.setdefault("register", {}).setdefault("api", [])
 
         # back out if we already have this url in the list
         for api in self.raw["register"]["api"]:
@@ -311,10 +300,24 @@ class Register(object):
             if type is None:
                 matches.append(api)
             else:
-                if api.get("type") == type:
+                if api.get("api_type") == type:
                     matches.append(api)
         return matches
 
+    @property
+    def detection(self):
+        """
+        how the detectors fared on the last autodiscovery run: a dict of the names of those which
+        completed, failed, were skipped for want of time, or timed out
+        """
+        return self.raw.get("admin", {}).get("autodiscovery", {})
+
+    def clear_detection(self):
+        self.raw.setdefault("admin", {})["autodiscovery"] = {}
+
+    def add_detection_outcome(self, detector, outcome):
+        self.raw.setdefault("admin", {}).setdefault("autodiscovery", {}).setdefault(outcome, []).append(detector)
+
     @property
     def created_date(self):
         return self.raw.get("created_date")
@@ -1,17 +1,29 @@
-from portality.autodiscovery import autodiscovery
-import json
+from portality.autodiscovery import autodiscovery, batch
+from portality import settings
+import json, sys
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
 
     parser.add_argument("-u", "--url", help="url to autodetect from")
+    parser.add_argument("-f", "--file", help="file containing a list of urls to autodetect from, one per line ('-' for stdin)")
+    parser.add_argument("-o", "--out", help="when using -f, file to write the results to as JSON lines.  If it already exists, urls with results in it are skipped, so an interrupted run can be resumed")
+    parser.add_argument("-w", "--workers", type=int, default=4, help="when using -f, number of worker processes")
 
     args = parser.parse_args()
 
-    if not args.url:
-        print "Please specify a url with the -u option"
+    if not args.url and not args.file:
+        print "Please specify a url with the -u option, or a file of urls with the -f option"
         exit()
 
-    register = autodiscovery.discover(args.url)
-    print json.dumps(register.raw)
\ No newline at end of file
+    config = dict([(k, v) for k, v in settings.__dict__.iteritems() if k.isupper()])
+    autodiscovery.configure(config)
+
+    if args.url:
+        register = autodiscovery.discover(args.url)
+        print json.dumps(register.raw)
+        exit()
+
+    summary = batch.run(batch.read_urls(args.file), output=args.out, workers=args.workers, config=config)
+    print >> sys.stderr, json.dumps(summary)
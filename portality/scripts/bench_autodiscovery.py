@@ -0,0 +1,339 @@
+"""
+Offline benchmark of discover and enhance.
+
+Serves a number of synthetic repositories from the recorded fixtures in
+test/resources/bench (one directory per platform, each with a manifest.json mapping request
+paths to the files to answer with) on local HTTP servers, with configurable latency and
+injected failures, then runs discovery and enhancement over all of them and reports the
+end-to-end latency and throughput, the time taken by each detector, and the peak memory.
+
+Each repository gets its own loopback address where the platform allows (any of 127.0.0.0/8
+on linux), so that per-host politeness and connection pooling behave as they would against
+real repositories; elsewhere they share 127.0.0.1 and are told apart by port.  The detectors
+which need the internet whatever the fixtures say (whois and ip geolocation) are left out
+"""
+from portality.autodiscovery import autodiscovery, detectors
+from portality.autodiscovery.batch import percentile
+from portality.autodiscovery.stats import Stats, add_summary
+from portality import settings
+from concurrent.futures import ThreadPoolExecutor
+import BaseHTTPServer, SocketServer
+import os, sys, json, random, resource, shutil, socket, tempfile, threading, time, logging
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", "test", "resources", "bench")
+
+# the detectors which look things up on the internet rather than on the repository itself
+ONLINE_DETECTORS = [detectors.Country, detectors.Organisation, detectors.TechnicalContact]
+BENCH_DETECTORS = [d for d in detectors.GENERAL if d not in ONLINE_DETECTORS]
+
+NOT_FOUND = "<html><head><title>404 Not Found</title></head><body><h1>Not Found</h1></body></html>"
+
+def load_platforms(fixtures_dir):
+    """
+    {platform : {path : (status, content type, body)}} for each directory of the fixtures
+    which has a manifest
+    """
+    platforms = {}
+    for name in sorted(os.listdir(fixtures_dir)):
+        manifest = os.path.join(fixtures_dir, name, "manifest.json")
+        if not os.path.isfile(manifest):
+            continue
+        with open(manifest) as f:
+            entries = json.load(f)
+        fixtures = {}
+        for path, entry in entries.iteritems():
+            with open(os.path.join(fixtures_dir, name, entry["file"]), "rb") as f:
+                fixtures[path] = (entry.get("status", 200), entry["type"], f.read())
+        platforms[name] = fixtures
+    return platforms
+
+class FixtureHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # keep-alive, so that the reuse of pooled connections is part of what is measured
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + server.random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = server.random.random()
+        if roll < server.drop_rate:
+            # hang up without answering, as an overloaded server or a flaky proxy might
+            self.close_connection = 1
+            return
+        if roll < server.drop_rate + server.error_rate:
+            self._send(500, "text/plain", "Internal Server Error\n")
+            return
+
+        status, content_type, body = server.fixtures.get(self.path, (404, "text/html", NOT_FOUND))
+        self._send(status, content_type, body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    One synthetic repository: answers from the fixtures of its platform, after the given
+    latency (in seconds, plus or minus up to jitter), failing the given fractions of requests
+    with a 500 or by closing the connection
+    """
+    daemon_threads = True
+
+    def __init__(self, address, platform, fixtures, latency=0, jitter=0, error_rate=0, drop_rate=0, seed=None):
+        BaseHTTPServer.HTTPServer.__init__(self, (address, 0), FixtureHandler)
+        self.platform = platform
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+
+    def handle_error(self, request, client_address):
+        # the client closing a kept-alive connection is how a run ends, not a problem
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    @property
+    def url(self):
+        return "http://%s:%d/" % self.server_address
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever)
+        t.daemon = True
+        t.start()
+
+def loopback_address(i):
+    """
+    the address for the i'th repository; all of 127.0.0.0/8 is local on linux, so each can have its own
+    """
+    if not sys.platform.startswith("linux"):
+        return "127.0.0.1"
+    i += 2
+    return "127.%d.%d.%d" % ((i >> 16) & 0xff, (i >> 8) & 0xff, i & 0xff)
+
+def dead_url(address):
+    """
+    the url of a port on the address which nothing is listening on
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind((address, 0))
+    port = s.getsockname()[1]
+    s.close()
+    return "http://%s:%d/" % (address, port)
+
+def start_repositories(platforms, n, latency=0, jitter=0, error_rate=0, drop_rate=0, dead_rate=0, seed=None):
+    """
+    Start n synthetic repositories, taking the platforms in turn.  Returns the servers (so they
+    can be shut down) and a list of (url, platform) for them all, where the dead_rate fraction
+    of them are urls that refuse connections
+    """
+    rand = random.Random(seed)
+    names = sorted(platforms.keys())
+    servers = []
+    repositories = []
+    for i in range(n):
+        address = loopback_address(i)
+        if rand.random() < dead_rate:
+            repositories.append((dead_url(address), "dead"))
+            continue
+        platform = names[i % len(names)]
+        server = FixtureServer(address, platform, platforms[platform], latency=latency, jitter=jitter,
+                               error_rate=error_rate, drop_rate=drop_rate, seed=rand.random())
+        server.start()
+        servers.append(server)
+        repositories.append((server.url, platform))
+    return servers, repositories
+
+def timed(fn, item):
+    """
+    run fn(item, stats), returning (result, seconds, stats summary, error)
+    """
+    stats = Stats()
+    result = None
+    error = None
+    start = time.time()
+    try:
+        result = fn(item, stats)
+    except Exception as e:
+        error = e.__class__.__name__ + ": " + str(e)
+    return result, time.time() - start, stats.summary(), error
+
+def run_phase(fn, items, concurrency):
+    """
+    run fn over all of the items, concurrency at a time.  Returns the elapsed time and the
+    result of timed() for each item, in order
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    start = time.time()
+    try:
+        results = list(executor.map(lambda item: timed(fn, item), items))
+    finally:
+        executor.shutdown(wait=True)
+    return time.time() - start, results
+
+def peak_memory():
+    """
+    the peak resident set size of this process so far, in MB (linux reports it in KB, OS X in bytes)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / 1048576.0
+    return peak / 1024.0
+
+def report(elapsed, results):
+    """
+    the figures for one phase: end-to-end latency and throughput, and for each detector how
+    often it ran and the spread of its wall time, with its fetches and exceptions
+    """
+    latencies = [seconds for result, seconds, summary, error in results]
+    failures = [error for result, seconds, summary, error in results if error is not None]
+    total = {}
+    walls = {}
+    for result, seconds, summary, error in results:
+        add_summary(total, summary)
+        for name, counts in summary["detectors"].iteritems():
+            if counts["runs"] > 0:
+                walls.setdefault(name, []).append(counts["wall"] / counts["runs"])
+
+    detector_figures = {}
+    for name, counts in total.get("detectors", {}).iteritems():
+        w = walls.get(name, [])
+        detector_figures[name] = {
+            "runs" : counts["runs"],
+            "mean" : sum(w) / len(w) if len(w) > 0 else 0.0,
+            "p50" : percentile(w, 50) if len(w) > 0 else 0.0,
+            "p95" : percentile(w, 95) if len(w) > 0 else 0.0,
+            "fetches" : counts["fetches"],
+            "bytes" : counts["bytes"],
+            "exceptions" : counts["exceptions"]
+        }
+
+    return {
+        "repositories" : len(results),
+        "elapsed" : elapsed,
+        "throughput" : len(results) / elapsed if elapsed > 0 else 0.0,
+        "latency" : {
+            "p50" : percentile(latencies, 50) if len(latencies) > 0 else 0.0,
+            "p95" : percentile(latencies, 95) if len(latencies) > 0 else 0.0,
+            "max" : max(latencies) if len(latencies) > 0 else 0.0
+        },
+        "failures" : len(failures),
+        "errors" : sorted(set(failures)),
+        "detectors" : detector_figures,
+        "totals" : total.get("totals", {}),
+        "peak_memory_mb" : peak_memory()
+    }
+
+def print_report(phase, figures):
+    latency = figures["latency"]
+    print "%s: %d repositories in %.2fs (%.2f/s), latency p50 %.3fs p95 %.3fs max %.3fs, %d failed" % \
+          (phase, figures["repositories"], figures["elapsed"], figures["throughput"],
+           latency["p50"], latency["p95"], latency["max"], figures["failures"])
+    print "  " + "detector".ljust(24) + "runs".rjust(7) + "mean".rjust(10) + "p50".rjust(10) + "p95".rjust(10) + \
+          "fetches".rjust(9) + "KB".rjust(9) + "errors".rjust(8)
+    for name, d in sorted(figures["detectors"].items(), key=lambda x: -x[1]["p95"]):
+        print "  " + name[:23].ljust(24) + str(d["runs"]).rjust(7) + ("%.4fs" % d["mean"]).rjust(10) + \
+              ("%.4fs" % d["p50"]).rjust(10) + ("%.4fs" % d["p95"]).rjust(10) + str(d["fetches"]).rjust(9) + \
+              ("%.1f" % (d["bytes"] / 1024.0)).rjust(9) + str(d["exceptions"]).rjust(8)
+    for error in figures["errors"][:10]:
+        print "  failure: " + error
+    print "  peak memory: %.1f MB" % figures["peak_memory_mb"]
+
+def age_ledger(ledger, registers, fraction, seed=None):
+    """
+    make the ledger entries of a fraction of the repositories stale, so that enhance has
+    something to do for them; returns the number of repositories aged
+    """
+    rand = random.Random(seed)
+    aged = [r.repo_url for r in registers if rand.random() < fraction]
+    conn = ledger.connection()
+    with conn:
+        for url in aged:
+            conn.execute("UPDATE detection_ledger SET detected = 0 WHERE repo_url = ?", (url,))
+    return len(aged)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-n", "--repositories", type=int, default=20, help="number of synthetic repositories to serve")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="number of repositories to work on at once")
+    parser.add_argument("-d", "--dir", default=FIXTURES_DIR, help="directory of recorded fixtures, one sub-directory (with a manifest.json) per platform")
+    parser.add_argument("-l", "--latency", type=float, default=0, help="milliseconds each request waits before being answered")
+    parser.add_argument("-j", "--jitter", type=float, default=0, help="milliseconds by which the latency varies either way")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests answered with a 500")
+    parser.add_argument("--drop-rate", type=float, default=0, help="fraction of requests whose connection is closed without an answer")
+    parser.add_argument("--dead-rate", type=float, default=0, help="fraction of repositories which refuse connections")
+    parser.add_argument("--stale", type=float, default=0.5, help="fraction of repositories whose ledger entries are made stale before enhancing")
+    parser.add_argument("--parser", help="html parser backend, instead of the configured one")
+    parser.add_argument("--impolite", action="store_true", help="turn off the per-host concurrency limit and delay")
+    parser.add_argument("--seed", type=int, help="seed for the injected latency and failures, for repeatable runs")
+    parser.add_argument("-o", "--out", help="file to write the full figures to as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the autodiscovery log")
+
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    platforms = load_platforms(args.dir)
+    if len(platforms) == 0:
+        print "No fixtures found in " + args.dir
+        exit()
+
+    # the configured settings, but with nothing cached between runs, and a ledger of our own
+    ledger_dir = tempfile.mkdtemp()
+    config = dict([(k, v) for k, v in settings.__dict__.iteritems() if k.isupper()])
+    config["AUTODISCOVERY_HTTP_CACHE"] = None
+    config["AUTODISCOVERY_WHOIS_CACHE"] = None
+    config["AUTODISCOVERY_LEDGER"] = os.path.join(ledger_dir, "ledger.db")
+    if args.parser:
+        config["AUTODISCOVERY_HTML_PARSER"] = args.parser
+    if args.impolite:
+        config["AUTODISCOVERY_HOST_CONCURRENCY"] = None
+        config["AUTODISCOVERY_HOST_DELAY"] = 0
+    autodiscovery.configure(config)
+
+    servers, repositories = start_repositories(platforms, args.repositories, latency=args.latency / 1000.0,
+                                               jitter=args.jitter / 1000.0, error_rate=args.error_rate,
+                                               drop_rate=args.drop_rate, dead_rate=args.dead_rate, seed=args.seed)
+    print "%d repositories (%s), peak memory at start %.1f MB" % (len(repositories),
+            ", ".join(["%d %s" % (len([r for r in repositories if r[1] == p]), p) for p in sorted(set([r[1] for r in repositories]))]),
+            peak_memory())
+
+    figures = {}
+    try:
+        def discover(url, stats):
+            return autodiscovery.discover(url, raise_registry_file_error=False, stats=stats, detector_classes=BENCH_DETECTORS)
+        elapsed, results = run_phase(discover, [url for url, platform in repositories], args.concurrency)
+        figures["discover"] = report(elapsed, results)
+        print_report("discover", figures["discover"])
+
+        registers = [result for result, seconds, summary, error in results if result is not None]
+        aged = age_ledger(autodiscovery.detection_ledger, registers, args.stale, seed=args.seed)
+        print "aged the ledger entries of %d of %d registers" % (aged, len(registers))
+
+        def enhance(register, stats):
+            return autodiscovery.enhance(register, stats=stats, detector_classes=BENCH_DETECTORS)
+        elapsed, results = run_phase(enhance, registers, args.concurrency)
+        figures["enhance"] = report(elapsed, results)
+        print_report("enhance", figures["enhance"])
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+        shutil.rmtree(ledger_dir)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(figures, f, indent=2)
@@ -0,0 +1,47 @@
+from portality.autodiscovery import htmlparse
+from portality.autodiscovery.detectors import PageIndex
+import os, time, codecs
+
+def bench(path, backend, repeats):
+    """
+    best time over a number of runs to parse the page and build its index, along with
+    a summary of what the index found so that the backends can be compared
+    """
+    with codecs.open(path, "r", "utf-8", errors="replace") as f:
+        text = f.read()
+    best = None
+    for i in range(repeats):
+        start = time.time()
+        page = PageIndex(htmlparse.parse(text, backend), "http://localhost/")
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    found = (len(page.links), len(page.anchors), sum([len(b) for b in page.blocks.values()]), page.title)
+    return best, found
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-d", "--dir", help="directory of saved repository home pages (*.html) to parse")
+    parser.add_argument("-n", "--repeats", type=int, default=5, help="number of times to parse each page; the best time is reported")
+
+    args = parser.parse_args()
+
+    if not args.dir:
+        print "Please specify a directory of saved pages with the -d option"
+        exit()
+
+    pages = sorted([f for f in os.listdir(args.dir) if f.endswith(".html") or f.endswith(".htm")])
+    totals = dict([(b, 0.0) for b in htmlparse.BACKENDS])
+
+    print "page".ljust(40) + "".join([b.rjust(12) for b in htmlparse.BACKENDS]) + "   agree"
+    for page in pages:
+        path = os.path.join(args.dir, page)
+        results = [bench(path, b, args.repeats) for b in htmlparse.BACKENDS]
+        for b, (elapsed, found) in zip(htmlparse.BACKENDS, results):
+            totals[b] += elapsed
+        agree = len(set([found for elapsed, found in results])) == 1
+        print page[:39].ljust(40) + "".join([("%.4fs" % elapsed).rjust(12) for elapsed, found in results]) + "   " + ("yes" if agree else "NO")
+
+    print "total".ljust(40) + "".join([("%.4fs" % totals[b]).rjust(12) for b in htmlparse.BACKENDS])
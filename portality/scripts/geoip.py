@@ -0,0 +1,22 @@
+"""
+Build the offline IP to country database used by the Country detector (AUTODISCOVERY_GEOIP_DB)
+from one or more CSV range files, e.g. the DB-IP "IP to Country Lite", IP2Location LITE DB1
+(IPv4 and IPv6) or GeoLite country CSVs.
+"""
+from portality.autodiscovery import geoip
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--csv", action="append", help="CSV file of ip ranges and their countries; may be given more than once")
+    parser.add_argument("-o", "--out", help="database file to write")
+
+    args = parser.parse_args()
+
+    if not args.csv or not args.out:
+        print "Please specify at least one CSV file with -i and the database to write with -o"
+        exit()
+
+    v4, v6 = geoip.build(args.csv, args.out)
+    print "Wrote " + str(v4) + " IPv4 and " + str(v6) + " IPv6 ranges to " + args.out
@@ -0,0 +1,70 @@
+"""
+Count the records in an OAI-PMH repository by walking its ListIdentifiers, e.g. to check what
+the harvester will record on a register's oai-pmh api entry.
+
+Given a file of discovery results (as written by auto.py -f), count the records of every
+oai-pmh api of every register in it, and write the results back out with the counts recorded
+on the api entries.  Run again over its own output, only what has changed since the last count
+is walked.
+"""
+from portality.autodiscovery import autodiscovery, harvest
+from portality.oarr import Register
+from portality import settings
+import json, sys
+
+def count_results(source, out):
+    """
+    count the oai-pmh apis of the registers in the results read from source (one JSON result per
+    line, with the register under "register"), writing each result to out as it is done
+    """
+    for line in source:
+        if line.strip() == "":
+            continue
+        result = json.loads(line)
+        if result.get("register") is not None:
+            harvest.count_register(Register(result["register"]))
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-u", "--url", help="OAI-PMH base url")
+    parser.add_argument("-f", "--from", dest="from_date", help="only count records added, changed or deleted since this datestamp")
+    parser.add_argument("--until", help="only count records up to this datestamp")
+    parser.add_argument("-s", "--set", help="only count the records in this set")
+    parser.add_argument("-p", "--prefix", help="metadata prefix to list the records in (default oai_dc)")
+    parser.add_argument("-r", "--results", help="file of discovery results (as written by auto.py -f) whose registers' oai-pmh apis are to be counted ('-' for stdin)")
+    parser.add_argument("-o", "--out", help="when using -r, file to write the results with their counts to (default stdout)")
+
+    args = parser.parse_args()
+
+    if not args.url and not args.results:
+        print "Please specify an OAI-PMH base url with the -u option, or a file of discovery results with the -r option"
+        exit()
+
+    config = dict([(k, v) for k, v in settings.__dict__.iteritems() if k.isupper()])
+    autodiscovery.configure(config)
+
+    if args.results:
+        source = sys.stdin if args.results == "-" else open(args.results)
+        out = sys.stdout if args.out is None else open(args.out, "w")
+        try:
+            count_results(source, out)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        exit()
+
+    harvester = harvest.Harvester(args.url, metadata_prefix=args.prefix)
+    try:
+        result = harvester.count(from_date=args.from_date, until=args.until, set_spec=args.set)
+    except harvest.HarvestException as e:
+        print "Unable to count the records: " + str(e)
+        exit()
+    finally:
+        harvester.close()
+    print json.dumps(result)
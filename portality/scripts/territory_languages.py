@@ -0,0 +1,42 @@
+"""
+Regenerate portality/autodiscovery/territory_languages.py from the CLDR supplementalData.xml,
+so that the Language detector can look up a territory's languages without parsing the xml.
+
+Run this again whenever supplementalData.xml is updated.
+"""
+from lxml import etree
+import os, pprint
+
+AUTODISCOVERY_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "autodiscovery")
+
+def territory_languages(supplemental_data):
+    """
+    The languages the detector should assume for each territory: where only one language is
+    listed, it is the one; otherwise all the official ones
+    """
+    tree = etree.parse(supplemental_data)
+    table = {}
+    for ti in tree.xpath("territoryInfo/territory"):
+        lps = ti.findall("languagePopulation")
+        if len(lps) == 1:
+            table[ti.get("type")] = [lps[0].get("type")]
+            continue
+        official = [lp.get("type") for lp in lps if lp.get("officialStatus") == "official"]
+        table[ti.get("type")] = sorted(set(official))
+    return table
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-s", "--source", default=os.path.join(AUTODISCOVERY_DIR, "supplementalData.xml"), help="CLDR supplementalData.xml to read")
+    parser.add_argument("-o", "--out", default=os.path.join(AUTODISCOVERY_DIR, "territory_languages.py"), help="python module to write")
+
+    args = parser.parse_args()
+
+    table = territory_languages(args.source)
+    with open(args.out, "w") as f:
+        f.write("# Generated by portality/scripts/territory_languages.py from supplementalData.xml - do not edit\n")
+        f.write("# Maps each ISO 3166-1 territory code to the languages assumed to be spoken there\n\n")
+        f.write("TERRITORY_LANGUAGES = " + pprint.pformat(table) + "\n")
+    print "Wrote " + str(len(table)) + " territories to " + args.out
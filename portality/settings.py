@@ -132,4 +132,100 @@ OARR_API_KEY = "" # you need to set this in your app.cfg
 
 # if someone is uploading a test file to validate, this is the maximum size that flask will
 # permit - 1Mb, which should be ample
-MAX_CONTENT_LENGTH = 1024 * 1024
\ No newline at end of file
+MAX_CONTENT_LENGTH = 1024 * 1024
+
+# ==============================
+# Autodiscovery settings
+
+# path to an SQLite file in which to keep fetched pages between autodiscovery runs; it may be
+# shared by all the gunicorn workers and batch jobs on a machine.  None disables the cache
+AUTODISCOVERY_HTTP_CACHE = None
+
+# seconds for which a cached page is used without asking the server if it has changed
+AUTODISCOVERY_HTTP_CACHE_TTL = 86400
+
+# seconds for which a url which could not be reached is not tried again
+AUTODISCOVERY_HTTP_CACHE_NEGATIVE_TTL = 3600
+
+# each repository host gets a keep-alive session; how many connection pools it keeps, and the
+# most connections it will open to the host at once (further requests wait for a free one)
+AUTODISCOVERY_SESSION_POOL_SIZE = 10
+AUTODISCOVERY_SESSION_MAX_CONNECTIONS = 8
+
+# how to parse repository pages: "bs4" (BeautifulSoup) or "lxml" (lxml.html, much faster on big
+# pages).  Compare them on saved pages with portality/scripts/bench_parse.py
+AUTODISCOVERY_HTML_PARSER = "bs4"
+
+# the most bytes of fetched and parsed documents each discovery (or each long-lived Info, as in a batch
+# worker) keeps in memory, least recently used first out; parsed pages are estimated at many times the
+# size of their html.  None for no limit.  And whether to let go of each response body as soon as it
+# has been parsed, which saves memory on big sites but means fetching it again if its raw body is wanted
+AUTODISCOVERY_INFO_CACHE_BUDGET = 134217728
+AUTODISCOVERY_INFO_DROP_PARSED_BODIES = False
+
+# the most bytes of each kind of document autodiscovery will read; anything longer is cut off.
+# Documents of the wrong content type for what a detector wants (e.g. a pdf at a guessed url) are
+# not read at all.  Any kinds left out keep the defaults in detectors.Info.fetch_limits
+AUTODISCOVERY_FETCH_LIMITS = {
+    "html" : 2097152,       # repository home pages
+    "xml" : 262144,         # OAI-PMH Identify, SWORD service documents, OpenSearch descriptions
+    "feed" : 1048576,
+    "rdf" : 4194304,
+    "json" : 262144,
+    "default" : 4194304
+}
+
+# path to an SQLite file (it may be the same one as the http cache) in which to keep whois records,
+# which are held per registered domain, and the seconds for which to keep them.  None disables it
+AUTODISCOVERY_WHOIS_CACHE = None
+AUTODISCOVERY_WHOIS_CACHE_TTL = 2592000
+
+# the most whois queries per second we will make to any one registry, and how many may be made
+# in a burst.  Batch runs share this between their worker processes
+AUTODISCOVERY_WHOIS_RATE = 0.5
+AUTODISCOVERY_WHOIS_BURST = 5
+
+# seconds for which a host name lookup is remembered, and for which a host which did not resolve
+# is treated as dead (no fetches are attempted to it)
+AUTODISCOVERY_DNS_TTL = 300
+AUTODISCOVERY_DNS_NEGATIVE_TTL = 300
+
+# politeness towards the servers autodiscovery crawls: the most requests in flight to any one host
+# (None for no limit), the least seconds between the starts of requests to a host, and the longest
+# we will wait when a host answers 429 or 503 with a Retry-After (beyond that we leave it alone)
+AUTODISCOVERY_HOST_CONCURRENCY = 4
+AUTODISCOVERY_HOST_DELAY = 0.1
+AUTODISCOVERY_MAX_RETRY_AFTER = 30
+
+# path to an SQLite file (it may be the same one as the caches) recording what each detector found
+# for each repository, so that enhancing a register only re-runs the detectors whose results have
+# gone stale (after the ttl in seconds, or the detector's own max_age) or whose inputs have changed.
+# None to always run everything a register needs
+AUTODISCOVERY_LEDGER = None
+AUTODISCOVERY_LEDGER_TTL = 2592000
+
+# path to the offline ip to country database which the Country detector tries before asking
+# api.hostip.info; build it from CSV range files with portality/scripts/geoip.py.  None to not use one
+AUTODISCOVERY_GEOIP_DB = None
+
+# counting the records of an OAI-PMH repository: the seconds to wait for each page of the list, and
+# the longest we will wait when the repository answers 503 with a Retry-After part way through
+AUTODISCOVERY_OAI_PAGE_TIMEOUT = 60
+AUTODISCOVERY_OAI_MAX_RETRY_AFTER = 300
+
+# the web app can run discovery in the background, so that slow repositories don't hold up its workers.
+# The path to the SQLite file in which the jobs and their results are kept; it must be shared by all
+# the gunicorn workers, as any of them may be asked how a job is going, and somewhere that isn't
+# cleared out from under them (i.e. not a tmp directory).  None to discover in the request itself
+AUTODISCOVERY_JOBS = None
+
+# how many jobs each gunicorn worker runs at once, the seconds for which a finished result is given out
+# again rather than the repository being discovered anew, and the seconds after which an unfinished
+# job is given up on
+AUTODISCOVERY_JOB_WORKERS = 2
+AUTODISCOVERY_JOB_RESULT_TTL = 3600
+AUTODISCOVERY_JOB_TIMEOUT = 900
+
+# the seconds the web app's discovery jobs are given; when they are up, no more fetches are made and
+# the job finishes with whatever has been detected so far.  None to let discovery take as long as it takes
+AUTODISCOVERY_INTERACTIVE_DEADLINE = 30
@@ -0,0 +1,84 @@
+import json, os, shutil, tempfile
+from unittest import TestCase
+from portality.autodiscovery import batch
+from portality.autodiscovery.resolver import Resolver
+
+def discover_one(url):
+    # stands in for discovery in the worker processes, which are forked with it in place
+    return {"url" : url, "pid" : os.getpid(), "elapsed" : 0.5, "stats" : {}}
+
+def discover_fails(url):
+    raise ValueError("worker failed on " + url)
+
+class TestBatch(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.dir, "results.jsonl")
+        self.discover_one = batch._discover_one
+        self.lookup = Resolver._lookup
+        Resolver._lookup = lambda resolver, host: ["127.0.0.1"]
+        batch._discover_one = discover_one
+
+    def tearDown(self):
+        batch._discover_one = self.discover_one
+        Resolver._lookup = self.lookup
+        shutil.rmtree(self.dir)
+
+    def results(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_01_read_urls(self):
+        source = os.path.join(self.dir, "urls.txt")
+        with open(source, "w") as f:
+            f.write("http://repo.example.org/\n\n# a comment\n  eprints.example.org  \n")
+        assert batch.read_urls(source) == ["http://repo.example.org/", "eprints.example.org"]
+
+    def test_02_percentile(self):
+        assert batch.percentile([], 50) is None
+        assert batch.percentile([3, 1, 2], 50) == 2
+        assert batch.percentile(range(1, 101), 95) == 95
+        assert batch.percentile([7], 95) == 7
+
+    def test_03_grouped_by_host(self):
+        groups = dict([(host, urls) for host, addresses, urls in batch._resolved(["http://a.example.org/", "http://b.example.org/", "http://a.example.org/x"])])
+        assert groups == {"a.example.org" : ["http://a.example.org/", "http://a.example.org/x"], "b.example.org" : ["http://b.example.org/"]}
+
+    def test_04_run(self):
+        # urls without a scheme are normalised, so they are grouped by their host (each host's urls
+        # going to a single worker), and are duplicates of the same url with one
+        summary = batch.run(["repo.example.org", "http://repo.example.org/other", "http://other.example.org/", "http://repo.example.org"],
+                            output=self.output, workers=2)
+        assert summary["urls"] == 3
+        assert summary["p50"] == 0.5
+
+        results = self.results()
+        assert sorted([r["url"] for r in results]) == ["http://other.example.org/", "http://repo.example.org", "http://repo.example.org/other"]
+        pids = set([r["pid"] for r in results if r["url"].startswith("http://repo.example.org")])
+        assert len(pids) == 1
+
+    def test_05_resume(self):
+        # a line cut short when an earlier run was killed doesn't count as a result
+        with open(self.output, "w") as f:
+            f.write(json.dumps({"url" : "http://repo.example.org", "elapsed" : 1.0}) + "\n")
+            f.write('{"url" : "http://other.exam')
+        assert batch.completed_urls(self.output) == set(["http://repo.example.org"])
+
+        with open(self.output, "w") as f:
+            f.write(json.dumps({"url" : "http://repo.example.org", "elapsed" : 1.0}) + "\n")
+
+        # and the urls with one are skipped, including one given without its scheme
+        summary = batch.run(["repo.example.org", "http://other.example.org/"], output=self.output, workers=2)
+        assert summary["urls"] == 1
+        assert summary["skipped"] == 1
+        assert [r["url"] for r in self.results()] == ["http://repo.example.org", "http://other.example.org/"]
+
+    def test_06_worker_error(self):
+        # an exception in a worker is what the run raises
+        batch._discover_one = discover_fails
+        try:
+            batch.run(["http://repo.example.org/"], output=self.output, workers=1)
+            assert False
+        except ValueError as e:
+            assert "worker failed" in str(e)
@@ -0,0 +1,160 @@
+import os, requests, shutil, tempfile, time
+from unittest import TestCase
+from portality.autodiscovery import detectors, infocache, scheduler
+from portality.autodiscovery.scheduler import Scheduler
+from portality.autodiscovery.store import DetectionLedger
+from portality.oarr import Register
+
+class MockResponse(object):
+    def __init__(self, text):
+        self.content = text
+        self.status_code = 200
+        self.headers = {"content-type" : "text/html"}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+class Named(detectors.Detector):
+    def name(self):
+        return self.__class__.__name__
+    def detectable(self, register):
+        return True
+    def required(self, register):
+        return True
+
+class Quick(Named):
+    writes = ["repo_name"]
+    def detect(self, register, info):
+        register.repo_name = "Quick"
+
+class Broken(Named):
+    def detect(self, register, info):
+        raise detectors.DetectorException("broken")
+
+class Slow(Named):
+    writes = ["description"]
+    def detect(self, register, info):
+        time.sleep(1)
+        register.description = "Slow"
+
+class AfterSlow(Named):
+    reads = ["description"]
+    def detect(self, register, info):
+        pass
+
+class LateWriter(Named):
+    writes = ["description", "api"]
+    def detect(self, register, info):
+        time.sleep(0.5)
+        register.description = "Late"
+        register.add_api_object({"api_type" : "rss", "base_url" : "http://repo.example.org/rss"})
+
+class JustOver(Named):
+    writes = ["description"]
+    def detect(self, register, info):
+        time.sleep(0.3)
+        register.description = "Just over"
+
+class TestDeadline(TestCase):
+
+    def setUp(self):
+        self.get = requests.Session.get
+        self.fetched = []
+        def get(session, url, *args, **kwargs):
+            self.fetched.append((url, kwargs.get("timeout")))
+            return MockResponse("<html><head><title>Repository</title></head></html>")
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+
+    def test_01_fetch_timeout(self):
+        assert detectors.Info().fetch_timeout() == detectors.Info.request_timeout
+        assert detectors.Info().remaining() is None
+        assert not detectors.Info().expired()
+
+        info = detectors.Info(deadline=time.time() + 2)
+        assert 0 < info.fetch_timeout() <= 2
+        assert not info.expired()
+        info.url_get("http://repo.example.org/", "html")
+        assert 0 < self.fetched[0][1] <= 2
+
+    def test_02_expired(self):
+        # nothing is fetched once the deadline has passed, and the url isn't taken to be dead
+        info = detectors.Info(deadline=time.time() - 1)
+        assert info.expired()
+        assert info.fetch_timeout() == 0
+        assert info.url_get("http://repo.example.org/", "html") is None
+        assert self.fetched == []
+        assert not info.cache.get(infocache.FAILED, "http://repo.example.org/", False)
+
+        # but what was fetched before it passed is still there to be used
+        info = detectors.Info(deadline=time.time() + 60)
+        resp = info.url_get("http://repo.example.org/", "html")
+        info.deadline = time.time() - 1
+        assert info.url_get("http://repo.example.org/", "html") is resp
+        assert len(self.fetched) == 1
+
+    def test_03_no_deadline(self):
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        Scheduler([Quick, Broken, Slow, AfterSlow]).run(register, detectors.Info())
+        assert register.repo_name == "Quick"
+        assert register.description == "Slow"
+        assert register.detection == {
+            scheduler.COMPLETED : ["Quick", "Slow", "AfterSlow"],
+            scheduler.FAILED : ["Broken"]
+        }
+
+    def test_04_out_of_time(self):
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        s = Scheduler([Quick, Broken, Slow, AfterSlow])
+        s.grace = 0.1
+        start = time.time()
+        s.run(register, detectors.Info(deadline=time.time() + 0.2))
+        assert time.time() - start < 0.8
+        assert register.repo_name == "Quick"
+        assert register.description is None
+        assert register.detection == {
+            scheduler.COMPLETED : ["Quick"],
+            scheduler.FAILED : ["Broken"],
+            scheduler.TIMED_OUT : ["Slow"],
+            scheduler.SKIPPED : ["AfterSlow"]
+        }
+
+    def test_05_already_out_of_time(self):
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        Scheduler([Quick, Slow]).run(register, detectors.Info(deadline=time.time() - 1))
+        assert register.repo_name is None
+        assert register.detection == {scheduler.SKIPPED : ["Quick", "Slow"]}
+
+    def test_06_abandoned(self):
+        # a detector given up on carries on, but no longer changes the register the run returned
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        s = Scheduler([LateWriter])
+        s.grace = 0.1
+        s.run(register, detectors.Info(deadline=time.time() + 0.1))
+        assert register.detection == {scheduler.TIMED_OUT : ["LateWriter"]}
+        time.sleep(0.8)
+        assert register.description is None
+        assert register.get_api() == []
+
+    def test_07_finished_after_deadline(self):
+        # one which finishes within the grace period is complete, but isn't recorded in the ledger
+        dir = tempfile.mkdtemp()
+        try:
+            ledger = DetectionLedger(os.path.join(dir, "ledger.db"))
+            register = Register()
+            register.repo_url = "http://repo.example.org/"
+            s = Scheduler([JustOver], ledger=ledger)
+            s.grace = 1
+            s.run(register, detectors.Info(deadline=time.time() + 0.1))
+            assert register.detection == {scheduler.COMPLETED : ["JustOver"]}
+            assert register.description == "Just over"
+            assert ledger.get("http://repo.example.org/", "JustOver") is None
+        finally:
+            shutil.rmtree(dir)
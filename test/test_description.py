@@ -0,0 +1,65 @@
+import os, requests
+from unittest import TestCase
+from portality.autodiscovery import detectors
+from portality.oarr import Register
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+RSS20 = os.path.join(BASE_FILE_PATH, "resources", "bench", "dspace", "rss_2.0.xml")
+
+NAME = "Example University Research Repository"
+FEED_DESC = "The Example University Research Repository is the open access institutional repository of Example University."
+HOME_PAGE = "<html><head><title>Home</title></head><body><p>Welcome to our repository of research outputs, theses and data.</p></body></html>"
+PAGE_DESC = "Welcome to our repository of research outputs, theses and data."
+
+class MockResponse(object):
+    def __init__(self, text, content_type):
+        self.content = text
+        self.text = text
+        self.status_code = 200
+        self.headers = {"content-type" : content_type}
+        self.encoding = "utf-8"
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+class TestDescription(TestCase):
+
+    def setUp(self):
+        self.get = requests.Session.get
+        with open(RSS20, "rb") as f:
+            rss = f.read()
+        def get(session, url, *args, **kwargs):
+            if url.endswith("/rss"):
+                return MockResponse(rss, "application/rss+xml")
+            return MockResponse(HOME_PAGE, "text/html")
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+
+    def register(self, name=None):
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        register.add_api_object({"api_type" : "rss", "base_url" : "http://repo.example.org/rss"})
+        if name is not None:
+            register.repo_name = name
+        return register
+
+    def test_01_names_repository(self):
+        # a description which mentions the repository by name is preferred to the home page's
+        register = self.register(NAME)
+        detectors.Description().detect(register, detectors.Info())
+        assert register.description == FEED_DESC
+
+    def test_02_no_name(self):
+        # without a name, the home page's description is used
+        register = self.register()
+        detectors.Description().detect(register, detectors.Info())
+        assert register.description == PAGE_DESC
+
+    def test_03_not_named(self):
+        # as it is when nothing mentions the name
+        register = self.register("Somewhere Else Entirely")
+        detectors.Description().detect(register, detectors.Info())
+        assert register.description == PAGE_DESC
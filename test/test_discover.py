@@ -0,0 +1,142 @@
+import requests, threading, time
+from unittest import TestCase
+from portality.autodiscovery import autodiscovery, detectors, infocache, registryfile
+from portality.autodiscovery.scheduler import Scheduler
+from portality.oarr import Register
+
+HOME_PAGE = "<html><head><title>Repository</title><link rel='oarr' href='/files/oarr.json'></head><body></body></html>"
+NO_LINK = "<html><head><title>Repository</title></head><body></body></html>"
+
+class MockResponse(object):
+    def __init__(self, text, status_code=200, content_type="text/html"):
+        self.content = text
+        self.text = text
+        self.status_code = status_code
+        self.headers = {"content-type" : content_type}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+class StreamedResponse(object):
+    # the content is only whatever was read of the body
+    def __init__(self, text, content_type):
+        self.body = text
+        self.status_code = 200
+        self.headers = {"content-type" : content_type}
+
+    @property
+    def content(self):
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+class Slow(detectors.Detector):
+    writes = ["description"]
+    def name(self):
+        return "Slow"
+    def detectable(self, register):
+        return True
+    def required(self, register):
+        return True
+    def detect(self, register, info):
+        time.sleep(0.2)
+        register.description = "Slow"
+
+class TestDiscover(TestCase):
+
+    def setUp(self):
+        self.get = requests.Session.get
+        self.fetched = []
+        self.lock = threading.Lock()
+        self.pages = {}
+        def get(session, url, *args, **kwargs):
+            with self.lock:
+                self.fetched.append(url)
+            if url in self.pages:
+                return self.pages[url]
+            return MockResponse("not found", 404)
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+
+    def test_01_shared_info(self):
+        # the home page fetched and parsed while looking for the registry file is the one the detectors use
+        self.pages["http://repo.example.org/"] = MockResponse(NO_LINK)
+        info = detectors.Info()
+        try:
+            assert registryfile.RegistryFile.autodetect("http://repo.example.org/", info=info) is None
+            assert info.cache.contains(infocache.PAGE, "http://repo.example.org/")
+            assert info.page("http://repo.example.org/").title == "Repository"
+        finally:
+            info.close()
+        assert sorted(self.fetched) == ["http://repo.example.org/", "http://repo.example.org/oarr.json"]
+
+    def test_02_link_preferred(self):
+        # the default location is tried at the same time, but a file linked from the home page wins
+        self.pages["http://repo.example.org/"] = MockResponse(HOME_PAGE)
+        self.pages["http://repo.example.org/oarr.json"] = MockResponse('{"default" : true}', content_type="application/json")
+        self.pages["http://repo.example.org/files/oarr.json"] = MockResponse('{"linked" : true}', content_type="application/json")
+        resp = registryfile.RegistryFile.autodetect("http://repo.example.org/")
+        assert resp.text == '{"linked" : true}'
+
+        del self.pages["http://repo.example.org/files/oarr.json"]
+        resp = registryfile.RegistryFile.autodetect("http://repo.example.org/")
+        assert resp.text == '{"default" : true}'
+
+    def test_03_unreachable(self):
+        # a host which can't be reached has no registry file, rather than raising
+        def refused(session, url, *args, **kwargs):
+            raise requests.exceptions.ConnectionError("refused")
+        requests.Session.get = refused
+        assert registryfile.RegistryFile.autodetect("http://dead.example.org/") is None
+        assert registryfile.RegistryFile.retrieve("http://dead.example.org/oarr.json") is None
+
+    def test_04_discover_fetches_once(self):
+        self.pages["http://repo.example.org/"] = MockResponse(NO_LINK)
+        register = autodiscovery.discover("http://repo.example.org/", detector_classes=[detectors.OperationalStatus, detectors.Title])
+        assert register.operational_status == "Operational"
+        assert register.repo_name == "Repository"
+        assert self.fetched.count("http://repo.example.org/") == 1
+        assert self.fetched.count("http://repo.example.org/oarr.json") == 1
+
+    def test_05_closed(self):
+        # once the discovery is over, detectors still running on its Info fetch nothing more
+        self.pages["http://repo.example.org/"] = MockResponse(NO_LINK)
+        info = detectors.Info()
+        info.close()
+        assert info.url_get("http://repo.example.org/", "html") is None
+        assert info.url_get_all(["http://repo.example.org/", "http://repo.example.org/about"]) == [None, None]
+        assert info.url_get_first(["http://repo.example.org/"], lambda resp: True) == (None, None)
+        assert info.session("http://repo.example.org/") is None
+        assert info.whois("repo.example.org") is None
+        assert self.fetched == []
+
+        # nor is it taken to have failed
+        assert not info.cache.contains(infocache.FAILED, "http://repo.example.org/")
+
+    def test_06_cancel(self):
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        scheduler = Scheduler([Slow])
+        scheduler.cancel()
+        scheduler.run(register, detectors.Info())
+        assert register.description is None
+        assert register.detection == {}
+
+    def test_07_untyped(self):
+        # a registry file is read whatever it is served as
+        self.pages["http://repo.example.org/oarr.json"] = StreamedResponse('{"default" : true}', "application/octet-stream")
+        resp = registryfile.RegistryFile.retrieve("http://repo.example.org/oarr.json")
+        assert resp.content == '{"default" : true}'
+
+        # but not if it is too big to read whole, as only part of it would be taken for all of it
+        limits = detectors.Info.fetch_limits
+        detectors.Info.fetch_limits = dict(limits, default=10)
+        try:
+            assert registryfile.RegistryFile.retrieve("http://repo.example.org/oarr.json") is None
+        finally:
+            detectors.Info.fetch_limits = limits
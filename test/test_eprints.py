@@ -0,0 +1,68 @@
+import os, shutil, tempfile
+from io import BytesIO
+from lxml import etree
+from unittest import TestCase
+from portality.autodiscovery import detectors
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+EPRINTS_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "eprints")
+
+RDFXML = os.path.join(EPRINTS_RESOURCES, "summary.rdf")
+NTRIPLES = os.path.join(EPRINTS_RESOURCES, "summary.nt")
+TURTLE = os.path.join(EPRINTS_RESOURCES, "summary.ttl")
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+class TestEPrintsSummary(TestCase):
+
+    def test_01_rdfxml(self):
+        assert detectors.eprints_version_from_summary(read(RDFXML), "application/rdf+xml") == (True, "3.3.10")
+        assert detectors.eprints_version_from_summary(read(RDFXML), "xml") == (True, "3.3.10")
+
+        # the abbreviated syntax has the comment as an attribute
+        abbreviated = '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#">' + \
+                      '<rdf:Description rdf:about="" rdfs:comment="This system is running eprints server software (EPrints 3.2.0) developed at the University of Southampton."/>' + \
+                      '</rdf:RDF>'
+        assert detectors.eprints_version_from_summary(abbreviated, "application/rdf+xml") == (True, "3.2.0")
+
+    def test_02_lines(self):
+        assert detectors.eprints_version_from_summary(read(NTRIPLES), "text/plain") == (True, "3.2.8")
+        assert detectors.eprints_version_from_summary(read(TURTLE), "text/turtle; charset=utf-8") == (True, "3.3.12")
+
+    def test_03_stops_at_comment(self):
+        # everything after the comment is never read, so a document cut short there is fine
+        content = read(RDFXML)
+        cut = content.index("<foaf:primaryTopic")
+        assert detectors.eprints_version_from_summary(content[:cut], "application/rdf+xml") == (True, "3.3.10")
+
+        # but one cut short before it couldn't be read
+        cut = content.index("<rdfs:comment")
+        assert detectors.eprints_version_from_summary(content[:cut], "application/rdf+xml") == (False, None)
+
+    def test_04_no_version(self):
+        content = read(RDFXML).replace("This system is running", "This repository is running")
+        assert detectors.eprints_version_from_summary(content, "application/rdf+xml") == (True, None)
+
+    def test_05_unknown_format(self):
+        # left to a full parse
+        assert detectors.eprints_version_from_summary("{}", "application/ld+json") == (False, None)
+        assert detectors.eprints_version_from_summary(read(RDFXML), None) == (False, None)
+
+    def test_06_external_entity(self):
+        # an entity in a fetched document isn't read from the local filesystem
+        dir = tempfile.mkdtemp()
+        try:
+            secret = os.path.join(dir, "secret.txt")
+            with open(secret, "wb") as f:
+                f.write("This system is running eprints server software (EPrints 9.9.9) developed at the University of Southampton.")
+            content = '<?xml version="1.0"?><!DOCTYPE rdf:RDF [<!ENTITY x SYSTEM "file://' + secret + '">]>' + \
+                      '<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#">' + \
+                      '<rdf:Description rdf:about=""><rdfs:comment>&x;</rdfs:comment></rdf:Description></rdf:RDF>'
+            assert detectors.eprints_version_from_summary(content, "application/rdf+xml") == (True, None)
+
+            # nor when it is parsed whole, as Info.xml does
+            assert "9.9.9" not in etree.tostring(etree.parse(BytesIO(content), detectors.xml_parser()))
+        finally:
+            shutil.rmtree(dir)
@@ -0,0 +1,75 @@
+import os, shutil, tempfile
+from unittest import TestCase
+from portality.autodiscovery import detectors
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+BENCH_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "bench")
+
+RSS20 = os.path.join(BENCH_RESOURCES, "dspace", "rss_2.0.xml")
+RSS10 = os.path.join(BENCH_RESOURCES, "dspace", "rss_1.0.xml")
+ATOM = os.path.join(BENCH_RESOURCES, "dspace", "atom_1.0.xml")
+OAI = os.path.join(BENCH_RESOURCES, "dspace", "oai_identify.xml")
+
+TITLE = "Example University Research Repository"
+SUBTITLE = "The Example University Research Repository is the open access institutional repository of Example University."
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+class TestFeedSniffing(TestCase):
+
+    def test_01_rss(self):
+        read_ok, header = detectors.sniff_feed(read(RSS20))
+        assert read_ok
+        assert header == {"type" : "rss", "version" : "rss20", "title" : TITLE, "subtitle" : SUBTITLE}
+
+        read_ok, header = detectors.sniff_feed(read(RSS10))
+        assert header == {"type" : "rss", "version" : "rss10", "title" : TITLE, "subtitle" : SUBTITLE}
+
+    def test_02_atom(self):
+        read_ok, header = detectors.sniff_feed(read(ATOM))
+        assert header == {"type" : "atom", "version" : "atom10", "title" : TITLE, "subtitle" : SUBTITLE}
+
+        old = '<feed xmlns="http://purl.org/atom/ns#" version="0.3"><title>Old</title><tagline>Tag</tagline><entry/></feed>'
+        read_ok, header = detectors.sniff_feed(old)
+        assert header == {"type" : "atom", "version" : "atom03", "title" : "Old", "subtitle" : "Tag"}
+
+    def test_03_stops_at_first_item(self):
+        # the items aren't read, so one which isn't well formed doesn't matter
+        content = read(RSS20)
+        broken = content[:content.index("<item>")] + "<item><title>Broken & unescaped</title></item></channel></rss>"
+        read_ok, header = detectors.sniff_feed(broken)
+        assert read_ok
+        assert header["title"] == TITLE
+
+        # and the titles of items are never taken for the feed's
+        read_ok, header = detectors.sniff_feed('<rss version="2.0"><channel><item><title>An item</title></item></channel></rss>')
+        assert header["title"] is None
+
+    def test_04_not_a_feed(self):
+        assert detectors.sniff_feed(read(OAI)) == (True, None)
+
+        # which the root element is enough to tell, whatever comes after it
+        assert detectors.sniff_feed("<html><body>not a feed") == (True, None)
+
+    def test_05_unreadable(self):
+        # left for feedparser, which copes with html entities and the like
+        assert detectors.sniff_feed('<rss version="2.0"><channel><title>A&nbsp;B</title></channel></rss>') == (False, None)
+        assert detectors.sniff_feed("not a feed at all") == (False, None)
+
+    def test_06_external_entity(self):
+        # the title is what the feed says, not the contents of a local file it names
+        dir = tempfile.mkdtemp()
+        try:
+            secret = os.path.join(dir, "secret.txt")
+            with open(secret, "wb") as f:
+                f.write("TOP-SECRET-CONTENT")
+            content = '<?xml version="1.0"?><!DOCTYPE rss [<!ENTITY x SYSTEM "file://' + secret + '">]>' + \
+                      '<rss version="2.0"><channel><title>&x;</title><description>About</description></channel></rss>'
+            read_ok, header = detectors.sniff_feed(content)
+            assert read_ok
+            assert header["title"] != "TOP-SECRET-CONTENT"
+            assert header["subtitle"] == "About"
+        finally:
+            shutil.rmtree(dir)
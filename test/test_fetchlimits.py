@@ -0,0 +1,61 @@
+import requests
+from unittest import TestCase
+from portality.autodiscovery import detectors
+
+class MockResponse(object):
+    # like a Response, the content is whatever was read of the body
+    def __init__(self, text, content_type):
+        self.body = text
+        self.status_code = 200
+        self.headers = {"content-type" : content_type}
+
+    @property
+    def content(self):
+        return self._content
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+class TestFetchLimits(TestCase):
+
+    def setUp(self):
+        self.get = requests.Session.get
+        self.fetch_limits = detectors.Info.fetch_limits
+        self.fetched = []
+        def get(session, url, *args, **kwargs):
+            self.fetched.append(url)
+            if url.endswith(".json"):
+                return MockResponse('{"name" : "Repository"}', "application/json")
+            return MockResponse("<html>" + "x" * 100 + "</html>", "text/html")
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+        detectors.Info.fetch_limits = self.fetch_limits
+
+    def test_01_truncated(self):
+        detectors.Info.fetch_limits = dict(detectors.Info.fetch_limits, html=50)
+        info = detectors.Info()
+        resp = info.url_get("http://repo.example.org/", "html")
+        assert len(resp.content) == 50
+        assert resp.truncated
+        assert resp.byte_limit == 50
+
+        # it is fetched again for anyone who wants more of it than was read
+        resp = info.url_get("http://repo.example.org/")
+        assert not resp.truncated
+        assert len(self.fetched) == 2
+
+    def test_02_wrong_type(self):
+        # a response not read because it was the wrong type was read to a limit of nothing, so
+        # isn't taken for the whole document by anyone who then wants it as something else
+        info = detectors.Info()
+        resp = info.url_get("http://repo.example.org/oarr.json", "html")
+        assert resp.content == b""
+        assert resp.truncated
+        assert resp.byte_limit == 0
+
+        resp = info.url_get("http://repo.example.org/oarr.json", "json")
+        assert resp.content == '{"name" : "Repository"}'
+        assert len(self.fetched) == 2
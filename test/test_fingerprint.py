@@ -0,0 +1,74 @@
+import os, codecs
+from unittest import TestCase
+from portality.autodiscovery.fingerprint import Fingerprinter
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+BENCH_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "bench")
+
+DSPACE = os.path.join(BENCH_RESOURCES, "dspace", "index.html")
+EPRINTS = os.path.join(BENCH_RESOURCES, "eprints", "index.html")
+PLAIN = os.path.join(BENCH_RESOURCES, "plain", "index.html")
+
+def read(path):
+    with codecs.open(path, "r", "utf-8") as f:
+        return f.read()
+
+class TestFingerprint(TestCase):
+
+    def setUp(self):
+        self.fp = Fingerprinter()
+
+    def test_01_generator(self):
+        results = self.fp.identify(url="http://repository.example.ac.uk/", generator=["DSpace 3.2"], body=read(DSPACE))
+        assert results[0]["name"] == "DSpace"
+        assert results[0]["version"] == "3.2"
+        assert results[0]["url"] == "http://dspace.org"
+        assert results[0]["confidence"] == 1.0
+
+        results = self.fp.identify(generator=["Open Journal Systems 2.4.2.0"])
+        assert results[0]["name"] == "Open Journal Systems"
+        assert results[0]["version"] == "2.4.2.0"
+
+    def test_02_body(self):
+        # no generator, but the footer and the templates give it away, along with the version
+        results = self.fp.identify(url="http://research.example.org/", body=read(EPRINTS),
+                                   links=["Repository Summary (RDF+XML)", "Latest additions (Atom)"])
+        assert results[0]["name"] == "EPrints"
+        assert results[0]["version"] == "3"
+        assert results[0]["confidence"] == 1.0
+
+        body = '<div id="footer">Powered by <a href="http://invenio-software.org/">Invenio</a> v1.1.1</div>'
+        results = self.fp.identify(body=body)
+        assert results[0]["name"] == "Invenio"
+        assert results[0]["version"] == "1.1.1"
+
+    def test_03_combined_evidence(self):
+        # a weak hint on its own stays weak, but two together are stronger than either
+        results = self.fp.identify(url="http://example.edu/eprints/", body="<p>Hosted with eprints</p>")
+        assert results[0]["name"] == "EPrints"
+        assert results[0]["confidence"] == 0.5
+
+        results = self.fp.identify(url="http://digitalcommons.example.edu/", body="<p>Digital Commons</p>")
+        assert results[0]["name"] == "Digital Commons"
+        assert results[0]["confidence"] == 0.96
+
+    def test_04_overlapping(self):
+        # "dspace" lies inside the literal of the stronger rule, and must still be found
+        results = self.fp.identify(body='<a href="/dspace/help/index.html" target="dspacepopup">Help</a>')
+        assert results[0]["name"] == "DSpace"
+        assert results[0]["confidence"] == 1.0
+
+        # the literal of a rule with an expression is only a hint; the expression must match too
+        results = self.fp.identify(body='<a href="http://eprints.org/software/">EPrints</a>')
+        assert results == []
+
+    def test_05_nothing(self):
+        assert self.fp.identify(url="http://example.edu/", body=read(PLAIN)) == []
+        assert self.fp.identify() == []
+
+    def test_06_sources(self):
+        # a literal in one source does not satisfy a rule looking in another
+        results = self.fp.identify(url="http://example.org/", links=["greenstone"])
+        assert results == []
+        results = self.fp.identify(url="http://example.org/gsdl/cgi-bin/library.cgi")
+        assert results[0]["name"] == "Greenstone"
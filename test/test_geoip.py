@@ -0,0 +1,70 @@
+import os, shutil, tempfile
+from unittest import TestCase
+from portality.autodiscovery import geoip
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+GEOIP_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "geoip")
+
+DBIP = os.path.join(GEOIP_RESOURCES, "dbip-country-lite.csv")
+IP2LOCATION = os.path.join(GEOIP_RESOURCES, "ip2location-lite-db1.csv")
+
+class TestGeoIP(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.db = os.path.join(self.dir, "geoip.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_01_build(self):
+        # the unknown (ZZ and -) rows and the header are left out
+        v4, v6 = geoip.build([DBIP, IP2LOCATION], self.db)
+        assert v4 == 5
+        assert v6 == 2
+
+    def test_02_ipv4(self):
+        geoip.build([DBIP, IP2LOCATION], self.db)
+        db = geoip.GeoIP(self.db)
+        try:
+            assert db.country("1.0.0.0") == "AU"
+            assert db.country("1.0.0.255") == "AU"
+            assert db.country("1.0.2.17") == "CN"
+            assert db.country("81.2.69.160") == "GB"
+            assert db.country("8.8.8.8") == "US"
+            assert db.country("8.8.4.4") == "DE"
+            assert db.country("::ffff:8.8.4.4") == "DE"
+
+            # between, before and after the known ranges
+            assert db.country("1.0.4.0") is None
+            assert db.country("0.0.0.1") is None
+            assert db.country("192.0.2.1") is None
+            assert db.country("255.255.255.255") is None
+        finally:
+            db.close()
+
+    def test_03_ipv6(self):
+        geoip.build([DBIP, IP2LOCATION], self.db)
+        db = geoip.GeoIP(self.db)
+        try:
+            assert db.country("2001:db8::1") == "NL"
+            assert db.country("2a00:1450:4009:80b::200e") == "IE"
+            assert db.country("2a00:1451::") is None
+            assert db.country("::1") is None
+        finally:
+            db.close()
+
+    def test_04_not_an_address(self):
+        geoip.build([DBIP], self.db)
+        db = geoip.GeoIP(self.db)
+        try:
+            assert db.country("repository.example.org") is None
+            assert db.country("") is None
+        finally:
+            db.close()
+
+    def test_05_not_a_database(self):
+        with open(self.db, "wb") as f:
+            f.write("this is not a database at all")
+        with self.assertRaises(ValueError):
+            geoip.GeoIP(self.db)
@@ -0,0 +1,140 @@
+import os, requests
+from unittest import TestCase
+from portality.autodiscovery import detectors, harvest
+from portality.oarr import Register
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+HARVEST_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "harvest")
+
+PAGE_1 = os.path.join(HARVEST_RESOURCES, "page1.xml")
+PAGE_2 = os.path.join(HARVEST_RESOURCES, "page2.xml")
+NO_RECORDS = os.path.join(HARVEST_RESOURCES, "norecords.xml")
+BAD_TOKEN = os.path.join(HARVEST_RESOURCES, "badtoken.xml")
+
+BASE_URL = "http://repository.example.ac.uk/oai/request"
+
+class MockResponse(object):
+    def __init__(self, path, status=200, headers=None, chunk_size=100):
+        with open(path, "rb") as f:
+            self.content = f.read()
+        self.status_code = status
+        self.headers = headers if headers is not None else {}
+        self.chunk_size = chunk_size
+
+    def iter_content(self, chunk_size=1):
+        # in small pieces, so that headers and tokens are split across them
+        for i in range(0, len(self.content), self.chunk_size):
+            yield self.content[i:i + self.chunk_size]
+
+class TestHarvest(TestCase):
+
+    def setUp(self):
+        self.session_get = requests.Session.get
+        self.requests_made = []
+
+    def tearDown(self):
+        requests.Session.get = self.session_get
+
+    def mock(self, pages):
+        """
+        answer the list requests with the files given for each resumptionToken (None for the first page)
+        """
+        def get(session, url, params=None, **kwargs):
+            self.requests_made.append(params)
+            return MockResponse(pages[params.get("resumptionToken")])
+        requests.Session.get = get
+
+    def test_01_count(self):
+        self.mock({None : PAGE_1, "MToyMDA5LTAyLTExfDM=" : PAGE_2})
+        h = harvest.Harvester(BASE_URL)
+        try:
+            result = h.count()
+        finally:
+            h.close()
+        assert result["count"] == 4
+        assert result["deleted"] == 1
+        assert result["earliest"] == "2007-11-30T16:02:10Z"
+        assert result["latest"] == "2014-06-30T08:41:12Z"
+        assert result["pages"] == 2
+        assert result["complete_list_size"] == 5
+
+        # the first page asks for the list, the next one follows the token alone
+        assert self.requests_made[0] == {"verb" : "ListIdentifiers", "metadataPrefix" : "oai_dc"}
+        assert self.requests_made[1] == {"verb" : "ListIdentifiers", "resumptionToken" : "MToyMDA5LTAyLTExfDM="}
+
+    def test_02_identifiers(self):
+        self.mock({None : PAGE_1, "MToyMDA5LTAyLTExfDM=" : PAGE_2})
+        h = harvest.Harvester(BASE_URL)
+        try:
+            headers = list(h.list_identifiers(set_spec="hdl_10023_5"))
+        finally:
+            h.close()
+        assert len(headers) == 5
+        assert headers[0] == ("oai:repository.example.ac.uk:10023/1", "2009-02-11T09:14:55Z", False)
+        assert headers[2] == ("oai:repository.example.ac.uk:10023/3", "2013-05-02T10:00:00Z", True)
+        assert self.requests_made[0]["set"] == "hdl_10023_5"
+
+    def test_03_incremental(self):
+        # nothing has changed since the last count
+        self.mock({None : NO_RECORDS})
+        api = {"api_type" : "oai-pmh", "base_url" : BASE_URL, "record_count" : 4, "latest_datestamp" : "2014-06-30T08:41:12Z"}
+        harvest.count_records(api, since="2014-06-30T08:41:12Z")
+        assert self.requests_made[0]["from"] == "2014-06-30T08:41:12Z"
+        assert api["changed_count"] == 0
+        assert api["changed_since"] == "2014-06-30T08:41:12Z"
+        assert api["record_count"] == 4
+        assert api["latest_datestamp"] == "2014-06-30T08:41:12Z"
+
+    def test_04_full_count_on_api(self):
+        self.mock({None : PAGE_1, "MToyMDA5LTAyLTExfDM=" : PAGE_2})
+        api = {"api_type" : "oai-pmh", "base_url" : BASE_URL}
+        harvest.count_records(api)
+        assert api["record_count"] == 4
+        assert api["deleted_count"] == 1
+        assert api["earliest_datestamp"] == "2007-11-30T16:02:10Z"
+        assert api["latest_datestamp"] == "2014-06-30T08:41:12Z"
+        assert "counted_date" in api
+
+    def test_05_errors(self):
+        self.mock({None : PAGE_1, "MToyMDA5LTAyLTExfDM=" : BAD_TOKEN})
+        h = harvest.Harvester(BASE_URL)
+        try:
+            with self.assertRaises(harvest.HarvestException) as cm:
+                h.count()
+            assert cm.exception.code == "badResumptionToken"
+        finally:
+            h.close()
+
+    def test_06_count_register(self):
+        # each oai-pmh api of a register is counted in full the first time
+        self.mock({None : PAGE_1, "MToyMDA5LTAyLTExfDM=" : PAGE_2})
+        register = Register()
+        register.add_api_object({"api_type" : "oai-pmh", "base_url" : BASE_URL})
+        register.add_api_object({"api_type" : "sword", "base_url" : "http://repository.example.ac.uk/sword"})
+        harvest.count_register(register)
+        pmh = register.get_api("oai-pmh")[0]
+        assert pmh["record_count"] == 4
+        assert "record_count" not in register.get_api("sword")[0]
+        assert len(self.requests_made) == 2
+
+        # and from its latest datestamp after that
+        self.mock({None : NO_RECORDS})
+        harvest.count_register(register)
+        assert self.requests_made[2]["from"] == "2014-06-30T08:41:12Z"
+        assert pmh["record_count"] == 4
+        assert pmh["changed_count"] == 0
+
+    def test_07_closed_info(self):
+        # an api which can't be counted is left as it was
+        self.mock({None : PAGE_1})
+        info = detectors.Info()
+        info.close()
+        h = harvest.Harvester(BASE_URL, info=info)
+        with self.assertRaises(harvest.HarvestException):
+            h.count()
+        assert self.requests_made == []
+
+        register = Register()
+        register.add_api_object({"api_type" : "oai-pmh", "base_url" : BASE_URL})
+        harvest.count_register(register, info=info)
+        assert "record_count" not in register.get_api("oai-pmh")[0]
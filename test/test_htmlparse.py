@@ -0,0 +1,40 @@
+import warnings
+from unittest import TestCase
+from portality.autodiscovery import htmlparse
+
+PAGE = """<html><head><title>Example Repository</title>
+<link rel="alternate service" href="/feed"></head>
+<body><p class="intro lead">Welcome to the <b>Example Repository</b>.</p><p>Second</p></body></html>"""
+
+class TestHtmlParse(TestCase):
+
+    def test_01_lxml_soup(self):
+        # answers the same queries as BeautifulSoup does
+        for soup in [htmlparse.parse(PAGE, "lxml"), htmlparse.parse(PAGE, "bs4")]:
+            ps = soup.find_all("p")
+            assert [p.name for p in ps] == ["p", "p"]
+            assert ps[0].text == "Welcome to the Example Repository."
+            assert ps[0].get("class") == ["intro", "lead"]
+            assert ps[1].get("class") is None
+            assert ps[1].get("id", "none") == "none"
+            assert [el.name for el in soup.find_all(["title", "link"])] == ["title", "link"]
+            assert soup.find_all("link")[0].get("rel") == ["alternate", "service"]
+            assert soup.find_all("link")[0].get("href") == "/feed"
+            assert "Second" in soup.get_text()
+
+    def test_02_awkward_documents(self):
+        # unicode with an xml encoding declaration, which lxml won't take as it is, and nothing at all
+        soup = htmlparse.LxmlSoup(u'<?xml version="1.0" encoding="utf-8"?><html><head><title>Caf\u00e9</title></head></html>')
+        assert soup.find_all("title")[0].text == u"Caf\u00e9"
+        assert htmlparse.LxmlSoup("").find_all("p") == []
+
+    def test_03_backends(self):
+        # the bs4 backend says which parser it wants, rather than having it guessed each time
+        # (python 2 won't show a warning again from where it was shown before, whatever the filter)
+        htmlparse.__dict__.pop("__warningregistry__", None)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            htmlparse.parse(PAGE, "bs4")
+        assert caught == []
+        with self.assertRaises(ValueError):
+            htmlparse.parse(PAGE, "html5lib")
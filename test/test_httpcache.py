@@ -0,0 +1,90 @@
+import os, shutil, tempfile, time, requests
+from unittest import TestCase
+from requests.structures import CaseInsensitiveDict
+from portality.autodiscovery import detectors
+from portality.autodiscovery.store import HTTPCache
+
+HOME_PAGE = "<html><head><title>Repository</title></head><body></body></html>"
+
+class MockResponse(object):
+    def __init__(self, text, status_code=200, headers=None):
+        self.content = text
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict({"content-type" : "text/html"})
+        self.headers.update(headers or {})
+        self.encoding = "utf-8"
+        self.url = None
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+class TestHTTPCache(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = HTTPCache(os.path.join(self.dir, "http.db"))
+        self.http_cache = detectors.Info.http_cache
+        detectors.Info.http_cache = self.cache
+
+        self.get = requests.Session.get
+        self.fetched = []
+        self.responses = []
+        def get(session, url, *args, **kwargs):
+            self.fetched.append((url, kwargs.get("headers", {})))
+            return self.responses.pop(0)
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+        detectors.Info.http_cache = self.http_cache
+        shutil.rmtree(self.dir)
+
+    def test_01_fresh(self):
+        # a response fetched by one Info is there for the next without going back to the server
+        self.responses.append(MockResponse(HOME_PAGE, headers={"etag" : '"v1"'}))
+        detectors.Info().url_get("http://repo.example.org/", "html")
+        resp = detectors.Info().url_get("http://repo.example.org/", "html")
+        assert resp.status_code == 200
+        assert resp.content == HOME_PAGE
+        assert len(self.fetched) == 1
+
+    def test_02_not_modified(self):
+        self.responses.append(MockResponse(HOME_PAGE, headers={"etag" : '"v1"', "last-modified" : "Mon, 01 Jul 2013 00:00:00 GMT"}))
+        detectors.Info().url_get("http://repo.example.org/", "html")
+
+        # once it is stale, the server is asked whether it has changed, and says it hasn't
+        conn = self.cache.connection()
+        with conn:
+            conn.execute("UPDATE http_cache SET expires = ?", (time.time() - 1,))
+        self.responses.append(MockResponse("", status_code=304))
+        resp = detectors.Info().url_get("http://repo.example.org/", "html")
+        assert resp.status_code == 200
+        assert resp.content == HOME_PAGE
+
+        url, headers = self.fetched[1]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jul 2013 00:00:00 GMT"
+
+        # and our copy is good for another ttl
+        entry = self.cache.get("http://repo.example.org/")
+        assert self.cache.is_fresh(entry)
+        assert entry["status"] == 200
+
+    def test_03_negative(self):
+        # a url which couldn't be reached isn't tried again while the negative entry is fresh
+        self.cache.put_negative("http://dead.example.org/")
+        assert self.cache.validators(self.cache.get("http://dead.example.org/")) == {}
+        assert detectors.Info().url_get("http://dead.example.org/", "html") is None
+        assert self.fetched == []
+
+    def test_04_server_error(self):
+        # a 503 says nothing about the page, so isn't kept for next time
+        self.responses.append(MockResponse("busy", status_code=503))
+        resp = detectors.Info().url_get("http://repo.example.org/", "html")
+        assert resp.status_code == 503
+        assert self.cache.get("http://repo.example.org/") is None
+
+        self.responses.append(MockResponse(HOME_PAGE))
+        assert detectors.Info().url_get("http://repo.example.org/", "html").content == HOME_PAGE
+        assert len(self.fetched) == 2
@@ -0,0 +1,154 @@
+import requests
+from unittest import TestCase
+from portality.autodiscovery import detectors, infocache
+from portality.autodiscovery.infocache import InfoCache
+
+HOME_PAGE = "<html><head><title>Repository</title><meta name='Generator' content='DSpace 3.2'></head><body><p>Hello</p></body></html>"
+
+class MockResponse(object):
+    def __init__(self, text):
+        self.content = text
+        self.text = text
+        self.status_code = 200
+        self.headers = {"content-type" : "text/html"}
+        self.encoding = "utf-8"
+        self.url = None
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+class TestInfoCache(TestCase):
+
+    def setUp(self):
+        self.get = requests.Session.get
+        self.fetched = []
+        def get(session, url, *args, **kwargs):
+            self.fetched.append(url)
+            return MockResponse(HOME_PAGE)
+        requests.Session.get = get
+
+    def tearDown(self):
+        requests.Session.get = self.get
+        detectors.Info.cache_budget = 134217728
+        detectors.Info.drop_parsed_bodies = False
+
+    def test_01_estimate(self):
+        assert infocache.estimate(infocache.RESPONSE, 1000) == 1000 + infocache.SMALL
+        assert infocache.estimate(infocache.PAGE, 1000, "bs4") > infocache.estimate(infocache.PAGE, 1000, "lxml")
+        assert infocache.estimate(infocache.PAGE, 1000) == infocache.estimate(infocache.PAGE, 1000, "bs4")
+        assert infocache.estimate(infocache.FEED_HEADER, 1000) == infocache.SMALL
+        assert infocache.estimate(infocache.XML, None) == infocache.SMALL
+
+    def test_02_lru(self):
+        cache = InfoCache(budget=3000)
+        cache.put(infocache.RESPONSE, "a", "A", 1000)
+        cache.put(infocache.RESPONSE, "b", "B", 1000)
+        cache.put(infocache.PAGE, "a", "page A", 1000)
+        assert cache.size == 3000
+
+        # a is used, so b is the least recently used and goes first
+        assert cache.get(infocache.RESPONSE, "a") == "A"
+        cache.put(infocache.XML, "c", "C", 1000)
+        assert cache.get(infocache.RESPONSE, "b") is None
+        assert cache.get(infocache.RESPONSE, "a") == "A"
+        assert cache.get(infocache.PAGE, "a") == "page A"
+        assert cache.size == 3000
+        assert cache.evictions == 1
+
+        # entries of different kinds under the same key are separate
+        assert cache.get(infocache.XML, "a") is None
+        assert cache.sizes() == {
+            infocache.RESPONSE : {"entries" : 1, "bytes" : 1000},
+            infocache.PAGE : {"entries" : 1, "bytes" : 1000},
+            infocache.XML : {"entries" : 1, "bytes" : 1000}
+        }
+
+    def test_03_over_budget(self):
+        # an entry bigger than the whole budget is still kept, in place of everything else
+        cache = InfoCache(budget=1000)
+        cache.put(infocache.RESPONSE, "a", "A", 500)
+        cache.put(infocache.GRAPH, "b", "B", 5000)
+        assert cache.get(infocache.RESPONSE, "a") is None
+        assert cache.get(infocache.GRAPH, "b") == "B"
+        assert cache.size == 5000
+
+        # replacing an entry replaces its size
+        cache.put(infocache.GRAPH, "b", "smaller B", 200)
+        assert cache.size == 200
+        cache.remove(infocache.GRAPH, "b")
+        assert cache.size == 0
+
+    def test_04_pinned(self):
+        cache = InfoCache(budget=10)
+        cache.put(infocache.FAILED, "http://dead.example.org/", True)
+        cache.put(infocache.NOTE, "oai_identify", "http://repo.example.org/oai?verb=Identify")
+        cache.put(infocache.RESPONSE, "a", "A", 1000)
+        cache.put(infocache.RESPONSE, "b", "B", 1000)
+        assert cache.get(infocache.FAILED, "http://dead.example.org/") is True
+        assert cache.get(infocache.NOTE, "oai_identify") == "http://repo.example.org/oai?verb=Identify"
+        assert cache.contains(infocache.NOTE, "oai_identify")
+        assert not cache.contains(infocache.RESPONSE, "a")
+        assert cache.size == 1000
+
+    def test_05_info(self):
+        info = detectors.Info()
+        page = info.page("http://repo.example.org/")
+        assert page.meta("generator") == ["DSpace 3.2"]
+        assert info.soup("http://repo.example.org/") is page.soup
+        assert info.cache.get(infocache.PAGE, "http://repo.example.org/") is page
+        sizes = info.cache.sizes()
+        assert sizes[infocache.RESPONSE]["entries"] == 1
+        assert sizes[infocache.PAGE]["bytes"] == infocache.estimate(infocache.PAGE, len(HOME_PAGE), info.html_parser)
+
+        # notes are kept apart from everything else
+        info.set("software_confidence", 0.9)
+        assert info.get("software_confidence") == 0.9
+        assert info.get("http://repo.example.org/") is None
+
+    def test_06_evicted(self):
+        # with no room for two pages, the next page fetched pushes out the last; it is fetched again if wanted
+        detectors.Info.cache_budget = 1
+        info = detectors.Info()
+        info.page("http://repo.example.org/")
+        info.page("http://repo.example.org/about")
+        assert not info.cache.contains(infocache.RESPONSE, "http://repo.example.org/")
+        assert not info.cache.contains(infocache.PAGE, "http://repo.example.org/")
+        assert info.cache.contains(infocache.PAGE, "http://repo.example.org/about")
+        assert info.url_get("http://repo.example.org/", "html").content == HOME_PAGE
+        assert len(self.fetched) == 3
+
+    def test_07_drop_parsed_bodies(self):
+        detectors.Info.drop_parsed_bodies = True
+        info = detectors.Info()
+        resp = info.url_get("http://repo.example.org/", "html")
+        info.page("http://repo.example.org/")
+
+        # whoever has the response still has its body, but the cache only has its status and headers
+        assert resp.content == HOME_PAGE
+        stub = info.cache.get(infocache.RESPONSE, "http://repo.example.org/")
+        assert stub.content == b""
+        assert stub.status_code == 200
+        assert stub.headers["content-type"] == "text/html"
+        assert info.cache.sizes()[infocache.RESPONSE]["bytes"] == infocache.SMALL
+
+        # and asking for the body again fetches it again
+        assert info.url_get("http://repo.example.org/", "html").content == HOME_PAGE
+        assert len(self.fetched) == 2
+
+        # responses read as something with no parses of its own are left alone
+        info.url_get("http://repo.example.org/oarr.json", "json")
+        assert info.cache.get(infocache.RESPONSE, "http://repo.example.org/oarr.json").content == HOME_PAGE
+
+    def test_08_bigger_than_budget(self):
+        # a page bigger than the whole budget doesn't push out its own response, nor the response
+        # its page, so that the detectors which want each of them don't fetch and parse it over and over
+        info = detectors.Info()
+        info.cache.budget = infocache.estimate(infocache.PAGE, len(HOME_PAGE), info.html_parser) / 2
+        page = info.page("http://repo.example.org/")
+        assert info.cache.contains(infocache.RESPONSE, "http://repo.example.org/")
+        assert info.url_get("http://repo.example.org/", "html").content == HOME_PAGE
+        assert info.page("http://repo.example.org/") is page
+        assert info.url_get("http://repo.example.org/", "html").content == HOME_PAGE
+        assert len(self.fetched) == 1
+        assert info.cache.evictions == 0
@@ -0,0 +1,129 @@
+import os, shutil, tempfile, threading, time
+from unittest import TestCase
+from portality.autodiscovery import jobs
+from portality.autodiscovery.store import JobStore
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.status(job_id)
+        if job["status"] not in [jobs.QUEUED, jobs.RUNNING]:
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job " + job_id + " did not finish")
+
+class TestJobs(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.store = JobStore(os.path.join(self.dir, "jobs.db"))
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def work(self, url):
+        self.calls.append(url)
+        if "broken" in url:
+            raise ValueError("no such repository")
+        return {"register" : {"repository_url" : url}}
+
+    def test_01_done(self):
+        queue = jobs.JobQueue(self.store, self.work)
+        job_id = queue.submit("http://repo.example.org/")
+        job = wait_for(queue, job_id)
+        assert job["status"] == jobs.DONE
+        assert job["url"] == "http://repo.example.org/"
+        assert job["result"] == {"register" : {"repository_url" : "http://repo.example.org/"}}
+        assert job["submitted"] <= job["started"] <= job["finished"]
+        assert queue.result("http://repo.example.org/") == job["result"]
+        assert queue.result("http://other.example.org/") is None
+        assert queue.status("nosuchjob") is None
+
+    def test_02_failed(self):
+        queue = jobs.JobQueue(self.store, self.work)
+        job_id = queue.submit("http://broken.example.org/")
+        job = wait_for(queue, job_id)
+        assert job["status"] == jobs.FAILED
+        assert job["error"] == "no such repository"
+        assert job["result"] is None
+        assert queue.result("http://broken.example.org/") is None
+
+        # a failed job is not reused; submitting the url again tries again
+        assert queue.submit("http://broken.example.org/") != job_id
+
+    def test_03_reused(self):
+        # a url which is being worked on, or has been recently, gets the same job
+        release = threading.Event()
+        def slow(url):
+            release.wait(5)
+            return self.work(url)
+        queue = jobs.JobQueue(self.store, slow)
+        job_id = queue.submit("http://repo.example.org/")
+        assert queue.submit("http://repo.example.org/") == job_id
+        release.set()
+        wait_for(queue, job_id)
+        assert queue.submit("http://repo.example.org/") == job_id
+        assert self.calls == ["http://repo.example.org/"]
+
+        # but not once its result has expired
+        queue.result_ttl = 0
+        assert queue.submit("http://repo.example.org/") != job_id
+
+    def test_04_shared(self):
+        # another process (here, another queue on the same store) can report on the job
+        queue = jobs.JobQueue(self.store, self.work)
+        job_id = queue.submit("http://repo.example.org/")
+        wait_for(queue, job_id)
+        other = jobs.JobQueue(JobStore(os.path.join(self.dir, "jobs.db")), self.work)
+        assert other.status(job_id)["status"] == jobs.DONE
+        assert other.submit("http://repo.example.org/") == job_id
+
+    def test_05_timed_out(self):
+        # a job which was submitted but never finished (e.g. the worker running it died) is given up on
+        self.store.create("lostjob", "http://repo.example.org/")
+        queue = jobs.JobQueue(self.store, self.work)
+        assert queue.status("lostjob")["status"] == jobs.QUEUED
+        queue.job_timeout = 0
+        job = queue.status("lostjob")
+        assert job["status"] == jobs.FAILED
+        assert job["error"] == "timed out"
+
+    def test_06_concurrent_submit(self):
+        # many workers submitting the same url at once get the one job between them
+        release = threading.Event()
+        def slow(url):
+            release.wait(5)
+            return self.work(url)
+        go = threading.Event()
+        ids = []
+        def submit():
+            queue = jobs.JobQueue(JobStore(os.path.join(self.dir, "jobs.db")), slow)
+            go.wait(5)
+            ids.append(queue.submit("http://repo.example.org/"))
+        threads = [threading.Thread(target=submit) for i in range(8)]
+        for t in threads:
+            t.start()
+        go.set()
+        for t in threads:
+            t.join()
+        release.set()
+
+        assert len(ids) == 8
+        assert len(set(ids)) == 1
+        rows = self.store.connection().execute("SELECT COUNT(*) FROM discovery_jobs").fetchone()[0]
+        assert rows == 1
+
+    def test_07_create_unless(self):
+        job, created = self.store.create_unless("first", "http://repo.example.org/", lambda job: True)
+        assert created
+        assert job["id"] == "first"
+        assert job["status"] == jobs.QUEUED
+
+        job, created = self.store.create_unless("second", "http://repo.example.org/", lambda job: True)
+        assert not created
+        assert job["id"] == "first"
+
+        job, created = self.store.create_unless("third", "http://repo.example.org/", lambda job: False)
+        assert created
+        assert job["id"] == "third"
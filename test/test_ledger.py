@@ -0,0 +1,155 @@
+import os, shutil, tempfile, threading, time
+from unittest import TestCase
+from portality.autodiscovery import detectors, scheduler
+from portality.autodiscovery.scheduler import Scheduler
+from portality.autodiscovery.store import DetectionLedger
+from portality.oarr import Register
+
+class Named(detectors.Detector):
+    reads = ["repo_url"]
+    def name(self):
+        return self.__class__.__name__
+    def detectable(self, register):
+        return True
+    def required(self, register):
+        return True
+
+class FirstApi(Named):
+    writes = ["api"]
+    started = threading.Event()
+    def detect(self, register, info):
+        register.add_api_object({"api_type" : "first", "base_url" : "http://repo.example.org/first"})
+        FirstApi.started.set()
+        SecondApi.started.wait(2)
+
+class SecondApi(Named):
+    writes = ["api"]
+    started = threading.Event()
+    def detect(self, register, info):
+        FirstApi.started.wait(2)
+        register.add_api_object({"api_type" : "second", "base_url" : "http://repo.example.org/second"})
+        SecondApi.started.set()
+
+class FindsSoftware(Named):
+    writes = ["software"]
+    runs = []
+    def detect(self, register, info):
+        FindsSoftware.runs.append(register.repo_url)
+        register.add_software("DSpace", "3.2", None)
+
+class Describes(Named):
+    reads = ["repo_url", "repo_name"]
+    writes = ["description"]
+    runs = []
+    def detect(self, register, info):
+        Describes.runs.append(register.repo_url)
+        register.description = "About " + str(register.repo_name)
+
+def new_register():
+    register = Register()
+    register.repo_url = "http://repo.example.org/"
+    return register
+
+class TestLedger(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.ledger = DetectionLedger(os.path.join(self.dir, "ledger.db"))
+        FirstApi.started.clear()
+        SecondApi.started.clear()
+        FindsSoftware.runs = []
+        FindsSoftware.version = 1
+        Describes.runs = []
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_01_shared_list(self):
+        # detectors which add to the same list don't take turns, but each is credited with just its own
+        s = Scheduler([FirstApi, SecondApi], ledger=self.ledger)
+        assert s.dependencies == {0 : set(), 1 : set()}
+        start = time.time()
+        register = new_register()
+        s.run(register, detectors.Info())
+        assert time.time() - start < 1
+        assert len(register.get_api()) == 2
+
+        first = self.ledger.get("http://repo.example.org/", "FirstApi")
+        second = self.ledger.get("http://repo.example.org/", "SecondApi")
+        assert first["output"] == {"api" : [{"api_type" : "first", "base_url" : "http://repo.example.org/first"}]}
+        assert second["output"] == {"api" : [{"api_type" : "second", "base_url" : "http://repo.example.org/second"}]}
+
+    def test_02_is_current(self):
+        self.ledger.put("http://repo.example.org/", "FindsSoftware", 1, "abc", {})
+        entry = self.ledger.get("http://repo.example.org/", "FindsSoftware")
+        assert self.ledger.is_current(entry, 1, "abc")
+        assert not self.ledger.is_current(entry, 2, "abc")
+        assert not self.ledger.is_current(entry, 1, "def")
+        assert not self.ledger.is_current(entry, 1, "abc", max_age=0)
+        assert self.ledger.get("http://repo.example.org/", "Describes") is None
+
+    def test_03_detector_output(self):
+        register = new_register()
+        register.add_software("EPrints", "3", None)
+        before = {"software" : [{"name" : "EPrints", "version" : "3"}]}
+        register.add_software("DSpace", "3.2", None)
+        register.description = "A repository"
+        assert scheduler.detector_output(register, FindsSoftware(), before) == {"software" : [{"name" : "DSpace", "version" : "3.2"}]}
+        assert scheduler.detector_output(register, Describes(), {}) == {"description" : "A repository"}
+
+    def test_04_current_not_rerun(self):
+        register = new_register()
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        assert len(FindsSoftware.runs) == 1
+        assert len(register.software) == 1
+
+    def test_05_rerun_replaces(self):
+        # once stale, the detector runs again, and what it found replaces what it found last time
+        register = new_register()
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        self.ledger.ttl = 0
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        assert len(FindsSoftware.runs) == 2
+        assert register.software == [("DSpace", "3.2", None)]
+
+    def test_06_version_bump(self):
+        register = new_register()
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        FindsSoftware.version = 2
+        Scheduler([FindsSoftware], ledger=self.ledger).run(register, detectors.Info())
+        assert len(FindsSoftware.runs) == 2
+        assert register.software == [("DSpace", "3.2", None)]
+        assert self.ledger.get("http://repo.example.org/", "FindsSoftware")["version"] == 2
+
+    def test_07_inputs_changed(self):
+        register = new_register()
+        register.repo_name = "Old Name"
+        Scheduler([Describes], ledger=self.ledger).run(register, detectors.Info())
+        Scheduler([Describes], ledger=self.ledger).run(register, detectors.Info())
+        assert len(Describes.runs) == 1
+
+        register.repo_name = "New Name"
+        Scheduler([Describes], ledger=self.ledger).run(register, detectors.Info())
+        assert len(Describes.runs) == 2
+        assert register.description == "About New Name"
+
+    def test_08_edited_left_alone(self):
+        # a field someone has changed since it was detected isn't overwritten, even once it is stale
+        register = new_register()
+        register.repo_name = "Repository"
+        Scheduler([Describes], ledger=self.ledger).run(register, detectors.Info())
+        register.description = "Written by hand"
+        self.ledger.ttl = 0
+        Scheduler([Describes], ledger=self.ledger).run(register, detectors.Info())
+        assert len(Describes.runs) == 1
+        assert register.description == "Written by hand"
+
+    def test_09_not_incremental(self):
+        # discover records everything it runs, whether or not the ledger says it is needed
+        register = new_register()
+        Scheduler([FindsSoftware], ledger=self.ledger, incremental=False).run(register, detectors.Info())
+        register = new_register()
+        Scheduler([FindsSoftware], ledger=self.ledger, incremental=False).run(register, detectors.Info())
+        assert len(FindsSoftware.runs) == 2
+        assert self.ledger.get("http://repo.example.org/", "FindsSoftware")["output"] == {"software" : [{"name" : "DSpace", "version" : "3.2"}]}
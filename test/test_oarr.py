@@ -0,0 +1,33 @@
+from unittest import TestCase
+from portality.autodiscovery import detectors
+from portality.oarr import Register
+
+class TestRegister(TestCase):
+
+    def test_01_get_api(self):
+        # api objects are matched on their api_type, as the detectors and registry files give it
+        register = Register()
+        register.add_api_object({"api_type" : "rss", "base_url" : "http://repo.example.org/rss"})
+        register.add_api_object({"api_type" : "oai-pmh", "base_url" : "http://repo.example.org/oai"})
+        assert [api["base_url"] for api in register.get_api("rss")] == ["http://repo.example.org/rss"]
+        assert [api["base_url"] for api in register.get_api(type="oai-pmh")] == ["http://repo.example.org/oai"]
+        assert register.get_api("atom") == []
+        assert len(register.get_api()) == 2
+
+    def test_02_feed_required(self):
+        # so the feed detector is only run again while one of the kinds of feed is missing
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        register.add_api_object({"api_type" : "rss", "base_url" : "http://repo.example.org/rss"})
+        assert detectors.Feed().required(register)
+        register.add_api_object({"api_type" : "atom", "base_url" : "http://repo.example.org/atom"})
+        assert not detectors.Feed().required(register)
+
+    def test_03_api_detectors_required(self):
+        # nor are the detectors of an api the register already has
+        register = Register()
+        register.repo_url = "http://repo.example.org/"
+        assert detectors.OAI_PMH().required(register)
+        register.add_api_object({"api_type" : "oai-pmh", "base_url" : "http://repo.example.org/oai"})
+        assert not detectors.OAI_PMH().required(register)
+        assert detectors.Sword().required(register)
@@ -0,0 +1,45 @@
+from unittest import TestCase
+from portality.autodiscovery import detectors, htmlparse
+
+PAGE = """<html><head>
+<title>Example Repository</title>
+<link rel="alternate" type="application/rss+xml" href="/feed/rss_2.0/site">
+<link rel="Alternate SERVICE" type="application/atom+xml" href="http://repo.example.org/feed/atom_1.0/site" title="Atom">
+<link rel="oarr" href="files/oarr.json">
+<meta name="Generator" content="DSpace 4.2">
+<meta name="generator" content="Mirage">
+</head><body>
+<p>Welcome to the <b>Example Repository</b>.</p>
+<table><tr><td>Browse by date</td></tr></table>
+<a href="/handle/123">A thesis</a>
+<title>Not the title</title>
+</body></html>"""
+
+class TestPageIndex(TestCase):
+
+    def check(self, backend):
+        page = detectors.PageIndex(htmlparse.parse(PAGE, backend), "http://repo.example.org/home/")
+
+        # the first title only
+        assert page.title == "Example Repository"
+
+        # links by rel and type, case insensitively, with hrefs resolved against the page
+        assert [l["url"] for l in page.links_by_rel("alternate")] == ["http://repo.example.org/feed/rss_2.0/site", "http://repo.example.org/feed/atom_1.0/site"]
+        assert [l["url"] for l in page.links_by_rel("SERVICE")] == ["http://repo.example.org/feed/atom_1.0/site"]
+        assert page.links_by_rel("oarr")[0]["url"] == "http://repo.example.org/home/files/oarr.json"
+        assert page.links_by_type("Application/Atom+XML")[0]["title"] == "Atom"
+        assert page.links_by_rel("search") == []
+
+        # all the meta elements of a name, whatever its case
+        assert page.meta("GENERATOR") == ["DSpace 4.2", "Mirage"]
+
+        assert page.anchors == [{"href" : "/handle/123", "url" : "http://repo.example.org/handle/123", "text" : "A thesis"}]
+        assert page.blocks["p"] == [("Welcome to the Example Repository.", 34)]
+        assert page.blocks["td"] == [("Browse by date", 14)]
+        assert "Browse by date" in page.text
+
+    def test_01_bs4(self):
+        self.check("bs4")
+
+    def test_02_lxml(self):
+        self.check("lxml")
@@ -71,9 +71,16 @@ expected_messages_for_total_failure = [
 class MockResponse(object):
     def __init__(self, text, flagged=False):
         self.text = text
+        self.content = text
         self.status_code = 200
+        self.headers = {}
         self.flagged = flagged
 
+    def iter_content(self, chunk_size=1):
+        # detectors.Info streams what it fetches
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
 def html_autodiscovery(url, *args, **kwargs):
     if url.endswith("myoarr.json"):
         f = open(OARR_VALID)
@@ -120,6 +127,11 @@ def invalid_autodiscovery(url, *args, **kwargs):
         <html><head><link rel='oarr' type='application/json' href='/myoarr.json'></head><body></body></html>
         """)
 
+def mock_get(mock):
+    # detectors.Info fetches through a requests Session per host, so route those to the mock too
+    requests.get = mock
+    requests.Session.get = lambda self, url, *args, **kwargs: mock(url, *args, **kwargs)
+
 ### Utils ############################
 
 def read_json(path):
@@ -130,9 +142,11 @@ class TestRegistryFile(TestCase):
 
     def setUp(self):
         self.requests_get = requests.get
+        self.session_get = requests.Session.get
 
     def tearDown(self):
         requests.get = self.requests_get
+        requests.Session.get = self.session_get
 
     def test_01_schema_validate(self):
         # a valid schema, should return true
@@ -190,29 +204,29 @@ class TestRegistryFile(TestCase):
         assert not valid
 
     def test_06_autodiscovery_link(self):
-        requests.get = html_autodiscovery
+        mock_get(html_autodiscovery)
         resp = registryfile.RegistryFile.autodetect("http://cottagelabs.com")
         assert isinstance(resp, MockResponse)
         assert resp.flagged # tells us we hit the oarr file - see the html_autodiscovery method above
 
     def test_07_autodiscovery_guess(self):
-        requests.get = guess_autodiscovery
+        mock_get(guess_autodiscovery)
         resp = registryfile.RegistryFile.autodetect("http://cottagelabs.com")
         assert isinstance(resp, MockResponse)
         assert resp.flagged # tells us we hit the oarr file - see the guess_autodiscovery method above
 
     def test_08_autodiscovery_fail(self):
-        requests.get = fail_autodiscovery
+        mock_get(fail_autodiscovery)
         resp = registryfile.RegistryFile.autodetect("http://cottagelabs.com")
         assert resp is None
 
     def test_09_no_file(self):
-        requests.get = fail_autodiscovery
+        mock_get(fail_autodiscovery)
         file = registryfile.RegistryFile.get("http://cottagelabs.com")
         assert file is None
 
     def test_10_malformed_file(self):
-        requests.get = malformed_autodiscovery
+        mock_get(malformed_autodiscovery)
         with self.assertRaises(registryfile.RegistryFileException):
             try:
                 file = registryfile.RegistryFile.get("http://cottagelabs.com")
@@ -221,13 +235,13 @@ class TestRegistryFile(TestCase):
                 raise e
 
     def test_11_get_success(self):
-        requests.get = html_autodiscovery
+        mock_get(html_autodiscovery)
         file = registryfile.RegistryFile.get("http://cottagelabs.com")
         assert isinstance(file, oarr.Register)
         assert file.get_repo_name() == "Cottage Labs"
 
     def test_12_get_invalid(self):
-        requests.get = invalid_autodiscovery
+        mock_get(invalid_autodiscovery)
         with self.assertRaises(registryfile.RegistryFileException):
             try:
                 file = registryfile.RegistryFile.get("http://cottagelabs.com")
@@ -0,0 +1,62 @@
+import threading
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from unittest import TestCase
+from portality.autodiscovery import detectors
+from portality.autodiscovery.resolver import Resolver
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = "<html><head><title>" + self.headers.get("host") + "</title></head></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestResolver(TestCase):
+
+    def setUp(self):
+        self.resolver = detectors.Info.resolver
+        detectors.Info.resolver = Resolver()
+        self.lookups = []
+        def lookup(host):
+            self.lookups.append(host)
+            return None
+        detectors.Info.resolver._lookup = lookup
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        detectors.Info.resolver = self.resolver
+
+    def test_01_connects_to_resolved_address(self):
+        # the name only resolves through the resolver, and the server is still asked for it by name
+        detectors.Info.resolver.seed("repo.invalid", ["127.0.0.1"])
+        url = "http://repo.invalid:" + str(self.port) + "/"
+        info = detectors.Info()
+        try:
+            resp = info.url_get(url, "html")
+            assert resp.status_code == 200
+            assert info.page(url).title == "repo.invalid:" + str(self.port)
+        finally:
+            info.close()
+        assert self.lookups == []
+
+    def test_02_unresolvable_remembered(self):
+        # a host which doesn't resolve when fetched is remembered, and not looked up or fetched again
+        url = "http://dead.invalid:" + str(self.port) + "/"
+        info = detectors.Info()
+        try:
+            assert info.url_get(url, "html") is None
+            assert detectors.Info.resolver.failed("dead.invalid")
+            assert detectors.Info().url_get(url + "other", "html") is None
+        finally:
+            info.close()
+        assert self.lookups == ["dead.invalid"]
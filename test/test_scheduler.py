@@ -0,0 +1,47 @@
+from unittest import TestCase
+from portality.autodiscovery import detectors
+from portality.autodiscovery.scheduler import Scheduler
+
+class Stub(detectors.Detector):
+    def name(self):
+        return self.__class__.__name__
+
+class FindsSoftware(Stub):
+    writes = ["software"]
+
+class FindsApi(Stub):
+    reads = ["software"]
+    writes = ["api"]
+
+class FindsName(Stub):
+    writes = ["repo_name"]
+
+class FindsMoreApi(Stub):
+    reads = ["software"]
+    writes = ["api"]
+
+class ReadsApi(Stub):
+    reads = ["api"]
+    writes = ["description"]
+
+class TestScheduler(TestCase):
+
+    def test_01_dependency_graph(self):
+        ds = [klazz() for klazz in [FindsSoftware, FindsApi, FindsName, FindsMoreApi, ReadsApi]]
+        graph = Scheduler.dependency_graph(ds)
+
+        # a reader waits for every earlier writer of what it reads
+        assert graph[1] == set([0])
+        assert graph[3] == set([0])
+        assert graph[4] == set([1, 3])
+
+        # independent detectors have no edges, including those which write the same field
+        assert graph[0] == set()
+        assert graph[2] == set()
+        assert 1 not in graph[3]
+
+    def test_02_later_writer(self):
+        # only earlier detectors are waited for; a writer later in the list is not
+        ds = [ReadsApi(), FindsApi()]
+        graph = Scheduler.dependency_graph(ds)
+        assert graph == {0 : set(), 1 : set()}
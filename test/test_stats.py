@@ -0,0 +1,72 @@
+import threading
+from unittest import TestCase
+from portality.autodiscovery import stats
+from portality.autodiscovery.stats import Stats, bind, add_summary
+
+class TestStats(TestCase):
+
+    def test_01_measure(self):
+        s = Stats()
+        with s.measure("Title"):
+            s.count("fetches")
+            s.count("bytes", 1024)
+        s.count("fetches")
+
+        summary = s.summary()
+        title = summary["detectors"]["Title"]
+        assert title["runs"] == 1
+        assert title["fetches"] == 1
+        assert title["bytes"] == 1024
+        assert title["wall"] >= 0 and title["cpu"] >= 0
+
+        # anything done outside of a detector is counted as other
+        assert summary["detectors"][stats.OTHER]["fetches"] == 1
+        assert summary["totals"]["fetches"] == 2
+        assert summary["errors"] == {}
+
+    def test_02_exceptions(self):
+        s = Stats()
+        with self.assertRaises(ValueError):
+            with s.measure("Broken"):
+                raise ValueError("no such page")
+        summary = s.summary()
+        assert summary["detectors"]["Broken"]["exceptions"] == 1
+        assert summary["detectors"]["Broken"]["runs"] == 1
+        assert summary["errors"] == {"Broken" : ["no such page"]}
+
+    def test_03_bind(self):
+        # work handed to another thread is counted against the detector which handed it over
+        s = Stats()
+        with s.measure("Feed"):
+            fn = bind(lambda: s.count("fetches"))
+        assert stats.current() == stats.OTHER
+        t = threading.Thread(target=fn)
+        t.start()
+        t.join()
+        assert s.summary()["detectors"]["Feed"]["fetches"] == 1
+
+        # and the thread goes back to counting against whoever it was working for before
+        unbound = []
+        t = threading.Thread(target=lambda: (fn(), unbound.append(stats.current())))
+        t.start()
+        t.join()
+        assert unbound == [stats.OTHER]
+
+    def test_04_add_summary(self):
+        # the summaries of many runs add up, e.g. over a batch
+        a = Stats()
+        with a.measure("Title"):
+            a.count("fetches", 2)
+        b = Stats()
+        with b.measure("Title"):
+            b.count("fetches", 3)
+        with b.measure("Feed"):
+            b.count("cache_hits")
+
+        total = add_summary({}, a.summary())
+        add_summary(total, b.summary())
+        assert total["detectors"]["Title"]["fetches"] == 5
+        assert total["detectors"]["Title"]["runs"] == 2
+        assert total["detectors"]["Feed"]["cache_hits"] == 1
+        assert total["totals"]["fetches"] == 5
+        assert total["totals"]["runs"] == 3
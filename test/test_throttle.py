@@ -0,0 +1,115 @@
+import threading
+from email.utils import formatdate
+from unittest import TestCase
+from portality.autodiscovery import throttle
+
+class FakeClock(object):
+    # stands in for the time module: sleeping moves the clock on at once
+    def __init__(self, now=1000000000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TestThrottle(TestCase):
+
+    def setUp(self):
+        self.time = throttle.time
+        self.clock = FakeClock()
+        throttle.time = self.clock
+
+    def tearDown(self):
+        throttle.time = self.time
+
+    def test_01_bucket_burst(self):
+        # a full bucket lets a burst through at once, then one request per 1/rate seconds
+        bucket = throttle.TokenBucket(2, 3)
+        for i in range(3):
+            bucket.acquire()
+        assert self.clock.sleeps == []
+        bucket.acquire()
+        assert self.clock.sleeps == [0.5]
+
+    def test_02_bucket_refill(self):
+        # tokens build up while it is idle, but never beyond its capacity
+        bucket = throttle.TokenBucket(1, 2)
+        bucket.acquire()
+        bucket.acquire()
+        self.clock.now += 60
+        bucket.acquire()
+        bucket.acquire()
+        assert self.clock.sleeps == []
+        bucket.acquire()
+        assert self.clock.sleeps == [1.0]
+
+    def test_03_rate_limiter(self):
+        # each key has a bucket of its own
+        limiter = throttle.RateLimiter(1, 1)
+        limiter.acquire("uk")
+        limiter.acquire("org")
+        assert self.clock.sleeps == []
+        assert limiter.bucket("uk") is limiter.bucket("uk")
+        limiter.acquire("uk")
+        assert self.clock.sleeps == [1.0]
+
+    def test_04_retry_after(self):
+        assert throttle.retry_after(None) is None
+        assert throttle.retry_after(" 120 ") == 120
+        assert throttle.retry_after("soon") is None
+
+        # an http date is the time left until then, and no less than nothing once it has passed
+        assert throttle.retry_after(formatdate(self.clock.now + 30, usegmt=True)) == 30
+        assert throttle.retry_after(formatdate(self.clock.now - 30, usegmt=True)) == 0
+
+    def test_05_delay(self):
+        # requests to a host start at least delay apart; other hosts don't wait on it
+        gate = throttle.HostGate(delay=2)
+        with gate.slot("repo.example.org"):
+            pass
+        with gate.slot("repo.example.org"):
+            pass
+        assert self.clock.sleeps == [2]
+        with gate.slot("other.example.org"):
+            pass
+        assert self.clock.sleeps == [2]
+
+    def test_06_back_off(self):
+        gate = throttle.HostGate()
+        assert gate.blocked_for("repo.example.org") == 0
+        gate.back_off("repo.example.org", 30)
+        gate.back_off("repo.example.org", 10)
+        assert gate.blocked_for("repo.example.org") == 30
+        with gate.slot("repo.example.org"):
+            pass
+        assert self.clock.sleeps == [30]
+        assert gate.blocked_for("repo.example.org") == 0
+
+    def test_07_concurrency(self):
+        # no more than concurrency requests to a host are in flight at once
+        gate = throttle.HostGate(concurrency=1)
+        inside = threading.Event()
+        release = threading.Event()
+        entered = []
+        def hold():
+            with gate.slot("repo.example.org"):
+                inside.set()
+                release.wait(2)
+        def second():
+            with gate.slot("repo.example.org"):
+                entered.append(True)
+        t1 = threading.Thread(target=hold)
+        t1.start()
+        inside.wait(2)
+        t2 = threading.Thread(target=second)
+        t2.start()
+        t2.join(0.2)
+        assert entered == []
+        release.set()
+        t1.join()
+        t2.join(2)
+        assert entered == [True]
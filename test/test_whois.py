@@ -0,0 +1,82 @@
+import os, codecs
+from unittest import TestCase
+from portality.autodiscovery import detectors
+
+BASE_FILE_PATH = os.path.dirname(os.path.realpath(__file__))
+WHOIS_RESOURCES = os.path.join(BASE_FILE_PATH, "resources", "whois")
+
+JANET = os.path.join(WHOIS_RESOURCES, "janet.txt")
+ICANN = os.path.join(WHOIS_RESOURCES, "icann.txt")
+NOMINET = os.path.join(WHOIS_RESOURCES, "nominet.txt")
+EDUCAUSE = os.path.join(WHOIS_RESOURCES, "educause.txt")
+
+def wrapper(path, domain):
+    with codecs.open(path, "r", "utf-8") as f:
+        body = f.read()
+    return detectors.WhoIsWrapper(domain, body=body)
+
+class TestWhois(TestCase):
+
+    def test_01_janet_long_format(self):
+        who = wrapper(JANET, "example.ac.uk")
+        assert who.get("domain") == "example.ac.uk"
+        assert who.get("org_name") == "University of Example"
+        assert who.get("contact_name") == "IT Services Hostmaster"
+        assert who.get("address") == "IT Services\nUniversity of Example\nExample Road\nExampleton\nEX1 2MP\nUnited Kingdom"
+        assert who.get("email") is None
+
+        # values which run over several lines keep all of them
+        assert who.get_raw("Servers") == "ns0.example.ac.uk\t192.0.2.10\nns1.example.ac.uk\t192.0.2.11"
+
+    def test_02_icann_short_format(self):
+        who = wrapper(ICANN, "example-repository.org")
+        assert who.get("domain") == "EXAMPLE-REPOSITORY.ORG"
+        assert who.get("org_name") == "Example Research Institute"
+        assert who.get("contact_name") == "Jane Repository"
+        assert who.get("email") == "hostmaster@example-repository.org"
+        assert who.get("phone") == "+1.5555550100"
+        assert who.get("fax") == "+1.5555550101"
+        assert who.get("address") == "1 Example Avenue\nExampleville\nCA\n94000\nUS"
+
+        # the first of a repeated key is the one returned, the rest are still there
+        assert who.get_raw("Name Server") == "NS1.EXAMPLE-HOSTING.COM"
+        assert who.records["name server"] == ["NS1.EXAMPLE-HOSTING.COM", "NS2.EXAMPLE-HOSTING.COM"]
+
+        # keys with no value are not recorded, and values may contain colons
+        assert who.get_raw("Registrant Phone Ext") is None
+        assert who.get_raw("Registrar URL") == "http://www.example-registrar.com"
+
+    def test_03_nominet_indented(self):
+        who = wrapper(NOMINET, "example-archive.co.uk")
+        assert who.get("domain") == "example-archive.co.uk"
+        assert who.get("org_name") is None
+        assert who.get_raw("Registrar") == "Example Registrar Ltd t/a Example [Tag = EXAMPLE]\nURL: http://www.example-registrar.co.uk"
+
+        # lines inside a block are values, not keys of their own
+        assert who.get_raw("URL") is None
+        assert who.get_raw("Registered on") is None
+
+    def test_04_educause(self):
+        who = wrapper(EDUCAUSE, "example.edu")
+        assert who.get("domain") == "EXAMPLE.EDU"
+        assert who.get_raw("Registrant") == "Example State University\nUniversity Libraries\n100 Campus Drive\nExample City, NY 10000\nUSA"
+        assert who.get_raw("Domain record activated") == "12-Mar-1987"
+
+    def test_05_empty(self):
+        who = detectors.WhoIsWrapper("example.com", body="")
+        assert who.records == {}
+        for field in detectors.WhoIsWrapper.fields.keys():
+            assert who.get(field) is None
+
+    def test_06_registrable_domain(self):
+        # the domain whois records are held against, which all the hosts under it share
+        assert detectors.registrable_domain("eprints.example.ac.uk") == "example.ac.uk"
+        assert detectors.registrable_domain("www.example.org") == "example.org"
+        assert detectors.registrable_domain("repository.library.example.edu.au") == "example.edu.au"
+        assert detectors.registrable_domain("Repo.Example.CO.JP.") == "example.co.jp"
+        assert detectors.registrable_domain("example.org") == "example.org"
+        assert detectors.registrable_domain("192.168.0.1") == "192.168.0.1"
+
+        # a second level label is only taken as such under a country code
+        assert detectors.registrable_domain("eprints.example.co") == "example.co"
+        assert detectors.registrable_domain("dspace.ac.example.com") == "example.com"